@@ -21,13 +21,49 @@ dag = DAG('data_processing',
           schedule_interval='0 9 * * *', # Запуск в 9:00 UTC каждый день, что соответствует 12:00 MSK
           catchup=False)
 
-# Первая задача: запуск обработчика данных
-t1 = BashOperator(
-    task_id='run_data_processor',
-    bash_command='/opt/airflow/dags/run_data_processor.sh ',
-    dag=dag)
+# Количество параллельных задач сбора: поисковые запросы делятся между ними.
+# Не больше количества запросов в vacancy_list (data_processor.py): часть
+# без запросов завершается ошибкой
+COLLECT_PARTS = 4
+
+# Идентификатор запуска: стадии одного запуска DAG передают данные друг
+# другу через контрольные точки в общем каталоге
+RUN_ID = '{{ ts_nodash }}'
+
+# Повторы для стадий, которые обращаются к сети (hh.ru, курсы валют, MongoDB)
+NETWORK_RETRIES = {'retries': 3, 'retry_delay': timedelta(minutes=5)}
+
+
+def stage_task(stage, *args, **kwargs):
+    """
+    Создает задачу, выполняющую одну стадию data-processor.
+    """
+    return BashOperator(
+        task_id=kwargs.pop('task_id', stage),
+        bash_command=' '.join(['/opt/airflow/dags/run_pipeline_stage.sh', stage,
+                               '--run-id', RUN_ID, *args]),
+        dag=dag,
+        **kwargs)
+
+
+# Первые задачи: обработчик данных по стадиям. Сбор выполняется
+# параллельно по частям поисковых запросов, остальные стадии - по одной
+collect = [stage_task('collect', '--part', str(part), '--parts', str(COLLECT_PARTS),
+                      task_id=f'collect_{part}', **NETWORK_RETRIES)
+           for part in range(COLLECT_PARTS)]
+enrich = stage_task('enrich', **NETWORK_RETRIES)
+normalize = stage_task('normalize', **NETWORK_RETRIES)
+resolve_country = stage_task('resolve_country', **NETWORK_RETRIES)
+extract_fields = stage_task('extract_fields', retries=1, retry_delay=timedelta(minutes=1))
+load = stage_task('load', **NETWORK_RETRIES)
+# Очистка выполняется после любого исхода загрузки (в том числе после
+# исчерпания повторов): контрольные точки удаляются сразу, только если
+# загрузка завершилась, иначе они остаются, и упавшую стадию можно
+# перезапустить. Контрольные точки незавершенных запусков удаляются через
+# CHECKPOINT_RETENTION_DAYS дней
+cleanup = stage_task('cleanup', trigger_rule='all_done')
 
-# Вторая задача: удаление дубликатов, выполняется после t1
+# Вторая задача: удаление дубликатов, выполняется после загрузки
 t2 = BashOperator(
     task_id='run_delete_duplicates',
     bash_command='/opt/airflow/dags/run_delete_dublicates.sh ',
@@ -46,4 +82,6 @@ t4 = BashOperator(
     dag=dag)
 
 # Установка зависимостей между задачами
-t1 >> t2 >> t3 >> t4
+collect >> enrich >> normalize >> resolve_country >> extract_fields >> load
+load >> cleanup
+load >> t2 >> t3 >> t4
@@ -1,2 +0,0 @@
-#!/bin/bash
-docker exec data_processor_container python /usr/app/data_processor.py
\ No newline at end of file
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Запуск одной стадии data-processor: run_pipeline_stage.sh <стадия> --run-id <id> [...]
+docker exec data_processor_container python /usr/app/data_processor.py "$@"
@@ -0,0 +1,204 @@
+"""
+Бенчмарк потребления памяти обработчиком данных и построением графиков.
+
+Каждый сценарий выполняется в отдельном процессе на синтетических
+вакансиях (см. hh_fixtures.py), без сети и MongoDB. Замеряются размер
+итоговой таблицы (memory_usage(deep=True)) и прирост пиковой памяти
+процесса (ru_maxrss) после импорта модулей:
+
+    processor-object  - стадии конвейера без схемы: строки и float64,
+                        описание вакансии идет через все стадии
+    processor-schema  - схема (schema.py) после каждой стадии, описание
+                        вакансии не сохраняется
+    renderer-object   - вакансии читаются списком документов в DataFrame
+    renderer-compact  - вакансии раскладываются по колонкам (vacancies_frame)
+
+Пример:
+    python benchmarks/bench_memory.py --vacancies 50000 --output memory.json
+"""
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix='hh_bench_memory_')
+# Рабочий каталог с фикстурами удаляется при завершении бенчмарка
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+
+os.environ.setdefault('CURRENCY_RATES_FIXTURE', os.path.join(WORK_DIR, 'currency_fixture.json'))
+os.environ.setdefault('CURRENCY_RATES_PATH', os.path.join(WORK_DIR, 'currency_rates.json'))
+os.environ.setdefault('AREAS_CACHE_PATH', os.path.join(WORK_DIR, 'areas.json'))
+os.environ.setdefault('ARCHIVE_RESPONSES', 'false')
+
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'flask_app', 'app'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'data-processor', 'app'))
+
+import pandas as pd  # noqa: E402
+
+import data_processor as processor  # noqa: E402
+from areas import AREAS_CACHE_PATH  # noqa: E402
+from currency import CURRENCY_RATES_FIXTURE  # noqa: E402
+from enrichment import FEATURE_COLUMNS  # noqa: E402
+from schema import apply_schema  # noqa: E402
+from chart_data import chart_data_from_raw, vacancies_frame, RAW_FIELDS  # noqa: E402
+from hh_fixtures import SyntheticHH, currency_rates_fixture  # noqa: E402
+
+SCENARIOS = ['processor-object', 'processor-schema', 'renderer-object', 'renderer-compact']
+
+
+def git_commit():
+    """
+    Возвращает хеш текущего коммита или None, если он недоступен.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_fixtures(data):
+    """
+    Сохраняет фикстуру курсов валют и каталог регионов в рабочий каталог.
+    """
+    with open(CURRENCY_RATES_FIXTURE, 'w', encoding='utf-8') as file:
+        json.dump(currency_rates_fixture(), file)
+    with open(AREAS_CACHE_PATH, 'w', encoding='utf-8') as file:
+        json.dump(data.areas, file, ensure_ascii=False)
+
+
+def peak_rss_bytes():
+    """
+    Пиковая память процесса в байтах (ru_maxrss в Linux - в килобайтах).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_processor(size, seed, compact):
+    """
+    Прогоняет стадии обработки data-processor от результатов поиска до
+    extract_fields. Без compact таблицы хранятся так, как до схемы.
+    """
+    data = SyntheticHH(size, seed=seed)
+    df = pd.json_normalize([data.search_item(index) for index in range(size)])
+    df = df.reindex(columns=processor.columns)
+
+    columns = FEATURE_COLUMNS if compact else FEATURE_COLUMNS + ['description']
+    details = (data.vacancy_detail(index) for index in range(size))
+    df[columns] = pd.DataFrame([[detail.get(column) for column in columns] for detail in details],
+                               columns=columns, index=df.index)
+
+    def conform(frame):
+        return apply_schema(frame) if compact else frame
+
+    df = conform(df)
+    for stage in (processor.normalize, processor.resolve_country, processor.extract_fields):
+        df = conform(stage(df))
+    return df
+
+
+def vacancy_docs(size, seed):
+    """
+    Генерирует документы вакансий в том виде, в каком они хранятся в MongoDB
+    (только поля RAW_FIELDS).
+    """
+    data = SyntheticHH(size, seed=seed)
+    countries = [country['name'] for country in data.areas]
+    rng = random.Random(seed)
+    for index in range(size):
+        detail = data.vacancy_detail(index)
+        salary = detail['salary'] or {}
+        yield {'salary_from': salary.get('from'),
+               'salary_to': salary.get('to'),
+               'experience': detail['experience']['name'],
+               'country': rng.choice(countries),
+               'skills': [skill['name'] for skill in detail['key_skills']]}
+
+
+def run_renderer(size, seed, compact):
+    """
+    Читает документы вакансий в DataFrame и считает по ним данные графиков.
+    """
+    docs = vacancy_docs(size, seed)
+    if compact:
+        df = vacancies_frame(docs, RAW_FIELDS)
+    else:
+        df = pd.DataFrame(list(docs), columns=RAW_FIELDS)
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    chart_data_from_raw(df)
+    return frame_bytes
+
+
+def measure(scenario, size, seed, results):
+    """
+    Выполняет сценарий в текущем процессе и передает замеры через results.
+    """
+    rss_before = peak_rss_bytes()
+    started = time.perf_counter()
+    if scenario.startswith('processor'):
+        df = run_processor(size, seed, compact=scenario.endswith('schema'))
+        frame_bytes = int(df.memory_usage(deep=True).sum())
+    else:
+        frame_bytes = run_renderer(size, seed, compact=scenario.endswith('compact'))
+    results.put({'scenario': scenario,
+                 'seconds': round(time.perf_counter() - started, 3),
+                 'frame_bytes': frame_bytes,
+                 'peak_rss_delta_bytes': peak_rss_bytes() - rss_before})
+
+
+def run_scenario(scenario, size, seed):
+    """
+    Запускает сценарий в новом процессе, чтобы пиковая память одного
+    сценария не влияла на замеры другого.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=measure, args=(scenario, size, seed, results))
+    process.start()
+    result = results.get()
+    process.join()
+    print(f'    {scenario:<18} {result["frame_bytes"] / 2 ** 20:>10.1f} MB таблица'
+          f' {result["peak_rss_delta_bytes"] / 2 ** 20:>10.1f} MB пик'
+          f' {result["seconds"]:>10.3f} s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vacancies', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    write_fixtures(SyntheticHH(args.vacancies, seed=args.seed))
+    print(f'{args.vacancies} вакансий:')
+    results = {scenario: run_scenario(scenario, args.vacancies, args.seed)
+               for scenario in args.scenarios}
+
+    for baseline, compact in [('processor-object', 'processor-schema'),
+                              ('renderer-object', 'renderer-compact')]:
+        if baseline in results and compact in results:
+            ratio = (results[baseline]['peak_rss_delta_bytes']
+                     / max(results[compact]['peak_rss_delta_bytes'], 1))
+            print(f'    {compact}: пиковая память меньше в {ratio:.1f} раза')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'commit': git_commit(), 'args': vars(args),
+                       'results': list(results.values())},
+                      file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Офлайн-бенчмарк конвейера data-processor и отрисовки графиков.
+
+Данные hh.ru, каталог регионов и курсы валют синтетические
+(см. hh_fixtures.py): страницы поиска и описания вакансий отдает
+локальный mock-сервер, поэтому сеть не нужна. Каждая стадия замеряется
+отдельно:
+
+    collect, enrich, normalize (зарплаты и валюты), resolve_country,
+    extract_fields, load, stats, dedup, retention, charts
+
+Стадии load, stats, dedup и retention работают с MongoDB (отдельная база
+vacancydb_bench) и выполняются только с флагом --mongo. Без него графики
+строятся по обработанным вакансиям в pandas.
+
+Результаты сохраняются в JSON вместе с коммитом, чтобы сравнивать
+их между версиями.
+
+Пример:
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --mongo --output pipeline.json
+"""
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix='hh_bench_')
+# Рабочий каталог с фикстурами удаляется при завершении бенчмарка
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+
+# Файлы курсов валют и каталога регионов - в рабочем каталоге бенчмарка,
+# а не в data/ data-processor
+os.environ.setdefault('CURRENCY_RATES_FIXTURE', os.path.join(WORK_DIR, 'currency_fixture.json'))
+os.environ.setdefault('CURRENCY_RATES_PATH', os.path.join(WORK_DIR, 'currency_rates.json'))
+os.environ.setdefault('AREAS_CACHE_PATH', os.path.join(WORK_DIR, 'areas.json'))
+os.environ.setdefault('ARCHIVE_RESPONSES', 'false')
+
+# data-processor раньше flask_app: db_connection процессора - надмножество
+# db_connection веб-приложения
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'flask_app', 'app'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'data-processor', 'app'))
+
+import pandas as pd  # noqa: E402
+
+import data_processor as processor  # noqa: E402
+from areas import AREAS_CACHE_PATH  # noqa: E402
+from collector import collect_vacancies  # noqa: E402
+from currency import CURRENCY_RATES_FIXTURE  # noqa: E402
+from db_connection import (get_mongo_client, close_mongo_client,  # noqa: E402
+                           create_db_and_collection, load_data_to_mongo)
+from delete_dublicates import delete_duplicates  # noqa: E402
+from delete_old_data import enforce_retention  # noqa: E402
+from enrichment import enrich_vacancies, FEATURE_COLUMNS  # noqa: E402
+from schema import apply_schema, to_records  # noqa: E402
+from vacancy_stats import refresh_stats  # noqa: E402
+from chart_data import (chart_data_from_raw, load_chart_data, vacancies_frame,  # noqa: E402
+                        RAW_FIELDS)
+from data_vizualization_ru import render_charts  # noqa: E402
+from hh_fixtures import MockHHServer, currency_rates_fixture  # noqa: E402
+
+BENCH_DB = 'vacancydb_bench'
+BENCH_COLLECTION = 'vacancy'
+
+
+def git_commit():
+    """
+    Возвращает хеш текущего коммита или None, если он недоступен.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """
+    Замеряет время стадий и количество строк на их выходе.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        rows = len(result) if isinstance(result, (pd.DataFrame, list)) else None
+        self.stages[name] = {'seconds': round(seconds, 3), 'rows': rows}
+        print(f'    {name:<16} {seconds:>10.3f} s' + (f' {rows:>10} rows' if rows is not None else ''))
+        return result
+
+
+def write_fixtures(server):
+    """
+    Сохраняет фикстуру курсов валют и каталог регионов mock-сервера
+    в рабочий каталог, чтобы стадии не обращались к сети.
+    """
+    for path in [os.environ['CURRENCY_RATES_PATH'], AREAS_CACHE_PATH]:
+        if os.path.exists(path):
+            os.remove(path)
+    with open(CURRENCY_RATES_FIXTURE, 'w', encoding='utf-8') as file:
+        json.dump(currency_rates_fixture(), file)
+    with open(AREAS_CACHE_PATH, 'w', encoding='utf-8') as file:
+        json.dump(server.data.areas, file, ensure_ascii=False)
+
+
+def add_duplicates(collection, docs, share=0.02, seed=0):
+    """
+    Добавляет в коллекцию устаревшие копии части вакансий (без id, с тем же
+    URL и более ранней датой публикации), чтобы стадии dedup было что удалять.
+    """
+    rng = random.Random(seed)
+    copies = []
+    for doc in rng.sample(docs, int(len(docs) * share)):
+        copy = {key: value for key, value in doc.items() if key not in ('_id', 'id')}
+        copy['published_at'] = doc['published_at'] - timedelta(days=rng.randint(1, 5))
+        copies.append(copy)
+    if copies:
+        collection.insert_many(copies, ordered=False)
+    return len(copies)
+
+
+def run_size(size, args):
+    """
+    Прогоняет все стадии на size синтетических вакансиях.
+
+    Возвращает:
+        dict: время и количество строк по стадиям.
+    """
+    timer = StageTimer()
+    with MockHHServer(size, seed=args.seed) as server:
+        write_fixtures(server)
+
+        def collect():
+            items = collect_vacancies(server.data.queries, pages=processor.NUM_PAGES,
+                                      per_page=processor.PAGINATION, search_params={},
+                                      workers=args.workers, rate=0, base_url=server.url)
+            return apply_schema(pd.json_normalize(items).reindex(columns=processor.columns))
+
+        def enrich(df):
+            features, _ = enrich_vacancies(df, cache=None, workers=args.workers, rate=0)
+            df[FEATURE_COLUMNS] = features
+            return apply_schema(df)
+
+        df = timer.run('collect', collect)
+        df = timer.run('enrich', enrich, df)
+
+    # Как и в конвейере, типы колонок приводятся схемой после каждой стадии
+    def conformed(stage):
+        return lambda frame: apply_schema(stage(frame))
+
+    df = timer.run('normalize', conformed(processor.normalize), df)
+    df = timer.run('resolve_country', conformed(processor.resolve_country), df)
+    df = timer.run('extract_fields', conformed(processor.extract_fields), df)
+
+    if args.mongo:
+        client = get_mongo_client()
+        client.drop_database(BENCH_DB)
+        collection = client[BENCH_DB][BENCH_COLLECTION]
+        try:
+            records = to_records(df)
+            create_db_and_collection(BENCH_DB, BENCH_COLLECTION)
+            timer.run('load', load_data_to_mongo, BENCH_DB, BENCH_COLLECTION, records)
+            add_duplicates(collection, list(collection.find({}, {'description': 0})),
+                           seed=args.seed)
+            timer.run('stats', refresh_stats, BENCH_DB, BENCH_COLLECTION)
+            timer.run('dedup', delete_duplicates, BENCH_DB, BENCH_COLLECTION, full_scan=True)
+            timer.run('retention', enforce_retention, BENCH_DB, BENCH_COLLECTION)
+            chart_data = load_chart_data(BENCH_DB, BENCH_COLLECTION, 'stats')
+        finally:
+            client.drop_database(BENCH_DB)
+            close_mongo_client()
+    else:
+        # Те же типы колонок, что у вакансий, прочитанных из MongoDB
+        chart_data = chart_data_from_raw(vacancies_frame(to_records(df), RAW_FIELDS))
+
+    with tempfile.TemporaryDirectory(dir=WORK_DIR) as save_path:
+        timer.run('charts', render_charts, chart_data, save_path=save_path,
+                  workers=args.chart_workers)
+
+    return timer.stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=16,
+                        help='потоки сбора и обогащения')
+    parser.add_argument('--chart-workers', type=int, default=os.cpu_count() or 1,
+                        help='процессы отрисовки графиков')
+    parser.add_argument('--mongo', action='store_true',
+                        help='замерять стадии с MongoDB (load, stats, dedup, retention)')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f'{size} вакансий:')
+        results.append({'size': size, 'stages': run_size(size, args)})
+
+    report = {'commit': git_commit(),
+              'created_at': datetime.now(timezone.utc).isoformat(),
+              'mongo': args.mongo,
+              'workers': args.workers,
+              'chart_workers': args.chart_workers,
+              'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Сравнение подсчета встречаемости навыков по опыту работы:
+
+    - legacy: прежняя матрица one-hot (get_dummies(apply(pd.Series).stack()));
+    - explode: chart_data.count_skills + chart_data.skills_table.
+
+Скрипт проверяет, что оба способа дают одинаковую таблицу на больших
+синтетических данных, и замеряет время и пиковый объем памяти Python.
+MongoDB не нужна. Совпадение на небольших таблицах, в том числе
+с пустыми и повторяющимися навыками, проверяет
+flask_app/tests/test_chart_data.py.
+
+Пример:
+    python benchmarks/bench_skill_counts.py --sizes 10000 50000 --output skills.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'flask_app', 'app'))
+
+from chart_data import count_skills, skills_table  # noqa: E402
+from bench_vacancy_queries import make_vacancy_docs  # noqa: E402
+
+
+def legacy_skills_table(df):
+    """
+    Прежний способ: таблица one-hot по всем навыкам, сумма по опыту работы.
+
+    Параметры:
+        df (pd.DataFrame): колонки experience и skills (списки навыков).
+
+    Возвращает:
+        pd.DataFrame: встречаемость навыков (строки) по опыту (колонки).
+    """
+    skills_encoded = pd.get_dummies(df['skills'].apply(pd.Series).stack()).groupby(level=0).sum()
+    df_skills = pd.concat([df[['experience']], skills_encoded], axis=1)
+    df_skills_grouped = df_skills.groupby('experience').sum().astype('int64').transpose()
+    df_skills_grouped.columns = df_skills_grouped.columns.str.lower()
+    return df_skills_grouped
+
+
+def explode_skills_table(df):
+    """
+    Новый способ: explode и группировка пар (опыт, навык).
+
+    Параметры:
+        df (pd.DataFrame): колонки experience и skills (списки навыков).
+
+    Возвращает:
+        pd.DataFrame: встречаемость навыков (строки) по опыту (колонки).
+    """
+    return skills_table(count_skills(df))
+
+
+def measure(func, df):
+    """
+    Замеряет время и пиковую память Python для одного способа подсчета.
+
+    Параметры:
+        func (callable): способ подсчета.
+        df (pd.DataFrame): входные данные.
+
+    Возвращает:
+        tuple: (результат, время в секундах, пиковая память в МБ).
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(elapsed, 3), round(peak / 2 ** 20, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        df = pd.DataFrame(make_vacancy_docs(size), columns=['experience', 'skills'])
+        df = df.dropna(subset=['skills'])
+
+        legacy, legacy_seconds, legacy_mb = measure(legacy_skills_table, df)
+        new, new_seconds, new_mb = measure(explode_skills_table, df)
+
+        # Таблицы должны совпадать до последнего счетчика
+        pd.testing.assert_frame_equal(legacy, new, check_names=False)
+
+        for method, seconds, peak_mb in [('legacy', legacy_seconds, legacy_mb),
+                                         ('explode', new_seconds, new_mb)]:
+            results.append({'size': size, 'method': method,
+                            'seconds': seconds, 'peak_mb': peak_mb})
+            print(f'{size:>9} {method:>8} {seconds:>10.3f} s {peak_mb:>10.1f} MB')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
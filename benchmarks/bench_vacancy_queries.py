@@ -0,0 +1,142 @@
+"""
+Сравнение двух способов получить данные для графиков визуализации:
+
+    - raw: выгрузка всей коллекции вакансий (load_vacancies) и расчет в pandas;
+    - aggregate: агрегации на стороне MongoDB (vacancy_queries).
+
+Для каждого размера коллекции создается синтетическая коллекция в отдельной
+базе, после чего оба способа замеряются по времени и пиковому объему памяти
+Python. Нужна запущенная MongoDB (переменные окружения как у flask_app).
+
+Пример:
+    python benchmarks/bench_vacancy_queries.py --sizes 10000 100000 1000000 --output bench.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'flask_app', 'app'))
+
+from chart_data import load_chart_data  # noqa: E402
+from db_connection import get_mongo_client, close_mongo_client  # noqa: E402
+
+BENCH_DB = 'vacancydb_bench'
+BENCH_COLLECTION = 'vacancy'
+
+EXPERIENCES = ['Нет опыта', 'От 1 года до 3 лет', 'От 3 до 6 лет', 'Более 6 лет']
+COUNTRIES = ['Россия'] * 6 + ['Казахстан', 'Беларусь', 'Узбекистан', 'Грузия', 'Армения']
+SKILLS = ['Python', 'SQL', 'Apache Spark', 'Apache Airflow', 'Hadoop', 'Kafka', 'ClickHouse',
+          'PostgreSQL', 'Docker', 'Git', 'Linux', 'Scala', 'ETL', 'DWH', 'Greenplum',
+          'Apache Kafka', 'Pandas', 'Kubernetes', 'Java', 'MongoDB']
+
+
+def make_vacancy_docs(count, seed=0):
+    """
+    Генерирует синтетические документы вакансий в формате коллекции vacancy.
+
+    Параметры:
+        count (int): количество документов.
+        seed (int): зерно генератора случайных чисел.
+
+    Возвращает:
+        generator: документы вакансий.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        has_salary = rng.random() < 0.4
+        salary_from = rng.randint(500, 6000) if has_salary else float('nan')
+        key_skills = rng.sample(SKILLS, rng.randint(0, 10))
+        yield {
+            'id': str(i),
+            'vacancy_name': 'Data Engineer',
+            'employer': f'Employer {rng.randint(1, 2000)}',
+            'city': f'City {rng.randint(1, 300)}',
+            'salary_from': salary_from,
+            'salary_to': salary_from * 1.43 if has_salary else float('nan'),
+            'experience': rng.choice(EXPERIENCES),
+            'published_at': now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            'url': f'https://api.hh.ru/vacancies/{i}',
+            'key_skills': key_skills or float('nan'),
+            'skills': [skill.lower() for skill in key_skills] or None,
+            'schedule': 'remote',
+            'description': 'x' * rng.randint(500, 3000),
+            'country': rng.choice(COUNTRIES),
+            'language': None,
+            'language_level': None,
+        }
+
+
+def fill_collection(collection, count, batch_size=10000):
+    """
+    Пересоздает коллекцию и заполняет ее синтетическими вакансиями.
+
+    Параметры:
+        collection (Collection): коллекция MongoDB.
+        count (int): количество документов.
+        batch_size (int): размер пакета вставки.
+    """
+    collection.drop()
+    batch = []
+    for doc in make_vacancy_docs(count):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+
+
+def measure(source):
+    """
+    Замеряет время и пиковую память Python для одного способа получения данных.
+
+    Параметры:
+        source (str): 'raw' или 'aggregate'.
+
+    Возвращает:
+        dict: время в секундах и пиковая память в МБ.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    load_chart_data(BENCH_DB, BENCH_COLLECTION, source)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3), 'peak_mb': round(peak / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    client = get_mongo_client()
+    collection = client[BENCH_DB][BENCH_COLLECTION]
+    results = []
+    try:
+        for size in args.sizes:
+            fill_collection(collection, size)
+            for source in ['aggregate', 'raw']:
+                result = dict(size=size, source=source, **measure(source))
+                results.append(result)
+                print(f"{size:>9} {source:>10} {result['seconds']:>10.3f} s "
+                      f"{result['peak_mb']:>10.1f} MB")
+    finally:
+        client.drop_database(BENCH_DB)
+        close_mongo_client()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Бенчмарк очереди обогащения (data-processor/app/work_queue.py) с несколькими
+процессами-обработчиками.
+
+Описания вакансий отдает локальный mock-сервер hh.ru (см. hh_fixtures.py)
+с задержкой ответа --latency, очередь и общий ограничитель частоты
+запросов хранятся в локальном MongoDB (база vacancydb_bench). Для каждого
+количества обработчиков из --workers все вакансии ставятся в очередь одним
+заданием, запускаются процессы-обработчики и замеряется время до
+обработки всех пакетов (вместе с запуском процессов).
+
+С --kill-after первый обработчик принудительно завершается через
+указанное число секунд: его пакет возвращается в очередь по истечении
+аренды (--lease) и обрабатывается остальными.
+
+Пример:
+    MONGO_HOST=localhost python benchmarks/bench_work_queue.py --vacancies 2000 \\
+        --workers 1 2 4 --rate 100 --latency 0.05
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DB = 'vacancydb_bench'
+
+os.environ.setdefault('ENRICH_QUEUE_DB', BENCH_DB)
+os.environ.setdefault('ENRICH_QUEUE_POLL_SECONDS', '0.2')
+os.environ.setdefault('ARCHIVE_RESPONSES', 'false')
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'data-processor', 'app'))
+
+from db_connection import get_mongo_client, close_mongo_client  # noqa: E402
+from work_queue import (EnrichQueue, run_worker, RATE_LIMITS_COLLECTION,  # noqa: E402
+                        ENRICH_QUEUE_COLLECTION)
+from hh_fixtures import MockHHServer  # noqa: E402
+
+
+def worker_process(threads, rate, burst, lease, idle_exit):
+    """
+    Процесс-обработчик очереди: работает, пока очередь не пустует idle_exit секунд.
+    """
+    queue = EnrichQueue(db_name=BENCH_DB, rate=rate, burst=burst, lease_seconds=lease)
+    run_worker(queue, threads=threads, idle_exit=idle_exit)
+
+
+def run_workers(server, workers, args):
+    """
+    Обрабатывает все вакансии mock-сервера workers процессами.
+
+    Возвращает:
+        dict: время, пропускная способность и количество обогащенных вакансий.
+    """
+    db = get_mongo_client()[BENCH_DB]
+    db[ENRICH_QUEUE_COLLECTION].drop()
+    db[RATE_LIMITS_COLLECTION].drop()
+
+    queue = EnrichQueue(db_name=BENCH_DB, rate=args.rate, burst=args.burst,
+                        lease_seconds=args.lease)
+    items = [{'id': str(index), 'url': f'{server.url}/vacancies/{index}'}
+             for index in range(args.vacancies)]
+    job = f'bench-{workers}'
+    batches = queue.enqueue(job, items)
+
+    # Процессы запускаются через spawn: клиент MongoDB нельзя наследовать через fork
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=worker_process,
+                                 args=(args.threads, args.rate, args.burst, args.lease,
+                                       args.lease + 5))
+                 for _ in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    killed = False
+    while queue.job_pending(job):
+        if args.kill_after and not killed and time.perf_counter() - started >= args.kill_after:
+            processes[0].terminate()
+            killed = True
+            print(f'    обработчик {processes[0].pid} остановлен')
+        if not any(process.is_alive() for process in processes):
+            print('    все обработчики завершились, не обработав очередь')
+            break
+        time.sleep(0.1)
+    seconds = time.perf_counter() - started
+
+    for process in processes:
+        process.join()
+
+    results = queue.job_results(job)
+    enriched = sum(row is not None for row, _ in results.values())
+    result = {'workers': workers,
+              'batches': batches,
+              'seconds': round(seconds, 3),
+              'per_second': round(len(items) / seconds, 1),
+              'enriched': enriched}
+    print(f'    {workers:>3} обработчиков {seconds:>10.3f} s {result["per_second"]:>10} вак./с'
+          f' {enriched:>8} обогащено')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vacancies', type=int, default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help='потоки одного обработчика')
+    parser.add_argument('--rate', type=float, default=100,
+                        help='общее ограничение частоты запросов в секунду (0 - без ограничения)')
+    parser.add_argument('--burst', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='задержка ответа mock-сервера в секундах')
+    parser.add_argument('--lease', type=float, default=10, help='срок аренды пакета в секундах')
+    parser.add_argument('--kill-after', type=float, default=0,
+                        help='остановить первого обработчика через столько секунд')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    results = []
+    with MockHHServer(args.vacancies, latency=args.latency) as server:
+        print(f'{args.vacancies} вакансий, ограничение {args.rate} запросов/с:')
+        try:
+            for workers in args.workers:
+                results.append(run_workers(server, workers, args))
+        finally:
+            get_mongo_client().drop_database(BENCH_DB)
+            close_mongo_client()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'args': vars(args), 'results': results}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
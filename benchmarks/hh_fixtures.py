@@ -0,0 +1,292 @@
+"""
+Синтетические данные hh.ru для бенчмарков и локальный mock-сервер API.
+
+Вакансии не хранятся в памяти: страница поиска и описание вакансии
+строятся по номеру вакансии детерминированно (одно и то же зерно дает
+одни и те же данные), поэтому сервер одинаково быстро отдает и 1 тыс.,
+и 1 млн вакансий.
+
+Сервер отвечает на те же запросы, что и API hh.ru, которые использует
+data-processor:
+
+    GET /vacancies?text=...&page=...&per_page=...   страница поиска
+    GET /vacancies/<id>                              описание вакансии
+    GET /areas                                       каталог регионов
+
+Пример:
+    python benchmarks/hh_fixtures.py --vacancies 100000 --port 8081
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# hh.ru отдает не больше 2000 результатов на один поисковый запрос
+# (20 страниц по 100 вакансий), поэтому вакансии раскладываются
+# по нескольким запросам
+MAX_RESULTS_PER_QUERY = 2000
+QUERY_PREFIX = 'bench query '
+
+EXPERIENCES = ['Нет опыта', 'От 1 года до 3 лет', 'От 3 до 6 лет', 'Более 6 лет']
+CURRENCIES = ['RUR', 'RUR', 'RUR', 'USD', 'EUR', 'KZT', 'BYR', 'UZS']
+SCHEDULES = [('remote', 'Удаленная работа'), ('fullDay', 'Полный день'),
+             ('flexible', 'Гибкий график')]
+LANGUAGE_LEVELS = ['a2', 'b1', 'b2', 'c1']
+SKILLS = ['Python', 'SQL', 'Apache Spark', 'PySpark', 'Apache Airflow', 'Hadoop', 'Kafka',
+          'Apache Kafka', 'ClickHouse', 'PostgreSQL', 'Postgres', 'Docker', 'Git', 'Linux',
+          'Scala', 'ETL', 'DWH', 'Greenplum', 'Pandas', 'Kubernetes', 'k8s', 'Java',
+          'MongoDB', 'Power BI', 'Big Data', 'MS SQL', 'Airflow', 'dbt', 'Английский язык']
+
+# Курсы валют к доллару для фикстуры exchangerate-api
+CURRENCY_RATES = {'USD': 1, 'RUB': 92.5, 'EUR': 0.92, 'KZT': 450.0, 'BYN': 3.27,
+                  'UZS': 12500.0}
+
+
+def make_areas(countries=20, regions=30, cities=20, other_countries=40):
+    """
+    Строит каталог регионов в формате /areas: страны -> регионы -> города,
+    а также раздел "Другие регионы", в котором страны лежат на уровне регионов.
+
+    Параметры:
+        countries (int): количество стран (первая - Россия).
+        regions (int): количество регионов в стране.
+        cities (int): количество городов в регионе.
+        other_countries (int): количество стран в разделе "Другие регионы".
+
+    Возвращает:
+        list: каталог регионов.
+    """
+    catalog = []
+    for country in range(countries):
+        name = 'Россия' if country == 0 else f'Страна {country}'
+        catalog.append({
+            'id': str(country), 'name': name,
+            'areas': [{'id': f'{country}.{region}', 'name': f'{name} регион {region}',
+                       'areas': [{'id': f'{country}.{region}.{city}',
+                                  'name': f'{name} город {region}.{city}', 'areas': []}
+                                 for city in range(cities)]}
+                      for region in range(regions)],
+        })
+    catalog.append({'id': 'other', 'name': 'Другие регионы',
+                    'areas': [{'id': f'other.{country}', 'name': f'Другая страна {country}',
+                               'areas': []}
+                              for country in range(other_countries)]})
+    return catalog
+
+
+def area_names(catalog):
+    """
+    Возвращает названия всех городов и стран "Других регионов" каталога.
+    """
+    names = []
+    for country in catalog:
+        for region in country['areas']:
+            names.extend(city['name'] for city in region['areas'])
+            if not region['areas']:
+                names.append(region['name'])
+    return names
+
+
+def currency_rates_fixture(day=None):
+    """
+    Возвращает ответ exchangerate-api с курсами CURRENCY_RATES.
+    """
+    day = day or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    return {'base': 'USD', 'date': day, 'rates': CURRENCY_RATES}
+
+
+class SyntheticHH:
+    """
+    Генератор синтетических вакансий hh.ru.
+
+    Параметры:
+        vacancies (int): общее количество вакансий.
+        seed (int): зерно генератора.
+        days (int): вакансии публикуются равномерно за последние days дней.
+        base_url (str): адрес, который подставляется в url вакансий.
+    """
+
+    def __init__(self, vacancies, seed=0, days=120, base_url='http://127.0.0.1'):
+        self.vacancies = vacancies
+        self.seed = seed
+        self.days = days
+        self.base_url = base_url
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.areas = make_areas()
+        self.cities = area_names(self.areas)
+
+    @property
+    def queries(self):
+        """
+        Поисковые запросы, по которым находятся все вакансии.
+        """
+        count = max(1, math.ceil(self.vacancies / MAX_RESULTS_PER_QUERY))
+        return [f'{QUERY_PREFIX}{query}' for query in range(count)]
+
+    def _rng(self, index):
+        return random.Random(self.seed * 1_000_003 + index)
+
+    def search_item(self, index):
+        """
+        Возвращает вакансию index в формате результатов поиска.
+        """
+        rng = self._rng(index)
+        salary = None
+        if rng.random() < 0.45:
+            currency = rng.choice(CURRENCIES)
+            rate = CURRENCY_RATES.get({'RUR': 'RUB', 'BYR': 'BYN'}.get(currency, currency), 1)
+            salary_from = round(rng.randint(800, 6000) * rate, -2) if rng.random() < 0.8 else None
+            salary_to = round(rng.randint(1200, 9000) * rate, -2) if rng.random() < 0.6 else None
+            if salary_from and salary_to and salary_to < salary_from:
+                salary_from, salary_to = salary_to, salary_from
+            if salary_from or salary_to:
+                salary = {'from': salary_from, 'to': salary_to, 'currency': currency,
+                          'gross': rng.random() < 0.5}
+        published_at = self.now - timedelta(seconds=rng.randint(0, self.days * 24 * 60 * 60))
+        return {
+            'id': str(index),
+            'name': rng.choice(['Data Engineer', 'Senior Data Engineer', 'Дата инженер',
+                                'Data-engineer (Spark)']),
+            'employer': {'id': str(rng.randint(1, 5000)), 'name': f'Employer {rng.randint(1, 5000)}'},
+            'area': {'id': str(rng.randint(1, 100000)), 'name': rng.choice(self.cities)},
+            'salary': salary,
+            'experience': {'id': 'exp', 'name': rng.choice(EXPERIENCES)},
+            'published_at': published_at.strftime('%Y-%m-%dT%H:%M:%S+0000'),
+            'url': f'{self.base_url}/vacancies/{index}',
+        }
+
+    def vacancy_detail(self, index):
+        """
+        Возвращает полное описание вакансии index.
+        """
+        rng = self._rng(-index - 1)
+        item = self.search_item(index)
+        languages = []
+        if rng.random() < 0.4:
+            level = rng.choice(LANGUAGE_LEVELS)
+            languages = [{'id': 'eng', 'name': 'Английский',
+                          'level': {'id': level, 'name': level.upper()}}]
+        schedule_id, schedule_name = rng.choice(SCHEDULES)
+        return dict(item,
+                    key_skills=[{'name': skill}
+                                for skill in rng.sample(SKILLS, rng.randint(0, 12))],
+                    languages=languages,
+                    schedule={'id': schedule_id, 'name': schedule_name},
+                    description='<p>' + 'Описание вакансии. ' * rng.randint(20, 150) + '</p>')
+
+    def search_page(self, text, page, per_page):
+        """
+        Возвращает страницу результатов поиска по запросу text.
+        """
+        try:
+            query = int(text[len(QUERY_PREFIX):]) if text.startswith(QUERY_PREFIX) else -1
+        except ValueError:
+            query = -1
+        first = query * MAX_RESULTS_PER_QUERY
+        found = 0
+        if query >= 0:
+            found = max(0, min(MAX_RESULTS_PER_QUERY, self.vacancies - first))
+        start = first + page * per_page
+        stop = min(first + found, start + per_page)
+        return {'items': [self.search_item(index) for index in range(start, stop)],
+                'found': found,
+                'pages': math.ceil(found / per_page) if per_page else 0,
+                'page': page,
+                'per_page': per_page}
+
+
+class MockHHServer:
+    """
+    Локальный HTTP-сервер, отдающий данные SyntheticHH в формате API hh.ru.
+    Запускается в фоновом потоке, latency задает задержку ответа в секундах:
+
+        with MockHHServer(100000) as server:
+            collect_vacancies(..., base_url=server.url)
+    """
+
+    def __init__(self, vacancies, seed=0, host='127.0.0.1', port=0, latency=0):
+        self.latency = latency
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://{host}:{self.server.server_address[1]}'
+        self.data = SyntheticHH(vacancies, seed=seed, base_url=self.url)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if mock.latency:
+                    # Имитация времени ответа настоящего API
+                    time.sleep(mock.latency)
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                parts = parsed.path.strip('/').split('/')
+                if parts == ['vacancies']:
+                    body = mock.data.search_page(params.get('text', ''),
+                                                 int(params.get('page', 0)),
+                                                 int(params.get('per_page', 20)))
+                elif len(parts) == 2 and parts[0] == 'vacancies' and parts[1].isdigit() \
+                        and int(parts[1]) < mock.data.vacancies:
+                    body = mock.data.vacancy_detail(int(parts[1]))
+                elif parts == ['areas']:
+                    body = mock.data.areas
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vacancies', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    server = MockHHServer(args.vacancies, seed=args.seed, port=args.port)
+    print(f'Mock hh.ru API: {server.url} ({args.vacancies} вакансий, '
+          f'запросы: {QUERY_PREFIX}0 .. {QUERY_PREFIX}{len(server.data.queries) - 1})')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import socket
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+# Каталог архива необработанных ответов API
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'data/archive')
+# Сохранять ли ответы API в архив при сборе
+ARCHIVE_RESPONSES = os.getenv('ARCHIVE_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+
+# Виды записей архива: страницы поиска и полные описания вакансий
+SEARCH_PAGES = 'search'
+VACANCY_DETAILS = 'vacancy'
+
+
+class ResponseArchive:
+    """
+    Архив необработанных ответов API: сжатые gzip файлы JSON Lines,
+    разложенные по виду записи и дню получения ответа:
+
+        <root>/<kind>/dt=YYYY-MM-DD/part-<run_id>.jsonl.gz
+
+    Архив только дополняется: каждый запуск пишет в свои файлы, а старые
+    файлы не изменяются. Запись потокобезопасна.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, run_id=None):
+        self.root = root
+        # Имя хоста различает процессы разных контейнеров с общим каталогом архива
+        self.run_id = run_id or (datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+                                 + f'-{socket.gethostname()}-{os.getpid()}')
+        self.counts = {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def write(self, kind, record):
+        """
+        Добавляет запись в архив.
+
+        Параметры:
+            kind (str): вид записи (SEARCH_PAGES или VACANCY_DETAILS).
+            record (dict): запрос и ответ API. Время получения
+            добавляется в поле fetched_at.
+        """
+        fetched_at = datetime.now(timezone.utc)
+        line = json.dumps(dict(record, fetched_at=fetched_at.isoformat()), ensure_ascii=False)
+        day = fetched_at.strftime('%Y-%m-%d')
+        with self._lock:
+            file = self._files.get((kind, day))
+            if file is None:
+                directory = os.path.join(self.root, kind, f'dt={day}')
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f'part-{self.run_id}.jsonl.gz')
+                file = gzip.open(path, 'at', encoding='utf-8')
+                self._files[(kind, day)] = file
+            file.write(line + '\n')
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def close(self):
+        """
+        Дописывает и закрывает файлы архива.
+        """
+        with self._lock:
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+        if self.counts:
+            logging.info(f'Ответов API сохранено в архив: {self.counts}')
+
+
+def archive_days(date_from, date_to):
+    """
+    Возвращает дни с date_from по date_to включительно.
+
+    Параметры:
+        date_from (date): первый день.
+        date_to (date): последний день.
+
+    Возвращает:
+        list: дни в формате 'YYYY-MM-DD'.
+    """
+    days = []
+    day = date_from
+    while day <= date_to:
+        days.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    return days
+
+
+def read_archive(kind, date_from, date_to, root=ARCHIVE_DIR):
+    """
+    Читает записи архива за дни с date_from по date_to включительно
+    в порядке их получения по дням и запускам.
+
+    Файл, оборванный при аварийном завершении запуска, читается
+    до места обрыва.
+
+    Параметры:
+        kind (str): вид записи (SEARCH_PAGES или VACANCY_DETAILS).
+        date_from (date): первый день.
+        date_to (date): последний день.
+        root (str): каталог архива.
+
+    Возвращает:
+        generator: записи архива (dict).
+    """
+    for day in archive_days(date_from, date_to):
+        for path in sorted(glob.glob(os.path.join(root, kind, f'dt={day}', '*.jsonl.gz'))):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as file:
+                    for line in file:
+                        yield json.loads(line)
+            except (EOFError, OSError, zlib.error, json.JSONDecodeError) as e:
+                logging.warning(f'Файл архива {path} прочитан не полностью: {e}')
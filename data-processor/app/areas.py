@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import time
+import requests
+from http_client import timed_get
+
+HH_AREAS_URL = os.getenv('HH_AREAS_URL', 'https://api.hh.ru/areas')
+# Файл с сохраненным каталогом регионов hh.ru и интервал его обновления (в днях)
+AREAS_CACHE_PATH = os.getenv('AREAS_CACHE_PATH', 'data/areas.json')
+AREAS_REFRESH_DAYS = float(os.getenv('AREAS_REFRESH_DAYS', '7'))
+
+# Страна для городов, которых нет в каталоге
+COUNTRY_NOT_FOUND = 'Страна не найдена'
+# Раздел каталога, в котором страны лежат на уровне регионов
+OTHER_REGIONS = 'Другие регионы'
+
+
+def download_areas(url=HH_AREAS_URL):
+    """
+    Загружает каталог регионов из API HeadHunter.
+
+    Возвращает:
+        list: Каталог стран, регионов и городов в формате JSON.
+    """
+    response = timed_get(requests, 'areas', url, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_city_country_catalog(path=AREAS_CACHE_PATH, refresh_days=AREAS_REFRESH_DAYS):
+    """
+    Возвращает каталог регионов hh.ru, сохраненный на диске.
+
+    Каталог меняется редко, поэтому заново он загружается, только если
+    файла нет или он старше refresh_days. Если загрузить каталог
+    не удалось, используется устаревший файл.
+
+    Параметры:
+        path (str): путь к файлу с каталогом.
+        refresh_days (float): интервал обновления каталога в днях.
+
+    Возвращает:
+        list: Каталог стран, регионов и городов в формате JSON.
+    """
+    exists = os.path.exists(path)
+    if exists and time.time() - os.path.getmtime(path) < refresh_days * 24 * 60 * 60:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    try:
+        catalog = download_areas()
+    except requests.RequestException as e:
+        if not exists:
+            raise
+        logging.warning(f'Не удалось обновить каталог регионов, используется сохраненный: {e}')
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(catalog, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logging.info(f'Каталог регионов обновлен: {path}')
+    return catalog
+
+
+def iter_area_names(area):
+    """
+    Обходит регион и все вложенные в него регионы без рекурсии.
+
+    Параметры:
+        area (dict): регион в формате API hh.ru.
+
+    Возвращает:
+        generator: названия региона и всех вложенных регионов.
+    """
+    stack = [area]
+    while stack:
+        node = stack.pop()
+        yield node['name']
+        stack.extend(node.get('areas', []))
+
+
+def build_city_country_index(city_country_catalog):
+    """
+    Строит плоский индекс город -> страна по каталогу регионов.
+
+    Если название встречается в нескольких странах, остается первая
+    по порядку каталога страна. В разделе "Другие регионы" страны
+    лежат на уровне регионов, поэтому страной считается сам регион.
+
+    Параметры:
+        city_country_catalog (list): каталог регионов из API HeadHunter.
+
+    Возвращает:
+        dict: название города (региона) -> название страны.
+    """
+    index = {}
+    for country in city_country_catalog:
+        if country['name'] == OTHER_REGIONS:
+            countries = country.get('areas', [])
+        else:
+            countries = [country]
+        for area in countries:
+            for name in iter_area_names(area):
+                index.setdefault(name, area['name'])
+    return index
+
+
+def resolve_countries(cities, index):
+    """
+    Определяет страны для колонки городов.
+
+    Индекс применяется к уникальным городам, а результат
+    разносится по всем строкам.
+
+    Параметры:
+        cities (pd.Series): названия городов.
+        index (dict): индекс город -> страна (см. build_city_country_index).
+
+    Возвращает:
+        pd.Series: названия стран.
+    """
+    # У категорий недостающее значение нельзя заполнить строкой не из
+    # категорий, поэтому города приводятся к строкам
+    cities = cities.astype(object)
+    unique_cities = cities.dropna().unique()
+    countries = {city: index.get(city, COUNTRY_NOT_FOUND) for city in unique_cities}
+    return cities.map(countries).fillna(COUNTRY_NOT_FOUND)
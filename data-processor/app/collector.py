@@ -0,0 +1,132 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from tqdm import tqdm
+from http_client import TokenBucket, create_session, timed_get
+from archive import SEARCH_PAGES
+
+# Адрес API hh.ru. Для тестов можно указать адрес локального mock-сервера.
+HH_API_URL = os.getenv('HH_API_URL', 'https://api.hh.ru')
+# Количество потоков, одновременно запрашивающих страницы поиска
+COLLECT_WORKERS = int(os.getenv('COLLECT_WORKERS', '4'))
+# Ограничение частоты запросов к API (запросов в секунду) и размер пачки
+HH_RATE_LIMIT = float(os.getenv('HH_RATE_LIMIT', '2'))
+HH_RATE_BURST = float(os.getenv('HH_RATE_BURST', '4'))
+
+
+def fetch_search_page(session, bucket, text, page, per_page, search_params, base_url=None,
+                      archive=None):
+    """
+    Запрашивает одну страницу результатов поиска вакансий.
+
+    Параметры:
+        session (requests.Session): HTTP-сессия.
+        bucket (TokenBucket): ограничитель частоты запросов.
+        text (str): поисковый запрос.
+        page (int): номер страницы (с нуля).
+        per_page (int): количество вакансий на страницу.
+        search_params (dict): дополнительные параметры поиска (например, period).
+        base_url (str): адрес API, по умолчанию HH_API_URL.
+        archive (ResponseArchive): архив, в который сохраняется ответ, необязательный.
+
+    Возвращает:
+        dict: JSON-ответ API. Если запрос не удался - пустой словарь.
+    """
+    request_params = {
+        'text': f'{text}',
+        'page': page,
+        'per_page': per_page,
+        'only_with_salary': 'false',
+    }
+    request_params.update(search_params)
+
+    bucket.acquire()
+    logging.info(f'Обработка страницы {page + 1} для {text}')
+    try:
+        response = timed_get(session, 'search', f'{base_url or HH_API_URL}/vacancies',
+                             params=request_params,
+                             timeout=60)
+        if response.status_code != 200:
+            logging.warning(f'Страница {page + 1} для {text}: '
+                            f'код ответа {response.status_code}')
+            return {}
+        data = response.json()
+        if archive is not None:
+            archive.write(SEARCH_PAGES, {'text': text, 'params': request_params, 'response': data})
+        return data
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f'Ошибка при загрузке страницы {page + 1} для {text} | Ошибка: {e}')
+        return {}
+
+
+def collect_vacancies(vacancies, pages, per_page, search_params,
+                      workers=COLLECT_WORKERS, rate=HH_RATE_LIMIT, burst=HH_RATE_BURST,
+                      base_url=None, session=None, archive=None):
+    """
+    Параллельно собирает результаты поиска по всем запросам.
+
+    Сначала для каждого запроса загружается первая страница. По полям
+    'found' и 'pages' из ее ответа определяется, сколько страниц на самом
+    деле есть, и только они загружаются дальше. Все запросы проходят через
+    общий ограничитель частоты, вместо фиксированных пауз.
+
+    Параметры:
+        vacancies (list): список поисковых запросов.
+        pages (int): максимальное количество страниц на один запрос.
+        per_page (int): количество вакансий на страницу (<=100).
+        search_params (dict): дополнительные параметры поиска.
+        workers (int): количество потоков.
+        rate (float): ограничение частоты запросов в секунду.
+        burst (float): максимальное количество запросов подряд без ожидания.
+        base_url (str): адрес API, по умолчанию HH_API_URL.
+        session (requests.Session): HTTP-сессия. Если не передана, создается новая.
+        archive (ResponseArchive): архив для необработанных страниц поиска, необязательный.
+
+    Возвращает:
+        list: список json-объектов вакансий в порядке запросов и страниц.
+    """
+    bucket = TokenBucket(rate, burst)
+    own_session = session is None
+    if own_session:
+        session = create_session(workers)
+
+    results = {}
+
+    def fetch(text, page):
+        return fetch_search_page(session, bucket, text, page, per_page,
+                                 search_params, base_url, archive)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Первые страницы всех запросов
+            first_pages = {executor.submit(fetch, text, 0): text for text in vacancies}
+            rest_pages = {}
+            for future in tqdm(as_completed(first_pages), total=len(first_pages),
+                               desc='Обработка вакансий'):
+                text = first_pages[future]
+                req = future.result()
+                results[(text, 0)] = req.get('items', [])
+
+                # Сколько страниц действительно доступно
+                total_pages = min(pages, req.get('pages', 0))
+                logging.info(f'По запросу {text} найдено {req.get("found", 0)} вакансий, '
+                             f'страниц к загрузке: {total_pages}')
+                for page in range(1, total_pages):
+                    rest_pages[executor.submit(fetch, text, page)] = (text, page)
+
+            # Оставшиеся страницы
+            for future in tqdm(as_completed(rest_pages), total=len(rest_pages),
+                               desc='Загрузка страниц'):
+                results[rest_pages[future]] = future.result().get('items', [])
+    finally:
+        if own_session:
+            session.close()
+
+    res = []
+    for text in vacancies:
+        page = 0
+        while (text, page) in results:
+            res.extend(results[(text, page)])
+            page += 1
+    return res
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import requests
+from http_client import timed_get
+
+# API курсов валют к доллару
+CURRENCY_API_URL = os.getenv('CURRENCY_API_URL', 'https://api.exchangerate-api.com/v4/latest/USD')
+# Файл с историей курсов {день: {валюта: курс}}
+CURRENCY_RATES_PATH = os.getenv('CURRENCY_RATES_PATH', 'data/currency_rates.json')
+# Сколько дней истории курсов хранить
+CURRENCY_HISTORY_DAYS = int(os.getenv('CURRENCY_HISTORY_DAYS', '365'))
+# Файл с ответом API (например, для тестов) - если задан, сеть не используется
+CURRENCY_RATES_FIXTURE = os.getenv('CURRENCY_RATES_FIXTURE')
+
+# Устаревшие коды валют hh.ru -> коды ISO 4217
+CURRENCY_CODES = {'RUR': 'RUB', 'BYR': 'BYN'}
+
+
+def fetch_latest_rates(url=CURRENCY_API_URL, fixture=CURRENCY_RATES_FIXTURE):
+    """
+    Загружает актуальные курсы валют по отношению к доллару.
+
+    Параметры:
+        url (str): адрес API курсов валют.
+        fixture (str): файл с сохраненным ответом API. Если задан,
+        курсы читаются из него, а не из сети.
+
+    Возвращает:
+        tuple: (день курсов в формате 'YYYY-MM-DD', словарь валюта -> курс).
+    """
+    if fixture:
+        with open(fixture, encoding='utf-8') as file:
+            response_data = json.load(file)
+    else:
+        response = timed_get(requests, 'currency', url, timeout=30)
+        response.raise_for_status()  # Вызываем исключение, если запрос не удался
+        response_data = response.json()
+
+    day = response_data.get('date') or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    return day, response_data.get('rates', {})
+
+
+def load_history(path=CURRENCY_RATES_PATH):
+    """
+    Читает сохраненную историю курсов валют.
+
+    Возвращает:
+        dict: день -> словарь валюта -> курс. Пустой, если истории нет.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_history(history, path=CURRENCY_RATES_PATH, keep_days=CURRENCY_HISTORY_DAYS):
+    """
+    Сохраняет историю курсов валют, удаляя дни старше keep_days.
+
+    Параметры:
+        history (dict): день -> словарь валюта -> курс.
+        path (str): путь к файлу истории.
+        keep_days (int): сколько дней истории хранить.
+    """
+    first_day = (datetime.now(timezone.utc) - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+    history = {day: rates for day, rates in history.items() if day >= first_day}
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(history, file, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def get_rates_history(path=CURRENCY_RATES_PATH):
+    """
+    Возвращает историю курсов валют, дополненную курсами за сегодня.
+
+    Курсы загружаются не чаще раза в день: если курсы за сегодня уже
+    сохранены, API не вызывается. Если API недоступен, используется
+    последний сохраненный снимок курсов.
+
+    Параметры:
+        path (str): путь к файлу истории.
+
+    Возвращает:
+        dict: день -> словарь валюта -> курс.
+
+    Исключения:
+        RuntimeError: курсы не удалось загрузить и сохраненных курсов нет.
+    """
+    history = load_history(path)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    if today in history:
+        return history
+
+    try:
+        day, rates = fetch_latest_rates()
+    except (requests.RequestException, OSError, ValueError) as e:
+        if not history:
+            raise RuntimeError(f'Не удалось получить курсы валют: {e}') from e
+        logging.warning(f'Не удалось обновить курсы валют, используются курсы '
+                        f'за {max(history)}: {e}')
+        return history
+
+    history[day] = rates
+    save_history(history, path)
+    logging.info(f'Курсы валют за {day} сохранены')
+    return history
+
+
+def convert_to_usd(df, history, columns=('salary_from', 'salary_to'),
+                   currency_column='salary.currency', date_column='published_at'):
+    """
+    Переводит зарплаты в доллары по курсу на день публикации вакансии.
+
+    Для каждой вакансии берется последний снимок курсов не позже дня
+    публикации (или самый ранний снимок, если вакансия старше истории).
+    Курсы подставляются одним map по паре (день, валюта), после чего
+    колонки делятся на курс целиком.
+
+    Параметры:
+        df (pd.DataFrame): вакансии.
+        history (dict): история курсов (см. get_rates_history).
+        columns (tuple): колонки с суммами в исходной валюте.
+        currency_column (str): колонка с кодом валюты.
+        date_column (str): колонка с датой публикации.
+
+    Возвращает:
+        pd.DataFrame: вакансии с суммами в долларах.
+    """
+    # Коды валют могут храниться категориями; для сопоставления с курсами нужны строки
+    currency = df[currency_column].astype(object).replace(CURRENCY_CODES)
+
+    days = sorted(history)
+    rates = pd.DataFrame.from_dict(history, orient='index').sort_index().stack()
+
+    published_day = pd.to_datetime(df[date_column], utc=True).dt.strftime('%Y-%m-%d')
+    position = np.searchsorted(days, published_day.fillna(days[-1]).to_numpy(), side='right') - 1
+    rate_day = np.asarray(days)[np.clip(position, 0, len(days) - 1)]
+
+    rate = pd.Series(rates.reindex(pd.MultiIndex.from_arrays([rate_day, currency])).to_numpy(),
+                     index=df.index)
+    rate[currency == 'USD'] = 1
+
+    unknown = currency.notnull() & rate.isnull()
+    if unknown.any():
+        logging.warning(f'Нет курса для валют {sorted(currency[unknown].unique())}, '
+                        f'зарплаты таких вакансий не учитываются')
+
+    df = df.copy()
+    for column in columns:
+        df[column] = df[column] / rate
+    return df
@@ -1,15 +1,29 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import argparse
 import logging
-import json
-import time
+import os
 import warnings
-import requests
-from tqdm import tqdm
+from datetime import date, timedelta
 import pandas as pd
-import numpy as np
-from db_connection import load_data_to_mongo, create_db_and_collection
+from db_connection import get_mongo_client, load_data_to_mongo, create_db_and_collection
+from collector import collect_vacancies
+from enrichment import (enrich_vacancies, extract_vacancy_features, fit_feature_row,
+                        FEATURE_COLUMNS)
+from enrichment_cache import EnrichmentCache, ENRICH_CACHE_TTL_DAYS
+from work_queue import EnrichQueue, ENRICH_QUEUE
+from watermark import get_search_params, save_watermark
+from currency import get_rates_history, convert_to_usd
+from areas import get_city_country_catalog, build_city_country_index, resolve_countries
+from vacancy_stats import refresh_stats
+from skills import normalize_skills
+from archive import (ResponseArchive, read_archive, ARCHIVE_RESPONSES,
+                     SEARCH_PAGES, VACANCY_DETAILS)
+from pipeline import (Pipeline, remove_stale_runs, CHECKPOINT_DIR, PIPELINE_CHECKPOINTS,
+                      PIPELINE_RESUME)
+from schema import apply_schema, to_records
+from metrics import metrics
 
 warnings.filterwarnings('ignore')
 
@@ -19,70 +33,51 @@ warnings.filterwarnings('ignore')
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-res = []
-
 NUM_PAGES = 20 # количество страниц для сбора информации
 PAGINATION = 100 # количество вакансий на страницу <=100
-LAST_N_DAYS = 3 # количество последних дней в рамках которых мы ищем вакансии
+LAST_N_DAYS = 3 # количество последних дней в рамках которых мы ищем вакансии,
+                # если сбор запускается впервые (дальше - с отметки сборщика)
+
+# Режим повторной обработки: вместо обращения к hh.ru стадии сбора и
+# обогащения читают ответы API из архива за дни с REPLAY_FROM по REPLAY_TO
+# (YYYY-MM-DD, включительно; REPLAY_TO по умолчанию - сегодня)
+REPLAY_FROM = os.getenv('REPLAY_FROM')
+REPLAY_TO = os.getenv('REPLAY_TO')
 
-def get_vacancy(vacancies, pages=NUM_PAGES):
+# Необработанные ответы API сохраняются в архив, чтобы изменения
+# в обработке можно было применить без повторного сбора
+archive = ResponseArchive() if ARCHIVE_RESPONSES and not REPLAY_FROM else None
+
+def get_vacancy(vacancies, search_params, pages=NUM_PAGES, archive=None):
     """
     Функция возвращает список json-объектов, содержащих информацию 
     о вакансиях, найденных по ключевым словам на сайте hh.ru.
 
+    Страницы загружаются параллельно (см. collector.collect_vacancies),
+    частота запросов ограничивается общим token bucket, а загрузка страниц
+    прекращается, как только API сообщает, что результатов больше нет.
+
     Параметры:
         vacancies (list): список вакансий для поиска.
+        search_params (dict): окно поиска (period или date_from).
         pages : количество страниц для поиска.
+        archive: архив для необработанных ответов API, необязательный.
 
     Возвращает:
         список json-объектов.
     """
-    for vacancy in tqdm(vacancies, desc="Обработка вакансий"): # Прогресс бар
-        logging.info(f'Начало получения информации по вакансии: {vacancy}')
-        time.sleep(5)
-        
-        for page in tqdm(range(pages), desc=f'Загрузка страниц для {vacancy}'):
-            logging.info(f'Обработка страницы {page + 1} для {vacancy}')
-            request_params  = {
-                     'text': f'{vacancy}',
-                     'page': page,
-                     'per_page': PAGINATION,
-                     'only_with_salary': 'false',
-                     'period': LAST_N_DAYS
-                     }
-            req = requests.get('https://api.hh.ru/vacancies',
-                               params=request_params,
-                               timeout=60
-                              ).json()
-            # print(pd.json_normalize(req))
-            if 'items' in req.keys():
-                res.extend(req['items'])
-                # print(pd.json_normalize(req['items']))
-            time.sleep(1)
-        logging.info(f'Завершение обработки вакансии: {vacancy}')    
+    return collect_vacancies(vacancies,
+                             pages=pages,
+                             per_page=PAGINATION,
+                             search_params=search_params,
+                             archive=archive)
 
 vacancy_list = ['NAME:"data engineer"',
-             'NAME:"data-engineer"'
+             'NAME:"data-engineer"',
              'NAME:"дата инженер"',
              'NAME:"дата-инженер"'
             ]
 
-get_vacancy(vacancy_list)
-
-
-data = pd.json_normalize(res)
-
-# Сохранение сырых данных
-data.to_csv('initial_data.csv', index=False)
-
-df_test = pd.read_csv("initial_data.csv")
-
-
-# ОБОГОАЩЕНИЕ НОВЫМИ ДАННЫМИ
-
-
-df = pd.read_csv("initial_data.csv")
-
 # Колонки для дальнейшей работы
 columns = ['name',
            'employer.name',
@@ -96,390 +91,328 @@ columns = ['name',
            'id'
            ]
 
-df = df[columns]
 
-def reach_vacancy(url):
+def collect(_, queries=None):
     """
-    Функция извлекает информацию о вакансии из предоставленного URL
-    такую как ключевые данные о вакансии, такие как навыки, языки,
-    график работы и описание. Данные извлекаются из JSON-ответа.
+    Стадия сбора: находит новые вакансии на hh.ru и оставляет только
+    нужные для дальнейшей работы колонки.
 
     Параметры:
-        url (str): URL адрес вакансии, откуда будут извлекаться данные.
- 
+        queries (list): поисковые запросы, по умолчанию все из vacancy_list.
+        При сборе по частям каждая часть получает свои запросы.
+
     Возвращает:
-        list : список, из 4х элементов, который содержит (по порядку):
-        - key_skills
-        - languages
-        - schedule
-        - description
-        
-    Примечание:
-    Функция использует задержку в 0.5 секунды перед отправкой запроса,
-    чтобы избежать капчи.
-    """
-    logging.info(f'Начало обогащения данных для URL: {url}')
-    feature_list = []
-    try:
-        time.sleep(0.5)  # Задержка для избежания капчи
-        req = requests.get(url, timeout=60).json()
-        if 'key_skills' in req:
-            feature_list.append(req['key_skills'])
-        else:
-            feature_list.append(None)
+        pd.DataFrame: найденные вакансии.
+    """
+    queries = vacancy_list if queries is None else queries
+    if not queries:
+        # Часть сбора без запросов - ошибка разбиения (--parts больше, чем
+        # запросов), а не отсутствие новых вакансий
+        raise ValueError('Нет поисковых запросов для сбора')
 
-        if 'languages' in req:
-            feature_list.append(req['languages'])
-        else:
-            feature_list.append(None)
+    # Собираем только вакансии, опубликованные после прошлого запуска.
+    # Отметка сдвигается только стадией load, поэтому все части сбора
+    # одного запуска ищут в одном и том же окне
+    search_params = get_search_params('vacancydb', default_days=LAST_N_DAYS)
 
-        if 'schedule' in req:
-            feature_list.append(req['schedule'])
-        else:
-            feature_list.append(None)
+    res = get_vacancy(queries, search_params, archive=archive)
 
-        if 'description' in req:
-            feature_list.append(req['description'])
-        else:
-            feature_list.append(None)
+    if not res:
+        logging.info('Новых вакансий не найдено')
+        return pd.DataFrame(columns=columns)
 
-        logging.info(f'Успешно извлечена информация для URL: {url}')
+    return pd.json_normalize(res).reindex(columns=columns)
 
-    except Exception as e:
-        logging.error(f'Ошибка при извлечении данных для URL: {url} | Ошибка: {e}')
-        feature_list = [None, None, None, None]  # Возвращаем список с None, если произошла ошибка
 
-    return feature_list
+def replay_period():
+    """
+    Возвращает период повторной обработки из REPLAY_FROM и REPLAY_TO.
 
-df['reached_skills'] = df['url'].apply(reach_vacancy)
+    Возвращает:
+        tuple: (первый день, последний день).
+    """
+    date_to = date.fromisoformat(REPLAY_TO) if REPLAY_TO else date.today()
+    return date.fromisoformat(REPLAY_FROM), date_to
 
-df['key_skills'] = df['reached_skills'].apply(lambda x: x[0])
-df['languages'] = df['reached_skills'].apply(lambda x: x[1])
-df['schedule'] = df['reached_skills'].apply(lambda x: x[2])
-df['description'] = df['reached_skills'].apply(lambda x: x[3])
 
-# Удаление столбца reached_skills
-df = df.drop(['reached_skills'], axis=1)
+def replay_collect(_):
+    """
+    Стадия сбора в режиме повторной обработки: берет результаты поиска
+    из архива. Если вакансия встречается в архиве несколько раз,
+    остается последняя версия.
 
-df.to_csv('reached_data.csv', index=False)
+    Возвращает:
+        pd.DataFrame: вакансии из архива.
+    """
+    date_from, date_to = replay_period()
+    res = [item
+           for record in read_archive(SEARCH_PAGES, date_from, date_to)
+           for item in record['response'].get('items', [])]
+    logging.info(f'Из архива за {date_from} - {date_to} прочитано вакансий: {len(res)}')
 
+    if not res:
+        return pd.DataFrame(columns=columns)
 
-# ОБРАБОТКА ДАННЫХ
+    df = pd.json_normalize(res).reindex(columns=columns)
+    return df.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
 
 
-df = pd.read_csv("reached_data.csv")
+# ОБОГОАЩЕНИЕ НОВЫМИ ДАННЫМИ
+
 
-df.rename(columns = {'salary.from':'salary_from',
-                     'salary.to':'salary_to',
-                     'area.name':'city',
-                     'employer.name':'employer',
-                     'experience.name':'experience',
-                     'name':'vacancy_name'
-                    }, inplace = True )
+def enrich(df):
+    """
+    Стадия обогащения: добавляет к вакансиям ключевые навыки, языки
+    и график работы из полного описания вакансии.
 
+    Параметры:
+        df (pd.DataFrame): результат стадии сбора.
 
-# Колонка id
+    Возвращает:
+        pd.DataFrame: вакансии с колонками key_skills, languages, schedule.
+    """
+    # Параллельная загрузка полных описаний вакансий с ограничением частоты
+    # запросов и повторами при ошибках (см. enrichment.enrich_vacancies).
+    # Уже загруженные и не изменившиеся вакансии берутся из локального кэша.
+    # С ENRICH_QUEUE=true остальные вакансии загружаются через очередь
+    # в MongoDB вместе с обработчиками work_queue.py из других контейнеров.
+    enrichment_cache = EnrichmentCache()
+    enrichment_cache.evict_expired()
+    queue = EnrichQueue() if ENRICH_QUEUE else None
+    features, enrich_statuses = enrich_vacancies(df, cache=enrichment_cache, archive=archive,
+                                                 queue=queue)
+    enrichment_cache.close()
+    record_enrich_failures(enrich_statuses)
+    df[FEATURE_COLUMNS] = features
+    return df
+
+
+def record_enrich_failures(statuses):
+    """
+    Записывает в лог и в сводку запуска вакансии, описания которых
+    не удалось загрузить, с кодом ответа и количеством попыток.
 
+    Параметры:
+        statuses (pd.DataFrame): статусы запросов из enrich_vacancies.
+    """
+    failed = statuses[~statuses['status'].isin([200, 'cache'])]
+    failures = []
+    for row in failed.itertuples(index=False):
+        status = None if pd.isna(row.status) else str(row.status)
+        logging.warning(f'Описание вакансии не загружено: {row.url} | статус: {status}, '
+                        f'попыток: {row.attempts}, ошибка: {row.error}')
+        failures.append({'url': row.url, 'status': status,
+                         'attempts': int(row.attempts), 'error': row.error})
+    metrics.record_failures('enrich', failures)
+
+
+def replay_enrich(df):
+    """
+    Стадия обогащения в режиме повторной обработки: берет полные описания
+    вакансий из архива, без обращения к сети.
 
-# Удаление дубликатов по id
-df = df.drop_duplicates(subset='id')
+    Описание вакансии, взятой из кэша обогащения, в день сбора в архив
+    не попадает, поэтому описания ищутся и в более ранних днях (в пределах
+    срока жизни кэша), а затем в самом кэше.
 
-# Удаление колонки id
-df = df.drop(['id'], axis=1)
+    Параметры:
+        df (pd.DataFrame): результат стадии сбора.
 
+    Возвращает:
+        pd.DataFrame: вакансии с колонками key_skills, languages, schedule.
+    """
+    date_from, date_to = replay_period()
+    details = {record['url']: record['response']
+               for record in read_archive(VACANCY_DETAILS,
+                                          date_from - timedelta(days=ENRICH_CACHE_TTL_DAYS),
+                                          date_to)}
+
+    rows = {index: extract_vacancy_features(details[url])
+            for index, url in df['url'].items() if url in details}
+
+    missing = df.index.difference(list(rows))
+    if len(missing):
+        enrichment_cache = EnrichmentCache()
+        keys = dict(zip(missing, zip(df.loc[missing, 'id'], df.loc[missing, 'published_at'])))
+        cached = enrichment_cache.get_many(list(keys.values()))
+        enrichment_cache.close()
+        rows.update({index: fit_feature_row(cached[key])
+                     for index, key in keys.items() if key in cached})
+
+    logging.info(f'Описания вакансий: из архива {len(df) - len(missing)}, '
+                 f'из кэша {len(rows) - len(df) + len(missing)}, '
+                 f'не найдено {len(df) - len(rows)}')
+    df[FEATURE_COLUMNS] = pd.DataFrame([rows.get(index, [None] * len(FEATURE_COLUMNS))
+                                        for index in df.index],
+                                       columns=FEATURE_COLUMNS, index=df.index)
+    return df
 
-# Колонка salary
+
+# ОБРАБОТКА ДАННЫХ
 
 
 # Медианная разница между верхней и нижней границей зарплатной вилки,
 # посчитанная отдельно.
 MEDIAN_DIF = 0.43
 
-# Заполним значения salary_to когда есть salary_from но нет
-# salary_to, используя полученное медианное значение разницы
-# в зарплатной вилке.
-condition_sal_from = df.salary_from.notnull() & df.salary_to.isnull()
-df.loc[condition_sal_from, 'salary_to'] = (
-                                            df.salary_from[condition_sal_from]
-                                          ) * (MEDIAN_DIF) + (df.salary_from[condition_sal_from])
 
-# Заполним значения salary_from когда нет salary_from но есть
-# salary_to, используя полученное медианное значение разницы
-# в зарплатной вилке.
-condition_sal_to = df.salary_from.isnull() & df.salary_to.notnull()
-df.loc[condition_sal_to, 'salary_from'] = (df.salary_to[condition_sal_to])/(1+MEDIAN_DIF)
+def normalize(df):
+    """
+    Стадия обработки: приводит названия колонок к единому виду, удаляет
+    дубликаты, заполняет зарплатную вилку и переводит зарплаты в доллары.
 
-# Смена кодировки валют на международную
-df.loc[(df['salary.currency'] == 'RUR'), 'salary.currency'] = 'RUB'
-df.loc[(df['salary.currency'] == 'BYR'), 'salary.currency'] = 'BYN'
+    Параметры:
+        df (pd.DataFrame): результат стадии обогащения.
 
-currency_list = list(df['salary.currency'].unique())
+    Возвращает:
+        pd.DataFrame: обработанные вакансии.
+    """
+    df = df.rename(columns = {'salary.from':'salary_from',
+                              'salary.to':'salary_to',
+                              'area.name':'city',
+                              'employer.name':'employer',
+                              'experience.name':'experience',
+                              'name':'vacancy_name'
+                             })
 
-# Удаление nan из списка currency_list
-currency_list = [x for x in currency_list if not (isinstance(x, float) and np.isnan(x))]
 
-# Удалим USD так как все валюты будем приводить к нему
-if 'USD' in currency_list:
-    currency_list.remove('USD')
+    # Колонка id
 
-# Достанем актуальные крусы валют
-def get_currency_rates(currency_codes):
-    """
-    Функция извлекает актуальные курсы валют по отношению к доллару с помощью API.
-    
-    Аргументы:
-    currency_codes (list): Список валютных кодов, для которых необходимо получить курсы.
-    
-    Возвращает:
-    dict: Словарь, где ключами являются валютные коды из currency_codes, а 
-          значениями - соответствующие курсы. В случае возникновения 
-          ошибки при выполнении запроса к API возвращает строку с сообщением об ошибке.
-    """
-    # API URL для получения текущих курсов валют
-    api_url = "https://api.exchangerate-api.com/v4/latest/USD"
 
-    try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()  # Вызываем исключение, если запрос не удался
-        response_data = response.json()
+    # Удаление дубликатов по id. Сама колонка остается: по ней
+    # вакансии обновляются в MongoDB без создания дублей.
+    df = df.drop_duplicates(subset='id')
 
-        # Извлекаем курсы валют
-        rates = response_data.get('rates', {})
 
-        # Получаем курсы для указанных валют
-        cur_rates = {currency: rates.get(currency, 'Not Found') for currency in currency_codes}
+    # Колонка published_at
 
-        return cur_rates
 
-    except requests.RequestException as e:
-        return str(e)
+    # Дата публикации сохраняется в MongoDB как дата, а не строка:
+    # по ней строится индекс и удаляются устаревшие записи
+    df['published_at'] = pd.to_datetime(df['published_at'], utc=True)
 
-currency_rates = get_currency_rates(currency_list)
 
-# Приведем все валюты к доллару
-for i in currency_list:
-    mask_cur = (df['salary.currency'] == i)
-    df.loc[mask_cur, 'salary_from'] /= currency_rates[i]
-    df.loc[mask_cur, 'salary_to'] /= currency_rates[i]
+    # Колонка salary
 
-# Столбец salary.currency больше не нужен, удалим его.
-df = df.drop(['salary.currency'], axis=1)
 
-# Округлим полученные знаяения
-mask_astype_from = df.salary_from.notnull()
-mask_astype_to = df.salary_to.notnull()
-df.loc[mask_astype_from, 'salary_from'] = df.loc[mask_astype_from, 'salary_from'].astype('int64')
-df.loc[mask_astype_to, 'salary_to'] = df.loc[mask_astype_to, 'salary_to'].astype('int64')
+    # Заполним значения salary_to когда есть salary_from но нет
+    # salary_to, используя полученное медианное значение разницы
+    # в зарплатной вилке.
+    condition_sal_from = df.salary_from.notnull() & df.salary_to.isnull()
+    df.loc[condition_sal_from, 'salary_to'] = (
+                                                df.salary_from[condition_sal_from]
+                                              ) * (MEDIAN_DIF) + (df.salary_from[condition_sal_from])
 
+    # Заполним значения salary_from когда нет salary_from но есть
+    # salary_to, используя полученное медианное значение разницы
+    # в зарплатной вилке.
+    condition_sal_to = df.salary_from.isnull() & df.salary_to.notnull()
+    df.loc[condition_sal_to, 'salary_from'] = (df.salary_to[condition_sal_to])/(1+MEDIAN_DIF)
 
-# Столбец area.name
+    # Перевод зарплат в доллары по курсу на день публикации. Курсы
+    # загружаются раз в день и сохраняются на диск, поэтому при
+    # недоступности API используется последний сохраненный снимок.
+    df = convert_to_usd(df, get_rates_history())
 
+    # Столбец salary.currency больше не нужен, удалим его.
+    df = df.drop(['salary.currency'], axis=1)
 
-# Дополним данные названием стран, которые можно определить по названию города
+    # Зарплаты округляются до целых (Int32 с пропусками) схемой
+    # конвейера, которая применяется к результату каждой стадии (schema.py)
 
-# Список имеющихся городов
-city_list = list(df['city'].unique())
+    return df
 
-def get_city_country_catalog():
-    """
-    Получает каталог городов и стран из API HeadHunter.
 
-    Возвращает:
-        dict: Каталог городов и стран в формате JSON.
-    """
-    response = requests.get('https://api.hh.ru/areas', timeout=60)
-    response.raise_for_status()
-    city_country_cat = response.json()
-    return city_country_cat
+# Столбец area.name
 
-city_country_catalog = get_city_country_catalog()
 
-def find_country_by_city(city_name):
+def resolve_country(df):
     """
-    Находит название страны по заданному названию города.
+    Стадия определения страны: дополняет данные названием стран,
+    которые можно определить по названию города.
 
-    Аргументы:
-        city_name (str): Название города, для которого нужно найти соответствующую страну.
+    Параметры:
+        df (pd.DataFrame): результат стадии обработки.
 
     Возвращает:
-        str: Название страны, если найдено, в противном случае "Страна не найдена".
-    """
-    def search_area(area, city_name):
-        """
-        Рекурсивная функция для поиска города в странах и районах.
-        Сначала она смотрит, является ли название текущего района искомым городом.
-        Если нет, то функция начинает итерацию по всем подрайонам.
-
-        Аргументы:
-            area (dict): Словарь, представляющий страны и районы с городами.
-            city_name (str): Название города для поиска.
-
-        Возвращает:
-            bool: True, если город найден в стране/районе/подрайоне,
-                  False в противном случае.
-        """
-        if area['name'] == city_name:
-            return True
-        for sub_area in area.get('areas', []):
-            if search_area(sub_area, city_name): # Если функция вернула результат
-                return True
-        return False
-
-    for country in city_country_catalog:
-        if country['name'] == "Другие регионы":  # Если название страны "Другие регионы",
-                                                 # значит настоящее название страны вложено
-                                                 # внутрь, и лежит там где обычно города
-            for area in country['areas']:
-                if search_area(area, city_name): # Если функция search_area вернула True
-                    return city_name             # city_name и будет названием страны
-        elif search_area(country, city_name):
-            return country['name']
-
-    return "Страна не найдена"
-
-df['country'] = df['city'].apply(find_country_by_city)
-
-df.to_csv('reached_data2.csv', index=False)
+        pd.DataFrame: вакансии с колонкой country.
+    """
+    # Каталог регионов берется с диска (обновляется раз в AREAS_REFRESH_DAYS),
+    # по нему один раз строится индекс город -> страна
+    city_country_index = build_city_country_index(get_city_country_catalog())
+    df['country'] = resolve_countries(df['city'], city_country_index)
+    return df
 
 
 # #### languages
 
 
-df = pd.read_csv("reached_data2.csv")
-
-def extract_id(languages_str):
+def extract_id(languages):
     """
-    Извлекает идентификатор языка из строки, представляющей список языков в формате 
-    похожем на JSON.
+    Извлекает идентификатор языка из списка языков вакансии.
 
     Аргументы:
-        languages_str (str): Строка, представляющая список языков в формате
-        похожем на JSON.
+        languages (list): Список языков в формате API hh.ru.
 
     Возвращает:
         str или None: Идентификатор языка, если он найден, в противном случае None.
     """
-    if not languages_str or languages_str == '[]':
-        return None
-
-    try:
-        # Заменяем одинарные кавычки на двойные
-        corrected_str = languages_str.replace("'", '"')
-
-        # Преобразуем исправленную строку в список словарей
-        languages_list = json.loads(corrected_str)
-
-        if languages_list and isinstance(languages_list, list):
-            return languages_list[0].get('id')
-    except Exception:
-        pass
+    if languages and isinstance(languages, list):
+        return languages[0].get('id')
     return None
 
-def extract_level(languages_str):
+def extract_level(languages):
     """
-    Извлекает идентификатор уровня знания языка из строки, представляющей список языков в формате
-    похожем на JSON.
+    Извлекает идентификатор уровня знания языка из списка языков вакансии.
 
     Аргументы:
-        languages_str (str): Строка, представляющая список языков в формате 
-        похожем на JSON.
+        languages (list): Список языков в формате API hh.ru.
 
     Возвращает:
         str или None: Идентификатор уровня знания языка, если он найден, в противном случае None.
     """
-    if not languages_str or languages_str == '[]':
-        return None
-
-    try:
-        # Заменяем одинарные кавычки на двойные
-        corrected_str = languages_str.replace("'", '"')
-
-        # Преобразуем исправленную строку в список словарей
-        languages_list = json.loads(corrected_str)
-
-        if languages_list and isinstance(languages_list, list):
-            level = languages_list[0].get('level')
-            return level['id']
-    except Exception:
-        pass
+    if languages and isinstance(languages, list):
+        level = languages[0].get('level')
+        if level:
+            return level.get('id')
     return None
 
-df['language'] = df['languages'].apply(extract_id)
-df['language_level'] = df['languages'].apply(extract_level)
-
-# Удаление столбца languages.
-df = df.drop(['languages'], axis=1)
-
 
 # Столбец schedule
 
 
-def extract_schedule(schedule_str):
+def extract_schedule(schedule):
     """
-    Извлекает идентификатор графика работы из строки, представляющей график в формате 
-    похожем на JSON.
+    Извлекает идентификатор графика работы.
 
     Аргументы:
-        schedule_str (str): Строка, представляющая график работы в формате 
-        похожем на JSON.
+        schedule (dict): График работы в формате API hh.ru.
 
     Возвращает:
         str или None: Идентификатор графика работы, если он найден, в противном случае None.
     """
-    if not schedule_str or schedule_str == '[]':
-        return None
-
-    try:
-        # Заменяем одинарные кавычки на двойные
-        corrected_str = schedule_str.replace("'", '"')
-
-        schedule_json = json.loads(corrected_str)
-
-        schedule = schedule_json.get('id')
-        return schedule
-    except Exception:
-        pass
+    if schedule and isinstance(schedule, dict):
+        return schedule.get('id')
     return None
 
-df['schedule'] = df['schedule'].apply(extract_schedule)
-
 
 # #### key_skills
 
-def extract_key_skills(key_skills_str):
+def extract_key_skills(key_skills):
     """
-    Извлекает ключевые навыки из строки, представляющей список ключевых навыков в формате
-    похожем на JSON.
+    Извлекает названия ключевых навыков из списка навыков вакансии.
 
     Аргументы:
-        key_skills_str (str): Строка, представляющая список ключевых навыков в формате
-        похожем на JSON.
+        key_skills (list): Список ключевых навыков в формате API hh.ru.
 
     Возвращает:
         list или None: Список ключевых навыков, если они найдены, в противном случае None.
     """
-    if not key_skills_str or key_skills_str == '[]':
-        return None
-
-    try:
-        # Заменяем одинарные кавычки на двойные
-        corrected_str = key_skills_str.replace("'", '"')
-
-        skill_list_json = json.loads(corrected_str)
-
-        if skill_list_json and isinstance(skill_list_json, list):
-            skill_list = []
-            for i in skill_list_json:
-                skill_list.append(i['name'])
-            return skill_list
-    except Exception:
-        pass
+    if key_skills and isinstance(key_skills, list):
+        return [skill['name'] for skill in key_skills]
     return None
 
 
-df.key_skills = df.key_skills.apply(extract_key_skills)
-
-
 # Столбец published_at
 
 
@@ -506,19 +439,170 @@ def extract_date (full_date):
     return None
 
 
-df.to_csv('processed_data.csv', index=False)
+def extract_fields(df):
+    """
+    Стадия разбора вложенных полей: языки, график работы и ключевые навыки.
 
+    Параметры:
+        df (pd.DataFrame): результат стадии определения страны.
 
-#  ЗАГРУХКА ДАННЫХ В MONGO
+    Возвращает:
+        pd.DataFrame: вакансии с плоскими колонками language, language_level,
+        schedule, списком названий навыков в key_skills и списком
+        канонических навыков в skills. Колонка languages остается массивом
+        языков в формате API hh.ru.
+    """
+    # Вложенные поля сохраняются в MongoDB массивами и поддокументами,
+    # а не строковым представлением объектов Python, поэтому читать их
+    # можно без повторного разбора строк
+    df['language'] = df['languages'].apply(extract_id)
+    df['language_level'] = df['languages'].apply(extract_level)
+
+    df['schedule'] = df['schedule'].apply(extract_schedule)
 
+    df['key_skills'] = df['key_skills'].apply(extract_key_skills)
 
-df = pd.read_csv("processed_data.csv")
+    # Канонические навыки (очищенные, с учетом синонимов) считаются один
+    # раз при загрузке, чтобы визуализации не приходилось обрабатывать строки
+    df['skills'] = df['key_skills'].apply(normalize_skills)
 
-# Конвертация DataFrame в формат словаря для MongoDB
-data_records = df.to_dict(orient='records')
+    return df
 
-# Создание новой базы и коллекции
-create_db_and_collection('vacancydb', 'vacancy')
 
-# Добавление данных в выбранную базу и коллекцию
-load_data_to_mongo('vacancydb', 'vacancy', data_records)
+#  ЗАГРУХКА ДАННЫХ В MONGO
+
+
+def load(df):
+    """
+    Стадия загрузки: сохраняет вакансии в MongoDB, обновляет статистику
+    для визуализации и сдвигает отметку сборщика.
+
+    Параметры:
+        df (pd.DataFrame): результат стадии разбора полей.
+
+    Возвращает:
+        pd.DataFrame: те же вакансии.
+    """
+    # Конвертация DataFrame в формат словаря для MongoDB: категории - строки,
+    # пропуски - null (см. schema.to_records)
+    data_records = to_records(df)
+
+    # Создание новой базы и коллекции
+    create_db_and_collection('vacancydb', 'vacancy')
+
+    # Добавление данных в выбранную базу и коллекцию (upsert по id вакансии)
+    counts = load_data_to_mongo('vacancydb', 'vacancy', data_records)
+    logging.info(f'Загрузка в MongoDB: добавлено {counts["inserted"]}, '
+                 f'обновлено {counts["updated"]}, без изменений {counts["unchanged"]}')
+
+    # Пересчет статистики для визуализации за дни, затронутые загрузкой.
+    # Повторно опубликованная вакансия уходит из дня прежней публикации,
+    # поэтому пересчет начинается с самой ранней из новых и прежних дат
+    since = df['published_at'].min()
+    if counts['previous_min_date'] is not None:
+        previous = pd.Timestamp(counts['previous_min_date'])
+        if previous.tzinfo is None:
+            previous = previous.tz_localize('UTC')
+        since = min(since, previous)
+    refresh_stats('vacancydb', 'vacancy', since=since)
+
+    # Сохранение отметки сборщика для следующего запуска
+    save_watermark('vacancydb', df['published_at'])
+
+    return df
+
+
+# Стадии передают данные друг другу в памяти; результат каждой стадии
+# сохраняется в Parquet, чтобы упавший запуск можно было продолжить
+# (PIPELINE_RESUME=true) без повторного сбора данных.
+# В режиме повторной обработки (REPLAY_FROM) сбор и обогащение
+# читают архив ответов API, остальные стадии те же.
+# Типы колонок после каждой стадии приводятся схемой (schema.apply_schema):
+# категории вместо повторяющихся строк, Int32 для зарплат, datetime64 для дат.
+pipeline = Pipeline('data_processor',
+                    [('collect', replay_collect if REPLAY_FROM else collect),
+                     ('enrich', replay_enrich if REPLAY_FROM else enrich),
+                     ('normalize', normalize),
+                     ('resolve_country', resolve_country),
+                     ('extract_fields', extract_fields),
+                     ('load', load)],
+                    checkpoint_dir=CHECKPOINT_DIR if PIPELINE_CHECKPOINTS else None,
+                    schema=apply_schema)
+
+def parse_args():
+    """
+    Разбирает аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(
+        description='Сбор и обработка вакансий hh.ru. Без аргументов выполняется '
+                    'весь конвейер, с именем стадии - только она: входные данные '
+                    'читаются из контрольной точки предыдущей стадии запуска --run-id.')
+    parser.add_argument('stage', nargs='?', choices=[name for name, _ in pipeline.stages] + ['cleanup'],
+                        help='стадия конвейера; cleanup удаляет контрольные точки завершенного '
+                             'запуска и незавершенных запусков старше '
+                             'CHECKPOINT_RETENTION_DAYS дней')
+    parser.add_argument('--run-id', help='идентификатор запуска, общий для всех его стадий')
+    parser.add_argument('--part', type=int,
+                        help='номер части поисковых запросов для стадии collect (с нуля)')
+    parser.add_argument('--parts', type=int, default=1,
+                        help='количество частей, на которые делятся поисковые запросы')
+    args = parser.parse_args()
+
+    if args.stage and not args.run_id:
+        parser.error('для запуска отдельной стадии нужен --run-id')
+    if args.part is not None:
+        if args.stage != 'collect':
+            parser.error('--part поддерживается только стадией collect')
+        if REPLAY_FROM:
+            parser.error('в режиме повторной обработки сбор по частям не поддерживается')
+        if not 0 <= args.part < args.parts:
+            parser.error('--part должен быть от 0 до --parts - 1')
+        if args.parts > len(vacancy_list):
+            parser.error(f'--parts не может быть больше количества поисковых запросов '
+                         f'({len(vacancy_list)})')
+    return args
+
+
+def main():
+    args = parse_args()
+    job = 'data_processor'
+    if args.stage:
+        job += f'_{args.stage}' + ('' if args.part is None else f'_{args.part}')
+
+    status = 'failed'
+    try:
+        if args.stage is None:
+            pipeline.run(resume=PIPELINE_RESUME)
+        else:
+            # Контрольные точки нужны для передачи данных между стадиями,
+            # поэтому сохраняются независимо от PIPELINE_CHECKPOINTS
+            run = Pipeline(pipeline.name, pipeline.stages, checkpoint_dir=CHECKPOINT_DIR,
+                           run_id=args.run_id, schema=pipeline.schema)
+            if args.stage == 'cleanup':
+                # Задача cleanup выполняется и после неудачного запуска: его
+                # контрольные точки остаются, чтобы упавшую стадию можно было
+                # перезапустить, и удаляются по сроку хранения
+                if os.path.exists(run.checkpoint_path(pipeline.stages[-1][0])):
+                    run.clear_checkpoints()
+                    if os.path.isdir(run.checkpoint_dir) and not os.listdir(run.checkpoint_dir):
+                        os.rmdir(run.checkpoint_dir)
+                else:
+                    logging.info(f'Запуск {args.run_id} не завершен, контрольные точки сохранены')
+                remove_stale_runs(CHECKPOINT_DIR, pipeline.name)
+            elif args.part is not None:
+                # Запросы делятся между частями по кругу: часть i получает
+                # запросы i, i + parts, i + 2 * parts, ...
+                run.run_stage('collect', part=args.part,
+                              queries=vacancy_list[args.part::args.parts])
+            else:
+                run.run_stage(args.stage)
+        status = 'success'
+    finally:
+        if archive is not None:
+            archive.close()
+        # Метрики запуска: файл для Prometheus, Pushgateway и сводка в MongoDB
+        metrics.export(job, status, db=get_mongo_client()['vacancydb'])
+
+
+if __name__ == '__main__':
+    main()
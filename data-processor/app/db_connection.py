@@ -1,5 +1,9 @@
+import atexit
 import os
-from pymongo import MongoClient
+import threading
+from datetime import datetime, timezone
+from pymongo import MongoClient, UpdateOne
+from metrics import MongoCommandMetrics
 
 # Определение переменных окружения для подключения к MongoDB
 MONGO_USER = os.getenv('MONGO_INITDB_ROOT_USERNAME', 'root')
@@ -7,17 +11,65 @@ MONGO_PASSWORD = os.getenv('MONGO_INITDB_ROOT_PASSWORD', 'example')
 MONGO_HOST = os.getenv('MONGO_HOST', 'mongo')
 MONGO_PORT = os.getenv('MONGO_PORT', '27017')
 
+# Параметры пула соединений и таймауты (в миллисекундах)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '20'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '10000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '300000'))
+# Подтверждение записи: число узлов или 'majority'
+MONGO_WRITE_CONCERN = os.getenv('MONGO_WRITE_CONCERN', '1')
+
+# Количество операций в одном пакете bulk_write
+MONGO_BATCH_SIZE = int(os.getenv('MONGO_BATCH_SIZE', '500'))
+
+_client = None
+_client_lock = threading.Lock()
+
+
 def get_mongo_client():
     """
-    Создает и возвращает клиент MongoDB.
+    Возвращает общий для процесса клиент MongoDB.
+
+    Клиент создается при первом вызове и дальше переиспользуется: у него
+    свой пул соединений, поэтому повторные вызовы не открывают новые
+    соединения. Закрывать клиент после запроса не нужно - он закрывается
+    при завершении процесса (или явно через close_mongo_client).
+    Длительность команд клиента попадает в метрики запуска (см. metrics.py).
 
-    Использует переменные окружения для получения данных аутентификации и адреса сервера MongoDB.
- 
     Returns:
         MongoClient: Объект клиента MongoDB для взаимодействия с базой данных.
     """
-    client = MongoClient(f'mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/')
-    return client
+    global _client
+    with _client_lock:
+        if _client is None:
+            write_concern = MONGO_WRITE_CONCERN
+            if write_concern.isdigit():
+                write_concern = int(write_concern)
+            _client = MongoClient(f'mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/',
+                                  maxPoolSize=MONGO_MAX_POOL_SIZE,
+                                  minPoolSize=MONGO_MIN_POOL_SIZE,
+                                  serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                  connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                                  socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                                  w=write_concern,
+                                  event_listeners=[MongoCommandMetrics()])
+        return _client
+
+
+def close_mongo_client():
+    """
+    Закрывает общий клиент MongoDB. Следующий вызов get_mongo_client
+    создаст новый клиент.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_mongo_client)
 
 def create_db_and_collection(db_name, collection_name):
     """
@@ -28,32 +80,68 @@ def create_db_and_collection(db_name, collection_name):
         collection_name (str): Имя создаваемой коллекции в базе данных.
 
     Описание:
-        Подключается к MongoDB используя стандартные учетные данные.
+        Использует общий клиент MongoDB (см. get_mongo_client).
         Проверяет, существует ли указанная база иликоллекция в базе данных,
         и если нет, создает ее.
     """
-    client = get_mongo_client()
-    db = client[db_name]
+    db = get_mongo_client()[db_name]
     if collection_name not in db.list_collection_names():
         db.create_collection(collection_name)
-    client.close()
 
-def load_data_to_mongo(db_name, collection_name, data):
+def load_data_to_mongo(db_name, collection_name, data, key='id', batch_size=MONGO_BATCH_SIZE,
+                       date_field='published_at'):
     """
-    Загружает данные в указанную коллекцию MongoDB.
+    Загружает данные в указанную коллекцию MongoDB без дублей.
 
     Параметры:
         db_name (str): Имя базы данных MongoDB.
         collection_name (str): Имя коллекции в базе данных.
         data (list): Список данных для загрузки в коллекцию.
+        key (str): Поле, однозначно определяющее документ (id вакансии на hh.ru).
+        batch_size (int): Количество операций в одном пакете.
+        date_field (str): Поле с датой публикации документа.
 
     Описание:
-        Создает клиент MongoDB, получает доступ к указанной базе данных
-        и коллекции, и загружает в нее переданные данные. После 
-        выполнения операции закрывает соединение с MongoDB.
-    """
-    client = get_mongo_client()
-    db = client[db_name]
-    collection = db[collection_name]
-    collection.insert_many(data)
-    client.close()
+        Создает уникальный индекс по полю key (если его еще нет) и для
+        каждого документа выполняет upsert по этому полю: новые документы
+        добавляются (с отметкой времени ingested_at), уже существующие
+        обновляются. Операции отправляются
+        неупорядоченными пакетами по batch_size штук.
+
+        Перед обновлением читаются прежние значения date_field: если вакансию
+        опубликовали повторно, документ переходит на новый день, а статистику
+        нужно пересчитать и за прежний.
+
+    Возвращает:
+        dict: количество добавленных (inserted), измененных (updated)
+        и оставшихся без изменений (unchanged) документов, а также самая
+        ранняя прежняя дата date_field обновленных документов
+        (previous_min_date, None - если таких документов не было).
+    """
+    collection = get_mongo_client()[db_name][collection_name]
+
+    # Документы, загруженные до появления ключа, в индекс не попадают
+    collection.create_index(key, unique=True,
+                            partialFilterExpression={key: {'$exists': True}})
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'previous_min_date': None}
+    for start in range(0, len(data), batch_size):
+        batch = data[start:start + batch_size]
+        previous = collection.find({key: {'$in': [doc[key] for doc in batch]},
+                                    date_field: {'$type': 'date'}},
+                                   {date_field: 1, '_id': 0}).sort(date_field, 1).limit(1)
+        for doc in previous:
+            if counts['previous_min_date'] is None or doc[date_field] < counts['previous_min_date']:
+                counts['previous_min_date'] = doc[date_field]
+
+        now = datetime.now(timezone.utc)
+        operations = [UpdateOne({key: doc[key]},
+                                {'$set': doc, '$setOnInsert': {'ingested_at': now}},
+                                upsert=True)
+                      for doc in batch]
+        result = collection.bulk_write(operations, ordered=False)
+        counts['inserted'] += result.upserted_count
+        counts['updated'] += result.modified_count
+        counts['unchanged'] += result.matched_count - result.modified_count
+
+    return counts
@@ -1,21 +1,65 @@
+from datetime import datetime, timedelta, timezone
 import logging
-from db_connection import get_mongo_client
+import os
+from db_connection import get_mongo_client, close_mongo_client
+from metrics import metrics
+from vacancy_stats import refresh_stats
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-try:
-    # Подключение к MongoDB
-    client = get_mongo_client()
-    db = client.vacancydb
-    collection = db.vacancy
+# Дубликаты ищутся только среди URL вакансий, загруженных за последние
+# DEDUP_WINDOW_DAYS дней. DEDUP_FULL_SCAN=true проверяет всю коллекцию.
+DEDUP_WINDOW_DAYS = float(os.getenv('DEDUP_WINDOW_DAYS', '2'))
+DEDUP_FULL_SCAN = os.getenv('DEDUP_FULL_SCAN', 'false').lower() in ('1', 'true', 'yes')
+# Количество _id в одном запросе на удаление
+DEDUP_BATCH_SIZE = int(os.getenv('DEDUP_BATCH_SIZE', '1000'))
 
-    # Агрегационный запрос для идентификации дубликатов по URL
+
+def delete_duplicates(db_name, collection_name, full_scan=DEDUP_FULL_SCAN,
+                      window_days=DEDUP_WINDOW_DAYS, batch_size=DEDUP_BATCH_SIZE):
+    """
+    Удаляет дубликаты вакансий по URL, оставляя самый новый документ.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        collection_name (str): имя коллекции с вакансиями.
+        full_scan (bool): искать дубликаты по всей коллекции, а не только
+        среди URL, загруженных за последние window_days дней.
+        window_days (float): окно поиска дубликатов в днях.
+        batch_size (int): количество _id в одном запросе на удаление.
+
+    Возвращает:
+        dict: количество URL с дубликатами (duplicated_urls) и удаленных
+        документов (deleted).
+    """
+    collection = get_mongo_client()[db_name][collection_name]
+
+    # Индекс для группировки по URL с сортировкой от новых к старым
+    collection.create_index([('url', 1), ('published_at', -1)])
+
+    if full_scan:
+        match = {}
+        logging.info('Поиск дубликатов по всей коллекции')
+    else:
+        # Ограничиваемся URL недавно загруженных вакансий: только у них
+        # могли появиться новые дубликаты
+        since = datetime.now(timezone.utc) - timedelta(days=window_days)
+        collection.create_index('ingested_at')
+        recent_urls = collection.distinct('url', {'ingested_at': {'$gte': since}})
+        match = {'url': {'$in': recent_urls}}
+        logging.info(f'Поиск дубликатов среди {len(recent_urls)} недавно загруженных URL')
+
+    # Агрегационный запрос для идентификации дубликатов по URL.
+    # После сортировки первым в группе оказывается самый новый документ.
     pipeline = [
+        {"$match": match},
+        {"$sort": {"url": 1, "published_at": -1, "_id": -1}},
         {
             "$group": {
                 "_id": "$url",
+                "keepId": {"$first": "$_id"},
                 "allIds": {"$push": "$_id"},
-                "publishedAt": {"$push": "$published_at"}
+                "oldestPublishedAt": {"$last": "$published_at"},
             }
         },
         {
@@ -27,25 +71,52 @@ try:
         }
     ]
 
-    duplicates = collection.aggregate(pipeline)
+    duplicates = collection.aggregate(pipeline, allowDiskUse=True)
 
-    # Удаление дубликатов
+    # Удаление дубликатов пакетами: сохраняется самый новый документ,
+    # остальные _id копятся и удаляются одним запросом на пакет
+    duplicated_urls = 0
+    deleted_count = 0
+    to_delete = []
+    oldest_deleted = None
+    full_stats_refresh = False
     for duplicate in duplicates:
-        ids = duplicate['allIds']
-        dates = duplicate['publishedAt']
+        duplicated_urls += 1
+        oldest = duplicate['oldestPublishedAt']
+        if not isinstance(oldest, datetime):
+            # Дата сохранена строкой (старый документ): пересчитываем всю статистику
+            full_stats_refresh = True
+        elif oldest_deleted is None or oldest < oldest_deleted:
+            oldest_deleted = oldest
+        to_delete.extend(_id for _id in duplicate['allIds'] if _id != duplicate['keepId'])
+
+        if len(to_delete) >= batch_size:
+            deleted_count += collection.delete_many({"_id": {"$in": to_delete}}).deleted_count
+            to_delete = []
+
+    if to_delete:
+        deleted_count += collection.delete_many({"_id": {"$in": to_delete}}).deleted_count
 
-        if len(ids) > 1:
-            # Сортировка ID по дате публикации, сохранение самого нового
-            sorted_ids = [id for _, id in sorted(zip(dates, ids), reverse=True)]
+    logging.info(f"URL с дубликатами: {duplicated_urls}, удалено дубликатов: {deleted_count}")
 
-            # Удаление всех, кроме самого нового
-            collection.delete_many({"_id": {"$in": sorted_ids[:-1]}})
+    # Статистика за дни удаленных дубликатов больше не актуальна
+    if deleted_count:
+        refresh_stats(db_name, collection_name,
+                      since=None if full_stats_refresh else oldest_deleted)
 
-            logging.info(f"Удалены дубликаты для URL {duplicate['_id']}, оставлен {sorted_ids[-1]}")
+    return {'duplicated_urls': duplicated_urls, 'deleted': deleted_count}
 
-except Exception as e:
-    logging.error(f"Произошла ошибка: {e}")
 
-finally:
-    client.close()
-    logging.info("MongoDB соединение закрыто")
+if __name__ == '__main__':
+    status = 'failed'
+    try:
+        with metrics.stage('delete_duplicates'):
+            result = delete_duplicates('vacancydb', 'vacancy')
+            metrics.set('documents_deleted', result['deleted'])
+        status = 'success'
+    except Exception as e:
+        logging.error(f"Произошла ошибка: {e}")
+    finally:
+        metrics.export('delete_duplicates', status, db=get_mongo_client()['vacancydb'])
+        close_mongo_client()
+        logging.info("MongoDB соединение закрыто")
@@ -1,39 +1,139 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
-from db_connection import get_mongo_client
+import os
+from db_connection import get_mongo_client, close_mongo_client
+from metrics import metrics
+from vacancy_stats import STATS_COLLECTION, mark_data_updated
+from skills import migrate_key_skills
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-try:
-    # Подключение к MongoDB
-    client = get_mongo_client()
-    db = client.vacancydb
-    collection = db.vacancy
-
-    # Определение даты 90 дней назад
-    ninety_days_ago = datetime.now() - timedelta(days=90)
-
-    # Преобразование в формат, совместимый с MongoDB
-    ninety_days_ago_str = ninety_days_ago.strftime("%Y-%m-%dT%H:%M:%S%z")
-
-    # Формирование запроса для поиска старых записей
-    old_records = collection.find({"published_at": {"$lt": ninety_days_ago_str}})
-
-    # Подсчет и удаление старых записей
-    old_records_count = 0
-    old_record_ids = []
-    for record in old_records:
-        old_record_ids.append(record['_id'])
-        collection.delete_one({"_id": record['_id']})
-        old_records_count += 1
-
-    # Логирование результатов
-    logging.info(f"Удалено записей: {old_records_count}")
-    logging.info(f"ID удаленных записей: {old_record_ids}")
-
-except Exception as e:
-    logging.error(f"Произошла ошибка: {e}")
-finally:
-    if 'client' in locals():
-        client.close()
+# Срок хранения вакансий в днях
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '90'))
+# Способ удаления: 'ttl' - MongoDB сама удаляет документы по TTL индексу,
+# 'delete' - один запрос delete_many по индексу на published_at
+RETENTION_MODE = os.getenv('RETENTION_MODE', 'delete')
+
+# Имя индекса по published_at (обычного или TTL)
+PUBLISHED_AT_INDEX = 'published_at_1'
+
+
+def migrate_published_at(collection):
+    """
+    Переводит published_at, сохраненные строкой (в формате hh.ru), в даты BSON.
+
+    Параметры:
+        collection (Collection): коллекция с вакансиями.
+
+    Возвращает:
+        int: количество преобразованных документов.
+    """
+    result = collection.update_many(
+        {'published_at': {'$type': 'string'}},
+        [{'$set': {'published_at': {'$dateFromString': {
+            'dateString': '$published_at',
+            'format': '%Y-%m-%dT%H:%M:%S%z'
+        }}}}]
+    )
+    return result.modified_count
+
+
+def ensure_published_at_index(db, collection, expire_after_seconds=None):
+    """
+    Создает индекс по published_at. Если задан expire_after_seconds,
+    индекс создается как TTL индекс.
+
+    Если индекс уже есть, но с другим сроком хранения, срок меняется
+    командой collMod, а при смене вида индекса (обычный/TTL) он пересоздается.
+
+    Параметры:
+        db (Database): база данных.
+        collection (Collection): коллекция с вакансиями.
+        expire_after_seconds (int): срок хранения в секундах или None.
+    """
+    existing = collection.index_information().get(PUBLISHED_AT_INDEX)
+    if existing is not None:
+        current = existing.get('expireAfterSeconds')
+        if current == expire_after_seconds:
+            return
+        if current is not None and expire_after_seconds is not None:
+            db.command('collMod', collection.name,
+                       index={'name': PUBLISHED_AT_INDEX,
+                              'expireAfterSeconds': expire_after_seconds})
+            return
+        collection.drop_index(PUBLISHED_AT_INDEX)
+
+    if expire_after_seconds is None:
+        collection.create_index('published_at', name=PUBLISHED_AT_INDEX)
+    else:
+        collection.create_index('published_at', name=PUBLISHED_AT_INDEX,
+                                expireAfterSeconds=expire_after_seconds)
+
+
+def enforce_retention(db_name, collection_name, retention_days=RETENTION_DAYS,
+                      mode=RETENTION_MODE):
+    """
+    Удаляет вакансии старше срока хранения и статистику за эти дни.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        collection_name (str): имя коллекции с вакансиями.
+        retention_days (int): срок хранения в днях.
+        mode (str): 'ttl' - удаление TTL индексом MongoDB,
+        'delete' - одним запросом delete_many.
+
+    Возвращает:
+        dict: количество удаленных вакансий (deleted, 0 в режиме 'ttl')
+        и документов статистики (stats_deleted).
+    """
+    db = get_mongo_client()[db_name]
+    collection = db[collection_name]
+
+    # Старые документы хранят published_at строкой, а сравнивать
+    # и индексировать нужно даты
+    migrated_count = migrate_published_at(collection)
+    logging.info(f'Преобразовано published_at из строки в дату: {migrated_count}')
+
+    # Навыки тоже должны храниться массивами, а не строкой
+    migrated_count = migrate_key_skills(collection)
+    logging.info(f'Преобразовано key_skills из строки в массив: {migrated_count}')
+
+    # Граница срока хранения
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+    if mode == 'ttl':
+        # Удалением занимается сама MongoDB, здесь только поддерживаем индекс
+        deleted_count = 0
+        ensure_published_at_index(db, collection, retention_days * 24 * 60 * 60)
+        expired_count = collection.count_documents({'published_at': {'$lt': cutoff}})
+        logging.info(f'TTL индекс: срок хранения {retention_days} дней, '
+                     f'ожидают удаления: {expired_count}')
+    else:
+        # Удаление всех старых записей одним запросом по индексу
+        ensure_published_at_index(db, collection)
+        deleted_count = collection.delete_many({'published_at': {'$lt': cutoff}}).deleted_count
+        logging.info(f'Удалено записей: {deleted_count}')
+
+    # Статистика за дни за пределами срока хранения больше не нужна
+    stats_result = db[STATS_COLLECTION].delete_many({'day': {'$lt': cutoff.strftime('%Y-%m-%d')}})
+    logging.info(f'Удалено документов статистики: {stats_result.deleted_count}')
+    mark_data_updated(db)
+
+    logging.info(f'Осталось записей: {collection.estimated_document_count()}')
+
+    return {'deleted': deleted_count, 'stats_deleted': stats_result.deleted_count}
+
+
+if __name__ == '__main__':
+    status = 'failed'
+    try:
+        with metrics.stage('delete_old_data'):
+            result = enforce_retention('vacancydb', 'vacancy')
+            metrics.set('documents_deleted', result['deleted'])
+        status = 'success'
+    except Exception as e:
+        logging.error(f"Произошла ошибка: {e}")
+    finally:
+        metrics.export('delete_old_data', status, db=get_mongo_client()['vacancydb'])
+        close_mongo_client()
         logging.info("MongoDB соединение закрыто")
@@ -0,0 +1,214 @@
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from tqdm import tqdm
+from http_client import TokenBucket, create_session, timed_get
+from archive import VACANCY_DETAILS
+
+# Поля, которые извлекаются из полного описания вакансии. Текст описания
+# (description) дальше нигде не используется и в таблицы не попадает:
+# полный ответ API при необходимости хранится в архиве (см. archive.py)
+FEATURE_COLUMNS = ['key_skills', 'languages', 'schedule']
+
+# Количество потоков, одновременно запрашивающих описания вакансий
+ENRICH_WORKERS = int(os.getenv('ENRICH_WORKERS', '8'))
+# Общее ограничение частоты запросов (запросов в секунду) и размер пачки
+ENRICH_RATE_LIMIT = float(os.getenv('ENRICH_RATE_LIMIT', '4'))
+ENRICH_RATE_BURST = float(os.getenv('ENRICH_RATE_BURST', '8'))
+# Повторы запросов: количество попыток и параметры экспоненциальной задержки
+ENRICH_MAX_ATTEMPTS = int(os.getenv('ENRICH_MAX_ATTEMPTS', '5'))
+ENRICH_BACKOFF_BASE = float(os.getenv('ENRICH_BACKOFF_BASE', '1'))
+ENRICH_BACKOFF_MAX = float(os.getenv('ENRICH_BACKOFF_MAX', '60'))
+
+# Коды ответа, при которых запрос стоит повторить
+# (403 hh.ru возвращает вместе с капчей при слишком частых запросах)
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+def extract_vacancy_features(req):
+    """
+    Извлекает из JSON-ответа с описанием вакансии ключевые навыки, языки
+    и график работы.
+
+    Параметры:
+        req (dict): JSON-ответ API с полным описанием вакансии.
+
+    Возвращает:
+        list : список значений FEATURE_COLUMNS (key_skills, languages,
+        schedule). Отсутствующие поля заменяются на None.
+    """
+    return [req.get(column) for column in FEATURE_COLUMNS]
+
+
+def fit_feature_row(row):
+    """
+    Приводит сохраненный ранее список признаков к текущим FEATURE_COLUMNS.
+
+    В кэше обогащения могут остаться записи с описанием вакансии
+    последним элементом: лишние элементы отбрасываются.
+    """
+    return list(row[:len(FEATURE_COLUMNS)]) + [None] * (len(FEATURE_COLUMNS) - len(row))
+
+
+def backoff_delay(attempt, base=ENRICH_BACKOFF_BASE, cap=ENRICH_BACKOFF_MAX):
+    """
+    Считает задержку перед повторным запросом: экспоненциальный рост
+    с полным случайным разбросом (full jitter), чтобы потоки не повторяли
+    запросы одновременно.
+
+    Параметры:
+        attempt (int): номер неудачной попытки (с нуля).
+        base (float): базовая задержка в секундах.
+        cap (float): максимальная задержка в секундах.
+
+    Возвращает:
+        float: задержка в секундах.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def fetch_vacancy(session, bucket, url, max_attempts=ENRICH_MAX_ATTEMPTS, archive=None):
+    """
+    Загружает описание одной вакансии с повторами при временных ошибках.
+
+    Повторяются запросы, завершившиеся кодами из RETRY_STATUSES или сетевой
+    ошибкой. Если сервер прислал заголовок Retry-After, ждем не меньше него.
+
+    Параметры:
+        session (requests.Session): HTTP-сессия.
+        bucket (TokenBucket): общий ограничитель частоты запросов.
+        url (str): URL вакансии в API.
+        max_attempts (int): максимальное количество попыток.
+        archive (ResponseArchive): архив, в который сохраняется ответ, необязательный.
+
+    Возвращает:
+        tuple: (список признаков вакансии или None, словарь со статусом
+        запроса: url, status, attempts, error).
+    """
+    status = {'url': url, 'status': None, 'attempts': 0, 'error': None}
+    for attempt in range(max_attempts):
+        status['attempts'] = attempt + 1
+        bucket.acquire()
+        retry_after = 0.0
+        try:
+            response = timed_get(session, 'vacancy', url, timeout=60)
+            status['status'] = response.status_code
+            if response.status_code == 200:
+                status['error'] = None
+                try:
+                    data = response.json()
+                except ValueError:
+                    # Ответ 200 с телом не в JSON: запрос повторяется, а после
+                    # последней попытки вакансия считается необогащенной
+                    status['status'] = 'invalid_json'
+                    raise
+                if archive is not None:
+                    archive.write(VACANCY_DETAILS, {'url': url, 'response': data})
+                return extract_vacancy_features(data), status
+            status['error'] = f'HTTP {response.status_code}'
+            if response.status_code not in RETRY_STATUSES:
+                break
+            try:
+                retry_after = float(response.headers.get('Retry-After', 0))
+            except ValueError:
+                retry_after = 0.0
+        except (requests.RequestException, ValueError) as e:
+            status['error'] = str(e)
+
+        if attempt + 1 < max_attempts:
+            time.sleep(max(retry_after, backoff_delay(attempt)))
+
+    logging.error(f'Ошибка при извлечении данных для URL: {url} | Ошибка: {status["error"]}')
+    return None, status
+
+
+def enrich_vacancies(vacancies, cache=None, workers=ENRICH_WORKERS, rate=ENRICH_RATE_LIMIT,
+                     burst=ENRICH_RATE_BURST, session=None, archive=None, queue=None):
+    """
+    Параллельно обогащает вакансии данными из их полного описания.
+
+    Запросы выполняются пулом потоков через общую HTTP-сессию с пулом
+    соединений, а их суммарная частота ограничивается одним token bucket.
+    Если передан кэш, по сети загружаются только вакансии, которых в нем
+    нет (новые или изменившиеся), а успешно загруженные попадают в кэш.
+
+    Параметры:
+        vacancies (pd.DataFrame): вакансии с колонкой url, а при
+        использовании кэша - также с колонками id и published_at.
+        cache (EnrichmentCache): кэш описаний вакансий, необязательный.
+        workers (int): количество потоков.
+        rate (float): ограничение частоты запросов в секунду.
+        burst (float): максимальное количество запросов подряд без ожидания.
+        session (requests.Session): HTTP-сессия. Если не передана, создается новая.
+        archive (ResponseArchive): архив для необработанных описаний вакансий, необязательный.
+        queue (EnrichQueue): очередь обогащения в MongoDB, необязательная. Если
+        передана, вакансии загружаются через нее несколькими процессами
+        (см. work_queue.py), а rate, burst и session не используются.
+
+    Возвращает:
+        tuple: (pd.DataFrame с колонками FEATURE_COLUMNS и тем же индексом,
+        что у vacancies; pd.DataFrame со статусом запроса для каждого URL).
+    """
+    urls = vacancies['url']
+    results = {}
+
+    keys = {}
+    if cache is not None:
+        keys = dict(zip(urls.index, zip(vacancies['id'], vacancies['published_at'])))
+        cached = cache.get_many(list(keys.values()))
+        for index, key in keys.items():
+            if key in cached:
+                status = {'url': urls[index], 'status': 'cache', 'attempts': 0, 'error': None}
+                results[index] = (fit_feature_row(cached[key]), status)
+        logging.info(f'Кэш обогащения: найдено {cache.hits}, не найдено {cache.misses}')
+
+    to_fetch = urls[[index not in results for index in urls.index]]
+    if len(to_fetch) and queue is not None:
+        items = [{'id': vacancies.at[index, 'id'] if 'id' in vacancies else None, 'url': url}
+                 for index, url in to_fetch.items()]
+        fetched = queue.enrich(items, threads=workers, archive=archive)
+    elif len(to_fetch):
+        bucket = TokenBucket(rate, burst)
+        own_session = session is None
+        if own_session:
+            session = create_session(workers)
+
+        def fetch(url):
+            return fetch_vacancy(session, bucket, url, archive=archive)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = list(tqdm(executor.map(fetch, to_fetch), total=len(to_fetch),
+                                    desc='Обогащение вакансий'))
+        finally:
+            if own_session:
+                session.close()
+
+    if len(to_fetch):
+        for index, result in zip(to_fetch.index, fetched):
+            results[index] = result
+
+        if cache is not None:
+            cache.set_many({keys[index]: row
+                            for index, (row, _) in zip(to_fetch.index, fetched)
+                            if row is not None})
+
+    results = [results[index] for index in urls.index]
+    features = pd.DataFrame([row if row is not None else [None] * len(FEATURE_COLUMNS)
+                             for row, _ in results],
+                            columns=FEATURE_COLUMNS,
+                            index=urls.index)
+    statuses = pd.DataFrame([status for _, status in results],
+                            columns=['url', 'status', 'attempts', 'error'],
+                            index=urls.index)
+
+    failed = int((~statuses['status'].isin([200, 'cache'])).sum())
+    retries = int((statuses['attempts'] - 1).clip(lower=0).sum())
+    logging.info(f'Обогащено вакансий: {len(statuses) - failed} '
+                 f'(из них по сети: {len(to_fetch) - failed}), с ошибкой: {failed}, '
+                 f'повторных запросов: {retries}')
+    return features, statuses
@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+# Путь к файлу кэша и время жизни записей в нем (в днях)
+ENRICH_CACHE_PATH = os.getenv('ENRICH_CACHE_PATH', 'data/enrichment_cache.sqlite')
+ENRICH_CACHE_TTL_DAYS = float(os.getenv('ENRICH_CACHE_TTL_DAYS', '14'))
+
+
+class EnrichmentCache:
+    """
+    Локальный кэш полных описаний вакансий на SQLite.
+
+    Ключ записи - id вакансии и ее версия (published_at из результатов
+    поиска). Если вакансию переопубликовали или изменили, версия меняется,
+    и описание загружается заново. Записи старше ttl_days считаются
+    устаревшими и удаляются методом evict_expired.
+
+    Атрибуты:
+        hits (int): количество найденных в кэше вакансий.
+        misses (int): количество вакансий, которых в кэше не оказалось.
+    """
+
+    def __init__(self, path=ENRICH_CACHE_PATH, ttl_days=ENRICH_CACHE_TTL_DAYS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vacancy_cache (
+                id TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                cached_at REAL NOT NULL,
+                PRIMARY KEY (id, version)
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """
+        Ищет в кэше описания вакансий.
+
+        Параметры:
+            keys (list): список пар (id, version).
+
+        Возвращает:
+            dict: словарь {(id, version): данные} только для найденных
+            и не устаревших записей.
+        """
+        found = {}
+        min_cached_at = time.time() - self.ttl
+        for vacancy_id, version in keys:
+            row = self._conn.execute(
+                'SELECT payload FROM vacancy_cache '
+                'WHERE id = ? AND version = ? AND cached_at >= ?',
+                (str(vacancy_id), str(version), min_cached_at)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[(vacancy_id, version)] = json.loads(row[0])
+        return found
+
+    def set_many(self, items):
+        """
+        Сохраняет описания вакансий в кэш. Старые версии тех же вакансий удаляются.
+
+        Параметры:
+            items (dict): словарь {(id, version): данные}. Данные должны
+            сериализоваться в JSON.
+        """
+        now = time.time()
+        with self._conn:
+            for (vacancy_id, version), payload in items.items():
+                self._conn.execute(
+                    'DELETE FROM vacancy_cache WHERE id = ? AND version != ?',
+                    (str(vacancy_id), str(version))
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO vacancy_cache (id, version, payload, cached_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (str(vacancy_id), str(version), json.dumps(payload, ensure_ascii=False), now)
+                )
+
+    def evict_expired(self):
+        """
+        Удаляет из кэша устаревшие записи.
+
+        Возвращает:
+            int: количество удаленных записей.
+        """
+        with self._conn:
+            cursor = self._conn.execute('DELETE FROM vacancy_cache WHERE cached_at < ?',
+                                        (time.time() - self.ttl,))
+        logging.info(f'Из кэша обогащения удалено устаревших записей: {cursor.rowcount}')
+        return cursor.rowcount
+
+    def close(self):
+        """
+        Закрывает соединение с файлом кэша.
+        """
+        self._conn.close()
@@ -0,0 +1,97 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import metrics
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов (алгоритм token bucket).
+
+    Корзина пополняется со скоростью rate токенов в секунду и вмещает
+    не более capacity токенов. Каждый запрос забирает один токен, а если
+    токенов нет - ждет, пока корзина пополнится. Так запросы могут идти
+    короткими пачками, но средняя частота не превышает rate.
+
+    Параметры:
+        rate (float): количество запросов в секунду. Значение <= 0
+        отключает ограничение.
+        capacity (float): размер корзины (максимальная пачка запросов).
+        По умолчанию равен rate, но не меньше 1.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Забирает tokens токенов из корзины, при необходимости ожидая их появления.
+
+        Параметры:
+            tokens (float): количество токенов, которое требуется забрать.
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def create_session(pool_size=10):
+    """
+    Создает HTTP-сессию с пулом соединений нужного размера.
+
+    Соединения переиспользуются между запросами (keep-alive), поэтому
+    не приходится заново устанавливать TCP/TLS соединение на каждый запрос.
+
+    Параметры:
+        pool_size (int): максимальное количество одновременно открытых
+        соединений с одним хостом. Должно быть не меньше числа потоков,
+        которые пользуются сессией.
+
+    Возвращает:
+        requests.Session: настроенная сессия.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def timed_get(session, target, url, **kwargs):
+    """
+    Выполняет GET-запрос и учитывает его длительность и код ответа
+    в метриках запуска.
+
+    Параметры:
+        session (requests.Session): HTTP-сессия (или модуль requests).
+        target (str): адресат запроса для метрик (search, vacancy, ...).
+        url (str): адрес запроса.
+        **kwargs: параметры session.get.
+
+    Возвращает:
+        requests.Response: ответ сервера.
+    """
+    started = time.monotonic()
+    try:
+        response = session.get(url, **kwargs)
+    except requests.RequestException:
+        metrics.observe_http(target, 'error', time.monotonic() - started)
+        raise
+    metrics.observe_http(target, response.status_code, time.monotonic() - started)
+    return response
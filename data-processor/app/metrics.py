@@ -0,0 +1,316 @@
+import logging
+import os
+import resource
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pymongo import monitoring
+
+# Каталог для файлов метрик в текстовом формате Prometheus
+# (для textfile collector node_exporter). Пустое значение - не сохранять
+METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', 'data/metrics')
+# Адрес Prometheus Pushgateway, необязательный
+PUSHGATEWAY_URL = os.getenv('PUSHGATEWAY_URL')
+# Коллекция со сводками запусков
+RUN_SUMMARY_COLLECTION = 'run_summaries'
+# Сколько неудачных запросов каждой стадии сохраняется в сводке запуска
+MAX_RECORDED_FAILURES = int(os.getenv('MAX_RECORDED_FAILURES', '1000'))
+
+# Префикс имен метрик
+METRIC_PREFIX = 'vacancy_'
+# Границы корзин гистограмм длительности (в секундах)
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MONGO_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+METRIC_HELP = {
+    'stage_duration_seconds': ('gauge', 'Длительность стадии'),
+    'stage_rows_in': ('gauge', 'Строк на входе стадии'),
+    'stage_rows_out': ('gauge', 'Строк на выходе стадии'),
+    'stage_frame_bytes': ('gauge', 'Объем памяти таблицы на выходе стадии'),
+    'http_requests_total': ('counter', 'HTTP-запросы по адресату и коду ответа'),
+    'http_request_duration_seconds': ('histogram', 'Длительность HTTP-запросов'),
+    'mongo_operation_duration_seconds': ('histogram', 'Длительность команд MongoDB'),
+    'mongo_operation_failures_total': ('counter', 'Команды MongoDB, завершившиеся ошибкой'),
+    'documents_deleted': ('gauge', 'Документов удалено очисткой'),
+    'stage_failures': ('gauge', 'Неудачных запросов стадии'),
+    'enrich_queue_batches_total': ('counter', 'Пакеты очереди обогащения по результату'),
+    'peak_rss_bytes': ('gauge', 'Пиковый объем резидентной памяти процесса'),
+    'run_duration_seconds': ('gauge', 'Длительность запуска'),
+    'run_success': ('gauge', '1, если запуск завершился успешно'),
+    'run_finished_timestamp_seconds': ('gauge', 'Время завершения запуска'),
+}
+
+
+def format_labels(labels):
+    """
+    Форматирует метки метрики в текстовом формате Prometheus.
+
+    Параметры:
+        labels (tuple): пары (имя, значение).
+
+    Возвращает:
+        str: метки в фигурных скобках или пустая строка.
+    """
+    if not labels:
+        return ''
+    escaped = [(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+               for name, value in labels]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def peak_rss_bytes():
+    """
+    Возвращает пиковый объем резидентной памяти процесса в байтах.
+    """
+    # В Linux ru_maxrss - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    """
+    Метрики одного запуска: счетчики, значения и гистограммы с метками.
+
+    Метрики копятся в памяти процесса, а в конце запуска выгружаются
+    методом export: в файл для textfile collector, в Pushgateway
+    и сводкой в MongoDB. Запись потокобезопасна.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = []
+        self.failures = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1):
+        """
+        Увеличивает счетчик.
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        """
+        Устанавливает значение метрики.
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, labels=None, buckets=HTTP_BUCKETS):
+        """
+        Добавляет наблюдение в гистограмму.
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+                self._histograms[key] = histogram
+            for number, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][number] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def record_stage(self, stage, seconds, rows_in=None, rows_out=None):
+        """
+        Сохраняет длительность стадии и количество строк на ее входе и выходе.
+        """
+        labels = {'stage': stage}
+        self.set('stage_duration_seconds', seconds, labels)
+        if rows_in is not None:
+            self.set('stage_rows_in', rows_in, labels)
+        if rows_out is not None:
+            self.set('stage_rows_out', rows_out, labels)
+        with self._lock:
+            self.stages.append({'stage': stage, 'seconds': round(seconds, 3),
+                                'rows_in': rows_in, 'rows_out': rows_out})
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Замеряет длительность блока кода как стадии. Количество строк можно
+        указать в словаре, который возвращает контекстный менеджер:
+
+            with metrics.stage('dedup') as rows:
+                rows['rows_out'] = ...
+        """
+        rows = {}
+        started = time.monotonic()
+        try:
+            yield rows
+        finally:
+            self.record_stage(stage, time.monotonic() - started,
+                              rows.get('rows_in'), rows.get('rows_out'))
+
+    def record_failures(self, stage, failures):
+        """
+        Сохраняет неудачные запросы стадии для сводки запуска. В сводку
+        попадают первые MAX_RECORDED_FAILURES запросов, в метрику
+        stage_failures - их общее количество.
+
+        Параметры:
+            stage (str): имя стадии.
+            failures (list): словари с описанием запросов (url, status, attempts, error).
+        """
+        self.set('stage_failures', len(failures), {'stage': stage})
+        with self._lock:
+            self.failures[stage] = failures[:MAX_RECORDED_FAILURES]
+
+    def observe_http(self, target, status, seconds):
+        """
+        Учитывает HTTP-запрос.
+
+        Параметры:
+            target (str): адресат запроса (search, vacancy, areas, currency).
+            status: код ответа или 'error', если ответа нет.
+            seconds (float): длительность запроса.
+        """
+        self.inc('http_requests_total', {'target': target, 'status': status})
+        self.observe('http_request_duration_seconds', seconds, {'target': target}, HTTP_BUCKETS)
+
+    def observe_mongo(self, command, seconds, failed=False):
+        """
+        Учитывает команду MongoDB.
+        """
+        self.observe('mongo_operation_duration_seconds', seconds, {'command': command},
+                     MONGO_BUCKETS)
+        if failed:
+            self.inc('mongo_operation_failures_total', {'command': command})
+
+    def render(self, job):
+        """
+        Возвращает метрики в текстовом формате Prometheus. Ко всем метрикам
+        добавляется метка pipeline с именем запуска.
+        """
+        job_label = (('pipeline', job),)
+        series = {}
+        with self._lock:
+            for (name, labels), value in list(self._counters.items()) + list(self._gauges.items()):
+                series.setdefault(name, []).append(
+                    f'{METRIC_PREFIX}{name}{format_labels(job_label + labels)} {value}')
+            for (name, labels), histogram in self._histograms.items():
+                lines = series.setdefault(name, [])
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    lines.append(f'{METRIC_PREFIX}{name}_bucket'
+                                 f'{format_labels(job_label + labels + (("le", bound),))} {count}')
+                lines.append(f'{METRIC_PREFIX}{name}_bucket'
+                             f'{format_labels(job_label + labels + (("le", "+Inf"),))} '
+                             f'{histogram["count"]}')
+                lines.append(f'{METRIC_PREFIX}{name}_sum{format_labels(job_label + labels)} '
+                             f'{histogram["sum"]}')
+                lines.append(f'{METRIC_PREFIX}{name}_count{format_labels(job_label + labels)} '
+                             f'{histogram["count"]}')
+
+        text = []
+        for name in sorted(series):
+            metric_type, help_text = METRIC_HELP.get(name, ('gauge', name))
+            text.append(f'# HELP {METRIC_PREFIX}{name} {help_text}')
+            text.append(f'# TYPE {METRIC_PREFIX}{name} {metric_type}')
+            text.extend(series[name])
+        return '\n'.join(text) + '\n'
+
+    def summary(self, job, status):
+        """
+        Возвращает сводку запуска для сохранения в MongoDB.
+        """
+        finished_at = datetime.now(timezone.utc)
+        with self._lock:
+            http = {}
+            for (name, labels), value in self._counters.items():
+                if name == 'http_requests_total':
+                    labels = dict(labels)
+                    http.setdefault(labels['target'], {})[str(labels['status'])] = value
+            mongo = {dict(labels)['command']: {'count': histogram['count'],
+                                               'seconds': round(histogram['sum'], 3)}
+                     for (name, labels), histogram in self._histograms.items()
+                     if name == 'mongo_operation_duration_seconds'}
+            stages = list(self.stages)
+            failures = dict(self.failures)
+        return {'job': job,
+                'status': status,
+                'started_at': self.started_at,
+                'finished_at': finished_at,
+                'duration_seconds': round((finished_at - self.started_at).total_seconds(), 3),
+                'stages': stages,
+                'http_requests': http,
+                'mongo_operations': mongo,
+                'failures': failures,
+                'peak_rss_bytes': peak_rss_bytes()}
+
+    def export(self, job, status='success', db=None):
+        """
+        Выгружает метрики запуска.
+
+        Метрики записываются в <METRICS_TEXTFILE_DIR>/<job>.prom и, если задан
+        PUSHGATEWAY_URL, отправляются в Pushgateway. При переданной базе
+        сводка запуска сохраняется в коллекцию RUN_SUMMARY_COLLECTION.
+        Ошибки выгрузки только записываются в лог.
+
+        Параметры:
+            job (str): имя запуска (data_processor, delete_duplicates, ...).
+            status (str): итог запуска: 'success' или 'failed'.
+            db (Database): база данных для сводки, необязательная.
+        """
+        summary = self.summary(job, status)
+        self.set('peak_rss_bytes', summary['peak_rss_bytes'])
+        self.set('run_duration_seconds', summary['duration_seconds'])
+        self.set('run_success', int(status == 'success'))
+        self.set('run_finished_timestamp_seconds', round(summary['finished_at'].timestamp(), 3))
+        text = self.render(job)
+
+        if METRICS_TEXTFILE_DIR:
+            try:
+                os.makedirs(METRICS_TEXTFILE_DIR, exist_ok=True)
+                path = os.path.join(METRICS_TEXTFILE_DIR, f'{job}.prom')
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    file.write(text)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logging.warning(f'Не удалось сохранить метрики в файл: {e}')
+
+        if PUSHGATEWAY_URL:
+            # PUT заменяет все метрики группы job, оставшиеся от прошлого запуска
+            request = urllib.request.Request(f'{PUSHGATEWAY_URL.rstrip("/")}/metrics/job/{job}',
+                                             data=text.encode('utf-8'), method='PUT',
+                                             headers={'Content-Type': 'text/plain; version=0.0.4'})
+            try:
+                with urllib.request.urlopen(request, timeout=10):
+                    pass
+            except OSError as e:
+                logging.warning(f'Не удалось отправить метрики в Pushgateway: {e}')
+
+        if db is not None:
+            try:
+                db[RUN_SUMMARY_COLLECTION].insert_one(summary)
+            except Exception as e:
+                logging.warning(f'Не удалось сохранить сводку запуска: {e}')
+
+        logging.info(f'Запуск {job}: {status} за {summary["duration_seconds"]} с, '
+                     f'пиковая память {summary["peak_rss_bytes"] / 2 ** 20:.0f} МБ')
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Слушатель команд pymongo: длительность каждой команды попадает в метрики.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.observe_mongo(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        metrics.observe_mongo(event.command_name, event.duration_micros / 1e6, failed=True)
+
+
+# Метрики текущего процесса
+metrics = Metrics()
@@ -0,0 +1,296 @@
+import glob
+import logging
+import os
+import shutil
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metrics import metrics
+
+# Каталог для контрольных точек стадий
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', 'data/checkpoints')
+# Сохранять ли результат каждой стадии на диск
+PIPELINE_CHECKPOINTS = os.getenv('PIPELINE_CHECKPOINTS', 'true').lower() in ('1', 'true', 'yes')
+# Продолжить прерванный запуск с последней контрольной точки
+PIPELINE_RESUME = os.getenv('PIPELINE_RESUME', 'false').lower() in ('1', 'true', 'yes')
+# Сколько дней хранить контрольные точки незавершенных запусков
+CHECKPOINT_RETENTION_DAYS = float(os.getenv('CHECKPOINT_RETENTION_DAYS', '7'))
+
+
+def write_checkpoint(df, path):
+    """
+    Сохраняет DataFrame в Parquet. Вложенные поля (списки и словари)
+    сохраняются как типы Arrow list/struct, а не как строки.
+
+    Параметры:
+        df (pd.DataFrame): данные для сохранения.
+        path (str): путь к файлу.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f'{path}.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """
+    Читает DataFrame из Parquet. Вложенные поля возвращаются как обычные
+    списки и словари Python.
+
+    Параметры:
+        path (str): путь к файлу.
+
+    Возвращает:
+        pd.DataFrame: прочитанные данные.
+    """
+    table = pq.read_table(path)
+    return pd.DataFrame(table.to_pylist(), columns=table.column_names)
+
+
+def remove_stale_runs(checkpoint_dir, name, keep_days=CHECKPOINT_RETENTION_DAYS):
+    """
+    Удаляет контрольные точки запусков конвейера, в которых ни один файл
+    не изменялся дольше keep_days дней (например, запусков, брошенных
+    после ошибки).
+
+    Параметры:
+        checkpoint_dir (str): каталог для контрольных точек.
+        name (str): имя конвейера.
+        keep_days (float): сколько дней хранить контрольные точки.
+
+    Возвращает:
+        list: идентификаторы удаленных запусков.
+    """
+    root = os.path.join(checkpoint_dir, name)
+    if not os.path.isdir(root):
+        return []
+
+    deadline = time.time() - keep_days * 24 * 60 * 60
+    removed = []
+    for run_id in sorted(os.listdir(root)):
+        path = os.path.join(root, run_id)
+        if not os.path.isdir(path):
+            continue
+        modified = max([os.path.getmtime(path)] +
+                       [os.path.getmtime(os.path.join(path, file)) for file in os.listdir(path)])
+        if modified < deadline:
+            shutil.rmtree(path)
+            removed.append(run_id)
+
+    if removed:
+        logging.info(f'Удалены контрольные точки старых запусков: {", ".join(removed)}')
+    return removed
+
+
+class Pipeline:
+    """
+    Последовательность стадий обработки данных.
+
+    Каждая стадия - функция, которая принимает DataFrame предыдущей стадии
+    и возвращает новый. Данные передаются между стадиями в памяти, а при
+    заданном checkpoint_dir результат каждой стадии дополнительно
+    сохраняется в Parquet, чтобы упавший запуск можно было продолжить
+    с последней успешно завершенной стадии.
+
+    Стадии можно выполнять и по одной (run_stage), например отдельными
+    задачами Airflow: тогда входные данные стадии читаются из контрольной
+    точки предыдущей стадии того же запуска (run_id).
+
+    Параметры:
+        name (str): имя конвейера, используется в пути к контрольным точкам.
+        stages (list): список пар (имя стадии, функция).
+        checkpoint_dir (str): каталог для контрольных точек или None,
+        если их сохранять не нужно.
+        run_id (str): идентификатор запуска, необязательный. Контрольные
+        точки разных запусков хранятся в отдельных подкаталогах.
+        schema (callable): функция, приводящая типы колонок, необязательная.
+        Применяется к результату каждой стадии и к прочитанным контрольным
+        точкам (из Parquet вложенные поля читаются объектами Python,
+        и типы колонок нужно восстановить).
+    """
+
+    def __init__(self, name, stages, checkpoint_dir=None, run_id=None, schema=None):
+        self.name = name
+        self.stages = stages
+        self.schema = schema
+        self.checkpoint_dir = None
+        if checkpoint_dir:
+            self.checkpoint_dir = os.path.join(checkpoint_dir, name)
+            if run_id:
+                self.checkpoint_dir = os.path.join(self.checkpoint_dir, run_id)
+
+    def checkpoint_path(self, stage_name, part=None):
+        """
+        Возвращает путь к контрольной точке стадии.
+
+        Параметры:
+            stage_name (str): имя стадии.
+            part: номер части, если стадия выполняется по частям.
+
+        Возвращает:
+            str: путь к файлу Parquet.
+        """
+        number = [name for name, _ in self.stages].index(stage_name)
+        suffix = '' if part is None else f'-{part}'
+        return os.path.join(self.checkpoint_dir, f'{number:02d}_{stage_name}{suffix}.parquet')
+
+    def part_paths(self, stage_name):
+        """
+        Возвращает пути к контрольным точкам частей стадии.
+        """
+        pattern = self.checkpoint_path(stage_name, part='*')
+        return sorted(glob.glob(pattern))
+
+    def clear_checkpoints(self):
+        """
+        Удаляет контрольные точки предыдущего запуска, в том числе частей стадий.
+        """
+        for stage_name, _ in self.stages:
+            for path in [self.checkpoint_path(stage_name)] + self.part_paths(stage_name):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def read_stage_output(self, stage_name):
+        """
+        Читает результат стадии из контрольной точки. Если стадия выполнялась
+        по частям, части объединяются.
+
+        Параметры:
+            stage_name (str): имя стадии.
+
+        Возвращает:
+            pd.DataFrame: результат стадии.
+        """
+        path = self.checkpoint_path(stage_name)
+        if os.path.exists(path):
+            return self.conform(read_checkpoint(path))
+        parts = self.part_paths(stage_name)
+        if not parts:
+            raise FileNotFoundError(f'Нет контрольной точки стадии {stage_name}: {path}')
+        logging.info(f'Объединение частей стадии {stage_name}: {len(parts)}')
+        return self.conform(pd.concat([read_checkpoint(part) for part in parts],
+                                      ignore_index=True))
+
+    def conform(self, df):
+        """
+        Приводит типы колонок по схеме конвейера, если она задана.
+        """
+        return self.schema(df) if self.schema is not None else df
+
+    def last_checkpoint(self):
+        """
+        Находит последнюю стадию, для которой есть контрольная точка.
+
+        Возвращает:
+            int: индекс стадии или -1, если контрольных точек нет.
+        """
+        last = -1
+        for number, (stage_name, _) in enumerate(self.stages):
+            if not os.path.exists(self.checkpoint_path(stage_name)):
+                break
+            last = number
+        return last
+
+    def execute(self, stage_name, stage, df, **kwargs):
+        """
+        Выполняет функцию стадии, замеряя время и количество строк.
+
+        Параметры:
+            stage_name (str): имя стадии.
+            stage (callable): функция стадии.
+            df (pd.DataFrame): входные данные стадии или None.
+            **kwargs: дополнительные параметры функции стадии.
+
+        Возвращает:
+            pd.DataFrame: результат стадии.
+        """
+        started = time.monotonic()
+        rows_in = len(df) if df is not None else None
+        logging.info(f'Начало стадии {stage_name}')
+        df = self.conform(stage(df, **kwargs))
+        seconds = time.monotonic() - started
+        frame_bytes = int(df.memory_usage(deep=True).sum())
+        metrics.record_stage(stage_name, seconds, rows_in=rows_in, rows_out=len(df))
+        metrics.set('stage_frame_bytes', frame_bytes, {'stage': stage_name})
+        logging.info(f'Стадия {stage_name} завершена за {seconds:.1f} с, строк: {len(df)}, '
+                     f'память таблицы: {frame_bytes / 2 ** 20:.1f} МБ')
+        return df
+
+    def run(self, df=None, resume=False):
+        """
+        Выполняет стадии конвейера по порядку.
+
+        Если стадия вернула пустой DataFrame, следующие стадии не выполняются.
+
+        Параметры:
+            df (pd.DataFrame): входные данные первой стадии, необязательные.
+            resume (bool): продолжить с последней контрольной точки
+            (требует checkpoint_dir).
+
+        Возвращает:
+            pd.DataFrame: результат последней выполненной стадии.
+        """
+        start = 0
+        if self.checkpoint_dir:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            if resume:
+                last = self.last_checkpoint()
+                if last >= 0:
+                    stage_name = self.stages[last][0]
+                    df = self.conform(read_checkpoint(self.checkpoint_path(stage_name)))
+                    start = last + 1
+                    logging.info(f'Продолжение с контрольной точки стадии {stage_name}')
+                    if df.empty:
+                        logging.info('Контрольная точка пуста, продолжать нечего')
+                        return df
+            else:
+                self.clear_checkpoints()
+
+        for stage_name, stage in self.stages[start:]:
+            df = self.execute(stage_name, stage, df)
+
+            if self.checkpoint_dir:
+                write_checkpoint(df, self.checkpoint_path(stage_name))
+
+            if df.empty:
+                logging.info(f'Стадия {stage_name} вернула пустой набор данных, '
+                             f'следующие стадии пропущены')
+                break
+
+        return df
+
+    def run_stage(self, stage_name, part=None, **kwargs):
+        """
+        Выполняет одну стадию конвейера.
+
+        Входные данные берутся из контрольной точки предыдущей стадии
+        (все ее части объединяются), а результат сохраняется в контрольную
+        точку этой стадии, откуда его прочитает следующая. Если входные
+        данные пусты, стадия не выполняется и дальше передается пустой
+        набор данных. Повторный запуск стадии перезаписывает ее результат.
+
+        Параметры:
+            stage_name (str): имя стадии.
+            part: номер части, если стадия выполняется по частям
+            (например, сбор по разным поисковым запросам).
+            **kwargs: дополнительные параметры функции стадии.
+
+        Возвращает:
+            pd.DataFrame: результат стадии.
+        """
+        if not self.checkpoint_dir:
+            raise ValueError('Для запуска отдельной стадии нужен checkpoint_dir')
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        names = [name for name, _ in self.stages]
+        number = names.index(stage_name)
+        df = self.read_stage_output(names[number - 1]) if number > 0 else None
+
+        if df is not None and df.empty:
+            logging.info(f'Входные данные стадии {stage_name} пусты, стадия пропущена')
+        else:
+            df = self.execute(stage_name, self.stages[number][1], df, **kwargs)
+
+        write_checkpoint(df, self.checkpoint_path(stage_name, part))
+        return df
@@ -0,0 +1,80 @@
+import logging
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+# Схема таблиц вакансий между стадиями конвейера.
+# Поля с небольшим числом разных значений хранятся как категории: каждая
+# строка хранит номер категории, а сами строки - один раз на таблицу.
+# Названия полей API (experience.name, area.name) и переименованные
+# (experience, city) перечислены вместе: схема применяется после каждой стадии
+CATEGORY_COLUMNS = ['experience.name', 'experience', 'area.name', 'city', 'country', 'schedule',
+                    'language', 'language_level', 'salary.currency']
+# Зарплаты в долларах - целые числа с пропусками
+SALARY_COLUMNS = ['salary_from', 'salary_to']
+SALARY_DTYPE = 'Int32'
+# Даты - datetime64 в UTC, а не строки
+DATETIME_COLUMNS = ['published_at']
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def apply_schema(df):
+    """
+    Приводит колонки таблицы вакансий к типам схемы. Колонки, которых
+    в таблице нет, пропускаются, а уже приведенные не пересчитываются.
+
+    Параметры:
+        df (pd.DataFrame): вакансии.
+
+    Возвращает:
+        pd.DataFrame: вакансии с категориями, целыми зарплатами и датами.
+    """
+    for column in CATEGORY_COLUMNS:
+        # До разбора вложенных полей (например, schedule после обогащения)
+        # в колонке лежат словари API, а не строки: такие колонки не трогаем
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype) \
+                and infer_dtype(df[column], skipna=True) in ('string', 'empty'):
+            df[column] = df[column].astype('category')
+
+    for column in SALARY_COLUMNS:
+        if column in df and df[column].dtype != SALARY_DTYPE:
+            salary = pd.to_numeric(df[column], errors='coerce').round()
+            too_large = salary.abs() > INT32_MAX
+            if too_large.any():
+                logging.warning(f'{column}: {int(too_large.sum())} значений вне диапазона Int32 '
+                                f'заменены пропусками')
+                salary = salary.mask(too_large)
+            df[column] = salary.astype(SALARY_DTYPE)
+
+    for column in DATETIME_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            df[column] = pd.to_datetime(df[column], utc=True)
+
+    return df
+
+
+def to_records(df):
+    """
+    Преобразует таблицу вакансий в документы для MongoDB.
+
+    Категории становятся строками, целые с пропусками - int, а пропуски
+    любого типа (NaN, NaT, pd.NA) - null, так что документы не зависят
+    от того, в каких типах таблица хранилась в памяти.
+
+    Параметры:
+        df (pd.DataFrame): вакансии.
+
+    Возвращает:
+        list: документы (словари).
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == SALARY_DTYPE:
+            values = [None if value is pd.NA else int(value) for value in series]
+        else:
+            values = series.astype(object).where(series.notna(), None).tolist()
+        columns[column] = values
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
@@ -0,0 +1,213 @@
+import ast
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from pymongo import UpdateOne
+from db_connection import get_mongo_client
+
+# Файл JSON с дополнительными синонимами навыков {"вариант": "навык"}.
+# Его записи дополняют и переопределяют SKILL_ALIASES.
+SKILL_ALIASES_PATH = os.getenv('SKILL_ALIASES_PATH', 'skill_aliases.json')
+# Размер кэша нормализованных навыков (словарь навыков небольшой и часто повторяется)
+SKILL_CACHE_SIZE = int(os.getenv('SKILL_CACHE_SIZE', '16384'))
+
+# Синонимы навыков: вариант после очистки -> каноническое название
+SKILL_ALIASES = {
+    'pyspark': 'spark',
+    'spark sql': 'spark',
+    'sparksql': 'spark',
+    'spark streaming': 'spark',
+    'python3': 'python',
+    'python 3': 'python',
+    'postgres': 'postgresql',
+    'postgre sql': 'postgresql',
+    'postgresql sql': 'postgresql',
+    'mssql': 'ms sql server',
+    'ms sql': 'ms sql server',
+    'sql server': 'ms sql server',
+    'mongo': 'mongodb',
+    'mongo db': 'mongodb',
+    'click house': 'clickhouse',
+    'k8s': 'kubernetes',
+    'bigdata': 'big data',
+    'powerbi': 'power bi',
+    'ms power bi': 'power bi',
+    'ms excel': 'excel',
+    'english': 'английский язык',
+}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+BRACKETS_PATTERN = re.compile(r'[();]')
+
+
+def load_aliases(path=SKILL_ALIASES_PATH):
+    """
+    Собирает таблицу синонимов: встроенные SKILL_ALIASES и записи из файла.
+
+    Параметры:
+        path (str): путь к файлу JSON с синонимами. Если файла нет,
+        используются только встроенные синонимы.
+
+    Возвращает:
+        dict: вариант навыка -> каноническое название.
+    """
+    aliases = dict(SKILL_ALIASES)
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as file:
+            aliases.update(json.load(file))
+        logging.info(f'Загружены синонимы навыков из {path}')
+    return aliases
+
+
+aliases = load_aliases()
+
+
+def as_skill_list(value):
+    """
+    Приводит значение поля key_skills к списку.
+
+    Документы, загруженные до перехода на хранение массивов, могут содержать
+    строковое представление списка Python - такое значение разбирается
+    (см. migrate_key_skills).
+
+    Параметры:
+        value: список навыков, его строковое представление или пропуск.
+
+    Возвращает:
+        list или None: список навыков или None, если навыков нет.
+    """
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+    if isinstance(value, (list, tuple)) and value:
+        return list(value)
+    return None
+
+
+@lru_cache(maxsize=SKILL_CACHE_SIZE)
+def normalize(skill):
+    """
+    Приводит название навыка к каноническому виду.
+
+    Навык очищается от лишних пробелов, тире заменяются на пробелы,
+    удаляются скобки, название приводится к нижнему регистру и из него
+    удаляется слово 'apache'. Затем вариант заменяется каноническим
+    названием из таблицы синонимов.
+
+    Параметры:
+        skill (str): название навыка из вакансии.
+
+    Возвращает:
+        str: каноническое название навыка.
+    """
+    skill = WHITESPACE_PATTERN.sub(' ', skill)  # Удаление лишних пробелов
+    skill = skill.replace('-', ' ')             # Замена тире на пробелы
+    skill = BRACKETS_PATTERN.sub('', skill)     # Удаление скобок
+    skill = skill.lower()                       # Приведение к нижнему регистру
+    skill = skill.replace('apache ', '')        # Удаление 'apache'
+    skill = skill.strip()
+    return aliases.get(skill, skill)
+
+
+def normalize_skills(skills):
+    """
+    Приводит список навыков вакансии к списку канонических навыков.
+
+    Навыки, совпавшие после нормализации (например, 'Spark' и 'PySpark'),
+    остаются в списке один раз.
+
+    Параметры:
+        skills (list): список навыков из вакансии или None.
+
+    Возвращает:
+        list или None: канонические навыки в исходном порядке
+        или None, если навыков нет.
+    """
+    if not isinstance(skills, (list, tuple)) or not skills:
+        return None
+    normalized = []
+    for skill in skills:
+        skill = normalize(skill)
+        if skill and skill not in normalized:
+            normalized.append(skill)
+    return normalized or None
+
+
+def migrate_key_skills(collection, batch_size=1000):
+    """
+    Переводит key_skills, сохраненные строковым представлением списка Python,
+    в массивы BSON и заполняет для них канонические навыки.
+
+    Строки, которые не удалось разобрать, остаются без изменений.
+
+    Параметры:
+        collection (Collection): коллекция с вакансиями.
+        batch_size (int): количество операций в одном пакете.
+
+    Возвращает:
+        int: количество преобразованных документов.
+    """
+    migrated = 0
+    failed = 0
+    operations = []
+    for doc in collection.find({'key_skills': {'$type': 'string'}}, {'key_skills': 1}):
+        key_skills = as_skill_list(doc['key_skills'])
+        if key_skills is None and doc['key_skills'] not in ('', '[]'):
+            failed += 1
+            continue
+        operations.append(UpdateOne({'_id': doc['_id']},
+                                    {'$set': {'key_skills': key_skills,
+                                              'skills': normalize_skills(key_skills)}}))
+        if len(operations) >= batch_size:
+            migrated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        migrated += collection.bulk_write(operations, ordered=False).modified_count
+
+    if failed:
+        logging.warning(f'Не удалось разобрать key_skills у документов: {failed}')
+    return migrated
+
+
+def backfill_skills(db_name, collection_name, batch_size=1000):
+    """
+    Заполняет поле skills у документов, загруженных до нормализации навыков
+    при загрузке.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        collection_name (str): имя коллекции с вакансиями.
+        batch_size (int): количество операций в одном пакете.
+
+    Возвращает:
+        int: количество обновленных документов.
+    """
+    collection = get_mongo_client()[db_name][collection_name]
+    updated = 0
+    operations = []
+
+    # Сначала строковые key_skills переводятся в массивы
+    migrated = migrate_key_skills(collection, batch_size)
+    logging.info(f'Преобразовано key_skills из строки в массив: {migrated}')
+
+    for doc in collection.find({'skills': {'$exists': False}}, {'key_skills': 1}):
+        skills = normalize_skills(as_skill_list(doc.get('key_skills')))
+        operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {'skills': skills}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+
+    logging.info(f'Заполнено поле skills у документов: {updated}')
+    return updated
+
+
+if __name__ == '__main__':
+    # Заполнение канонических навыков у ранее загруженных вакансий
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backfill_skills('vacancydb', 'vacancy')
@@ -0,0 +1,141 @@
+import logging
+import os
+from datetime import datetime, timezone
+import pandas as pd
+from pymongo import ReplaceOne
+from db_connection import get_mongo_client
+from watermark import METADATA_COLLECTION
+from skills import as_skill_list, normalize_skills
+
+# Коллекция с предрассчитанной статистикой для визуализации
+STATS_COLLECTION = 'vacancy_stats'
+# Ширина корзины гистограммы зарплат, $
+SALARY_BUCKET_WIDTH = int(os.getenv('SALARY_BUCKET_WIDTH', '250'))
+# id документа в METADATA_COLLECTION с временем последнего изменения данных.
+# По нему веб-приложение сбрасывает кэш ответов API
+DATA_VERSION_ID = 'data_version'
+
+# Поля вакансий, которые нужны для расчета статистики
+STATS_FIELDS = ['published_at', 'salary_from', 'salary_to', 'experience', 'country',
+                'skills', 'key_skills']
+
+
+def compute_stats(df, bucket_width=SALARY_BUCKET_WIDTH):
+    """
+    Считает статистику по вакансиям отдельно для каждого дня публикации.
+
+    Виды статистики (kind):
+        - salary_hist: количество вакансий в корзинах зарплаты шириной bucket_width;
+        - country: количество вакансий по странам;
+        - salary: сумма, количество и максимум зарплаты по опыту и стране;
+        - skills: встречаемость канонических навыков по опыту.
+
+    Зарплата вакансии - среднее между границами зарплатной вилки.
+
+    Параметры:
+        df (pd.DataFrame): вакансии с колонками STATS_FIELDS.
+        bucket_width (int): ширина корзины гистограммы зарплат.
+
+    Возвращает:
+        list: документы для коллекции STATS_COLLECTION, по одному на пару
+        (день, вид статистики).
+    """
+    df = df.copy()
+    df['day'] = pd.to_datetime(df['published_at'], utc=True).dt.strftime('%Y-%m-%d')
+    df['salary'] = (df['salary_from'] + df['salary_to']) / 2
+    salaried = df[df['salary'].notnull()]
+
+    hist = (salaried
+            .assign(bucket=(salaried['salary'] // bucket_width * bucket_width).astype('int64'))
+            .groupby(['day', 'bucket']).size().rename('count').reset_index())
+
+    countries = df.groupby(['day', 'country']).size().rename('count').reset_index()
+
+    salary = (salaried.groupby(['day', 'experience', 'country'])['salary']
+              .agg(['sum', 'count', 'max']).reset_index())
+
+    # Канонические навыки сохраняются при загрузке; у старых документов
+    # без поля skills они вычисляются из key_skills
+    df['skills'] = [skills if isinstance(skills, list) else normalize_skills(as_skill_list(key_skills))
+                    for skills, key_skills in zip(df['skills'], df['key_skills'])]
+    skills = df[['day', 'experience']].assign(skill=df['skills']).dropna(subset=['skill'])
+    skills = (skills.explode('skill')
+              .groupby(['day', 'experience', 'skill']).size().rename('count').reset_index())
+
+    docs = []
+    for kind, frame in [('salary_hist', hist),
+                        ('country', countries),
+                        ('salary', salary),
+                        ('skills', skills)]:
+        for day, rows in frame.groupby('day'):
+            docs.append({'_id': f'{day}:{kind}',
+                         'day': day,
+                         'kind': kind,
+                         'bucket_width': bucket_width,
+                         'rows': rows.drop(columns='day').to_dict(orient='records')})
+    return docs
+
+
+def mark_data_updated(db):
+    """
+    Отмечает, что вакансии в базе изменились (загрузка, удаление дублей
+    или устаревших записей завершены).
+
+    Параметры:
+        db (Database): база данных.
+    """
+    db[METADATA_COLLECTION].update_one({'_id': DATA_VERSION_ID},
+                                       {'$set': {'updated_at': datetime.now(timezone.utc)}},
+                                       upsert=True)
+
+
+def refresh_stats(db_name, collection_name, since=None):
+    """
+    Пересчитывает статистику за дни, начиная с дня публикации since.
+
+    Статистика хранится отдельно по дням, поэтому после загрузки новых
+    вакансий достаточно пересчитать только затронутые дни, а не всю
+    коллекцию. Без since статистика пересчитывается полностью.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        collection_name (str): имя коллекции с вакансиями.
+        since (datetime): самая ранняя дата публикации среди изменившихся вакансий.
+
+    Возвращает:
+        int: количество сохраненных документов статистики.
+    """
+    query = {}
+    day_filter = {}
+    if since is not None:
+        first_day = pd.Timestamp(since)
+        if first_day.tzinfo is None:
+            first_day = first_day.tz_localize('UTC')
+        first_day = first_day.tz_convert('UTC').normalize()
+        query = {'published_at': {'$gte': first_day.to_pydatetime()}}
+        day_filter = {'day': {'$gte': first_day.strftime('%Y-%m-%d')}}
+
+    db = get_mongo_client()[db_name]
+    projection = {field: 1 for field in STATS_FIELDS}
+    df = pd.DataFrame(list(db[collection_name].find(query, projection)),
+                      columns=STATS_FIELDS)
+
+    docs = compute_stats(df) if len(df) else []
+    stats = db[STATS_COLLECTION]
+    if docs:
+        stats.bulk_write([ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in docs],
+                         ordered=False)
+    # Дни, вакансий за которые больше нет, удаляются
+    stale_filter = dict(day_filter, _id={'$nin': [doc['_id'] for doc in docs]})
+    stats.delete_many(stale_filter)
+    stats.create_index([('day', 1), ('kind', 1)])
+    mark_data_updated(db)
+
+    logging.info(f'Статистика обновлена: документов {len(docs)}, вакансий {len(df)}')
+    return len(docs)
+
+
+if __name__ == '__main__':
+    # Полный пересчет статистики по всей коллекции
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    refresh_stats('vacancydb', 'vacancy')
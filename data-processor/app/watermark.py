@@ -0,0 +1,89 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from db_connection import get_mongo_client
+
+# Коллекция со служебными данными и id документа с отметкой сборщика
+METADATA_COLLECTION = 'metadata'
+WATERMARK_ID = 'collector'
+
+# Перекрытие окна сбора (в часах), чтобы не потерять вакансии,
+# опубликованные одновременно с последней загруженной
+COLLECT_OVERLAP_HOURS = float(os.getenv('COLLECT_OVERLAP_HOURS', '6'))
+# Режим полной загрузки: отметка игнорируется, вакансии собираются
+# за BACKFILL_DAYS последних дней (hh.ru отдает не больше 30 дней)
+FULL_BACKFILL = os.getenv('FULL_BACKFILL', 'false').lower() in ('1', 'true', 'yes')
+BACKFILL_DAYS = int(os.getenv('BACKFILL_DAYS', '30'))
+
+
+def get_watermark(db_name):
+    """
+    Возвращает дату публикации самой свежей из загруженных вакансий.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+
+    Возвращает:
+        datetime или None: дата в UTC или None, если сбор еще не выполнялся.
+    """
+    doc = get_mongo_client()[db_name][METADATA_COLLECTION].find_one({'_id': WATERMARK_ID})
+    if not doc or not doc.get('last_published_at'):
+        return None
+    return doc['last_published_at'].replace(tzinfo=timezone.utc)
+
+
+def save_watermark(db_name, published_at):
+    """
+    Сохраняет дату публикации самой свежей из загруженных вакансий.
+    Отметка никогда не сдвигается назад.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        published_at (pd.Series): даты публикации загруженных вакансий.
+    """
+    latest = pd.to_datetime(published_at, utc=True).max()
+    if pd.isnull(latest):
+        logging.info('Новых вакансий нет, отметка сборщика не изменилась')
+        return
+
+    get_mongo_client()[db_name][METADATA_COLLECTION].update_one(
+        {'_id': WATERMARK_ID},
+        {'$max': {'last_published_at': latest.to_pydatetime()},
+         '$set': {'updated_at': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    logging.info(f'Отметка сборщика: {latest.isoformat()}')
+
+
+def get_search_params(db_name, default_days, full_backfill=FULL_BACKFILL,
+                      overlap_hours=COLLECT_OVERLAP_HOURS):
+    """
+    Определяет окно поиска вакансий для очередного запуска.
+
+    Если есть сохраненная отметка, ищутся только вакансии, опубликованные
+    после нее (за вычетом перекрытия), через параметр API date_from.
+    Без отметки используется окно в default_days дней, а в режиме полной
+    загрузки - BACKFILL_DAYS дней.
+
+    Параметры:
+        db_name (str): имя базы данных MongoDB.
+        default_days (int): окно поиска в днях, если отметки нет.
+        full_backfill (bool): режим полной загрузки.
+        overlap_hours (float): перекрытие окна в часах.
+
+    Возвращает:
+        dict: параметры поиска для API hh.ru (period или date_from).
+    """
+    if full_backfill:
+        logging.info(f'Полная загрузка вакансий за {BACKFILL_DAYS} дней')
+        return {'period': BACKFILL_DAYS}
+
+    watermark = get_watermark(db_name)
+    if watermark is None:
+        logging.info(f'Отметка сборщика не найдена, загрузка вакансий за {default_days} дней')
+        return {'period': default_days}
+
+    date_from = watermark - timedelta(hours=overlap_hours)
+    logging.info(f'Загрузка вакансий, опубликованных после {date_from.isoformat()}')
+    return {'date_from': date_from.strftime('%Y-%m-%dT%H:%M:%S%z')}
@@ -0,0 +1,385 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument
+from db_connection import get_mongo_client, close_mongo_client
+from enrichment import fetch_vacancy, ENRICH_WORKERS, ENRICH_RATE_LIMIT, ENRICH_RATE_BURST
+from http_client import create_session
+from archive import ResponseArchive, ARCHIVE_RESPONSES
+from metrics import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Обогащать ли вакансии через очередь в MongoDB (несколько процессов-обработчиков)
+ENRICH_QUEUE = os.getenv('ENRICH_QUEUE', 'false').lower() in ('1', 'true', 'yes')
+ENRICH_QUEUE_DB = os.getenv('ENRICH_QUEUE_DB', 'vacancydb')
+ENRICH_QUEUE_COLLECTION = os.getenv('ENRICH_QUEUE_COLLECTION', 'enrich_queue')
+# Коллекция с общими для всех процессов ограничителями частоты запросов
+RATE_LIMITS_COLLECTION = 'rate_limits'
+# Ключ ограничителя запросов к API hh.ru
+HH_RATE_LIMIT_KEY = 'hh_api'
+
+# Количество вакансий в одном пакете очереди
+ENRICH_QUEUE_BATCH_SIZE = int(os.getenv('ENRICH_QUEUE_BATCH_SIZE', '50'))
+# Срок аренды пакета: если обработчик не завершил пакет за это время,
+# пакет возвращается в очередь
+ENRICH_QUEUE_LEASE_SECONDS = float(os.getenv('ENRICH_QUEUE_LEASE_SECONDS', '600'))
+# Сколько раз пакет может быть взят в работу, прежде чем считаться неудачным
+ENRICH_QUEUE_MAX_ATTEMPTS = int(os.getenv('ENRICH_QUEUE_MAX_ATTEMPTS', '3'))
+# Пауза между проверками очереди, когда работы нет
+ENRICH_QUEUE_POLL_SECONDS = float(os.getenv('ENRICH_QUEUE_POLL_SECONDS', '2'))
+# Завершенные пакеты, которые никто не забрал (например, упал запуск,
+# поставивший их в очередь), удаляются через этот срок
+ENRICH_QUEUE_RETENTION_DAYS = int(os.getenv('ENRICH_QUEUE_RETENTION_DAYS', '7'))
+
+# Состояния пакета
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class MongoRateLimiter:
+    """
+    Ограничитель частоты запросов, общий для всех процессов и контейнеров.
+
+    Работает как TokenBucket, но состояние хранится в одном документе
+    MongoDB: каждый запрос атомарно резервирует следующий свободный момент
+    времени (алгоритм GCRA) и ждет его наступления. Время берется на сервере
+    MongoDB ($$NOW), поэтому расхождение часов между контейнерами
+    не влияет на ограничение.
+
+    Параметры:
+        collection (Collection): коллекция с ограничителями.
+        key (str): имя ограничителя.
+        rate (float): количество запросов в секунду. Значение <= 0
+        отключает ограничение.
+        burst (float): максимальное количество запросов подряд без ожидания.
+    """
+
+    def __init__(self, collection, key, rate, burst=None):
+        self.collection = collection
+        self.key = key
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+
+    def acquire(self):
+        """
+        Резервирует момент для следующего запроса и ждет его наступления.
+        """
+        if self.rate <= 0:
+            return
+
+        interval_ms = 1000 / self.rate
+        burst_ms = (self.burst - 1) * interval_ms
+        state = self.collection.find_one_and_update(
+            {'_id': self.key},
+            [{'$set': {'now': {'$toLong': '$$NOW'}}},
+             {'$set': {'slot': {'$max': [{'$ifNull': ['$tat', 0]},
+                                         {'$subtract': ['$now', burst_ms]}]}}},
+             {'$set': {'tat': {'$add': ['$slot', interval_ms]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+        wait = (state['slot'] - state['now']) / 1000
+        if wait > 0:
+            time.sleep(wait)
+
+
+class EnrichQueue:
+    """
+    Очередь обогащения вакансий в MongoDB.
+
+    Запуск конвейера ставит в очередь вакансии, которых нет в кэше,
+    пакетами по batch_size штук. Обработчики (в том числе в других
+    контейнерах, см. run_worker) атомарно берут пакет в аренду через
+    findOneAndUpdate, загружают описания вакансий и записывают результат
+    в тот же документ. Пакет, аренда которого истекла (обработчик упал или
+    завис), возвращается в очередь, а после max_attempts попыток
+    считается неудачным. Все обработчики делят общий ограничитель частоты
+    запросов (MongoRateLimiter).
+
+    Документ очереди:
+
+        {_id, job, state, items: [{id, url}], attempts, lease_owner,
+         lease_expires_at, enqueued_at, finished_at, results: [[признаки, статус], ...]}
+
+    Параметры:
+        db_name (str): база данных очереди.
+        collection_name (str): коллекция очереди.
+        batch_size (int): количество вакансий в пакете.
+        lease_seconds (float): срок аренды пакета.
+        max_attempts (int): максимальное количество аренд пакета.
+        rate (float): общее ограничение частоты запросов в секунду.
+        burst (float): максимальное количество запросов подряд без ожидания.
+    """
+
+    def __init__(self, db_name=ENRICH_QUEUE_DB, collection_name=ENRICH_QUEUE_COLLECTION,
+                 batch_size=ENRICH_QUEUE_BATCH_SIZE, lease_seconds=ENRICH_QUEUE_LEASE_SECONDS,
+                 max_attempts=ENRICH_QUEUE_MAX_ATTEMPTS, rate=ENRICH_RATE_LIMIT,
+                 burst=ENRICH_RATE_BURST):
+        db = get_mongo_client()[db_name]
+        self.collection = db[collection_name]
+        self.limiter = MongoRateLimiter(db[RATE_LIMITS_COLLECTION], HH_RATE_LIMIT_KEY,
+                                        rate, burst)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def ensure_indexes(self):
+        """
+        Создает индексы для выбора пакетов и удаления забытых пакетов.
+        """
+        self.collection.create_index([('state', ASCENDING), ('enqueued_at', ASCENDING)])
+        self.collection.create_index([('state', ASCENDING), ('lease_expires_at', ASCENDING)])
+        self.collection.create_index('job')
+        self.collection.create_index('finished_at',
+                                     expireAfterSeconds=ENRICH_QUEUE_RETENTION_DAYS * 24 * 60 * 60)
+
+    def enqueue(self, job, items):
+        """
+        Ставит вакансии в очередь пакетами.
+
+        Параметры:
+            job (str): идентификатор задания, по которому потом забираются результаты.
+            items (list): вакансии, словари с ключами id и url.
+
+        Возвращает:
+            int: количество пакетов.
+        """
+        self.ensure_indexes()
+        now = datetime.now(timezone.utc)
+        batches = [{'job': job,
+                    'state': PENDING,
+                    'items': items[start:start + self.batch_size],
+                    'attempts': 0,
+                    'enqueued_at': now}
+                   for start in range(0, len(items), self.batch_size)]
+        if batches:
+            self.collection.insert_many(batches, ordered=False)
+        return len(batches)
+
+    def requeue_expired(self):
+        """
+        Возвращает в очередь пакеты с истекшей арендой. Пакеты, у которых
+        закончились попытки, помечаются неудачными.
+
+        Возвращает:
+            int: количество возвращенных в очередь пакетов.
+        """
+        now = datetime.now(timezone.utc)
+        expired = {'state': LEASED, 'lease_expires_at': {'$lt': now}}
+        self.collection.update_many(dict(expired, attempts={'$gte': self.max_attempts}),
+                                    {'$set': {'state': FAILED, 'finished_at': now},
+                                     '$unset': {'lease_owner': '', 'lease_expires_at': ''}})
+        requeued = self.collection.update_many(
+            dict(expired, attempts={'$lt': self.max_attempts}),
+            {'$set': {'state': PENDING},
+             '$unset': {'lease_owner': '', 'lease_expires_at': ''}}).modified_count
+        if requeued:
+            logging.warning(f'Возвращено в очередь пакетов с истекшей арендой: {requeued}')
+        return requeued
+
+    def claim(self, worker_id):
+        """
+        Атомарно берет в аренду самый старый ожидающий пакет.
+
+        Параметры:
+            worker_id (str): идентификатор обработчика.
+
+        Возвращает:
+            dict: документ пакета или None, если очередь пуста.
+        """
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {'state': PENDING},
+            {'$set': {'state': LEASED,
+                      'lease_owner': worker_id,
+                      'lease_expires_at': now + timedelta(seconds=self.lease_seconds)},
+             '$inc': {'attempts': 1}},
+            sort=[('enqueued_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER)
+
+    def complete(self, batch, worker_id, results):
+        """
+        Записывает результат обработки пакета. Если аренда за это время
+        истекла и пакет взял другой обработчик, результат не записывается.
+
+        Возвращает:
+            bool: записан ли результат.
+        """
+        return self.collection.update_one(
+            {'_id': batch['_id'], 'state': LEASED, 'lease_owner': worker_id},
+            {'$set': {'state': DONE,
+                      'results': [list(result) for result in results],
+                      'finished_at': datetime.now(timezone.utc)},
+             '$unset': {'lease_owner': '', 'lease_expires_at': ''}}).modified_count == 1
+
+    def process(self, batch, session, threads, archive=None):
+        """
+        Загружает описания вакансий пакета.
+
+        Возвращает:
+            list: пары (признаки вакансии или None, статус запроса)
+            в порядке вакансий пакета.
+        """
+        def fetch(item):
+            return fetch_vacancy(session, self.limiter, item['url'], archive=archive)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(fetch, batch['items']))
+
+    def work_once(self, worker_id, session, threads, archive=None):
+        """
+        Обрабатывает один пакет из очереди.
+
+        Возвращает:
+            bool: был ли в очереди пакет.
+        """
+        self.requeue_expired()
+        batch = self.claim(worker_id)
+        if batch is None:
+            return False
+
+        started = time.monotonic()
+        results = self.process(batch, session, threads, archive)
+        completed = self.complete(batch, worker_id, results)
+        metrics.inc('enrich_queue_batches_total', {'result': 'done' if completed else 'lost'})
+        logging.info(f'Пакет {batch["_id"]}: {len(batch["items"])} вакансий за '
+                     f'{time.monotonic() - started:.1f} с'
+                     + ('' if completed else ', аренда истекла, результат не записан'))
+        return True
+
+    def job_pending(self, job):
+        """
+        Возвращает количество незавершенных пакетов задания.
+        """
+        return self.collection.count_documents({'job': job, 'state': {'$in': [PENDING, LEASED]}})
+
+    def job_results(self, job):
+        """
+        Забирает результаты задания и удаляет его пакеты из очереди.
+
+        Возвращает:
+            dict: URL вакансии -> (признаки или None, статус запроса).
+        """
+        results = {}
+        for batch in self.collection.find({'job': job}):
+            if batch['state'] == DONE:
+                for item, (row, status) in zip(batch['items'], batch['results']):
+                    results[item['url']] = (row, status)
+            else:
+                metrics.inc('enrich_queue_batches_total', {'result': 'failed'})
+                for item in batch['items']:
+                    results[item['url']] = (None, {'url': item['url'], 'status': None,
+                                                   'attempts': batch['attempts'],
+                                                   'error': 'пакет не обработан'})
+        self.collection.delete_many({'job': job})
+        return results
+
+    def enrich(self, items, threads=ENRICH_WORKERS, archive=None):
+        """
+        Обогащает вакансии через очередь и ждет результата.
+
+        Текущий процесс тоже обрабатывает пакеты, поэтому задание
+        завершится и без отдельных обработчиков, а каждый запущенный
+        обработчик ускоряет его.
+
+        Параметры:
+            items (list): вакансии, словари с ключами id и url.
+            threads (int): количество потоков текущего процесса.
+            archive (ResponseArchive): архив для необработанных ответов, необязательный.
+
+        Возвращает:
+            list: пары (признаки вакансии или None, статус запроса)
+            в порядке items.
+        """
+        job = uuid.uuid4().hex
+        worker_id = f'{socket.gethostname()}-{os.getpid()}-{job[:8]}'
+        batches = self.enqueue(job, items)
+        logging.info(f'В очередь обогащения поставлено {len(items)} вакансий '
+                     f'({batches} пакетов), задание {job}')
+
+        session = create_session(threads)
+        try:
+            while True:
+                pending = self.job_pending(job)
+                if not pending:
+                    break
+                if not self.work_once(worker_id, session, threads, archive):
+                    # Оставшиеся пакеты задания в работе у других обработчиков
+                    time.sleep(ENRICH_QUEUE_POLL_SECONDS)
+        finally:
+            session.close()
+
+        results = self.job_results(job)
+        return [results[item['url']] for item in items]
+
+
+def run_worker(queue, threads=ENRICH_WORKERS, idle_exit=0, archive=None, stop=None):
+    """
+    Обрабатывает пакеты очереди, пока не будет остановлен.
+
+    Параметры:
+        queue (EnrichQueue): очередь обогащения.
+        threads (int): количество потоков обработчика.
+        idle_exit (float): завершиться, если работы нет столько секунд
+        (0 - работать бесконечно).
+        archive (ResponseArchive): архив для необработанных ответов, необязательный.
+        stop (threading.Event): событие остановки, необязательное. Проверяется
+        между пакетами: начатый пакет обрабатывается до конца.
+    """
+    stop = stop or threading.Event()
+    worker_id = f'{socket.gethostname()}-{os.getpid()}'
+    logging.info(f'Обработчик очереди обогащения {worker_id} запущен')
+    session = create_session(threads)
+    idle_since = time.monotonic()
+    try:
+        while not stop.is_set():
+            if queue.work_once(worker_id, session, threads, archive):
+                idle_since = time.monotonic()
+            elif idle_exit and time.monotonic() - idle_since >= idle_exit:
+                logging.info('Очередь пуста, обработчик завершается')
+                break
+            else:
+                stop.wait(ENRICH_QUEUE_POLL_SECONDS)
+    finally:
+        session.close()
+    if stop.is_set():
+        logging.info(f'Обработчик очереди обогащения {worker_id} остановлен')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Обработчик очереди обогащения вакансий')
+    parser.add_argument('--threads', type=int, default=ENRICH_WORKERS,
+                        help='количество потоков обработчика')
+    parser.add_argument('--idle-exit', type=float, default=0,
+                        help='завершиться, если очередь пуста столько секунд (0 - не завершаться)')
+    args = parser.parse_args()
+
+    # docker stop посылает SIGTERM: обработчик дорабатывает текущий пакет
+    # и выходит из цикла, чтобы выгрузить метрики. Пакет, не завершенный
+    # до SIGKILL, вернется в очередь по истечении аренды
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    archive = ResponseArchive() if ARCHIVE_RESPONSES else None
+    status = 'failed'
+    try:
+        with metrics.stage('enrich_worker'):
+            run_worker(EnrichQueue(), threads=args.threads, idle_exit=args.idle_exit,
+                       archive=archive, stop=stop)
+        status = 'success'
+    except KeyboardInterrupt:
+        status = 'success'
+    finally:
+        if archive is not None:
+            archive.close()
+        metrics.export('enrich_worker', status, db=get_mongo_client()[ENRICH_QUEUE_DB])
+        close_mongo_client()
@@ -0,0 +1,44 @@
+import ast
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('ARCHIVE_RESPONSES', 'false')
+
+import data_processor  # noqa: E402
+
+DAG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'airflow', 'dags',
+                        'data_processing_dag.py')
+
+
+def dag_collect_parts():
+    """
+    Читает COLLECT_PARTS из файла DAG без импорта Airflow.
+    """
+    with open(DAG_PATH, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'COLLECT_PARTS'
+                                                for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise AssertionError('COLLECT_PARTS не найден в DAG')
+
+
+def test_every_collect_part_gets_queries():
+    parts = dag_collect_parts()
+    assert len(data_processor.vacancy_list) >= parts
+    for part in range(parts):
+        assert data_processor.vacancy_list[part::parts]
+
+
+def test_collect_without_queries_fails():
+    with pytest.raises(ValueError):
+        data_processor.collect(None, queries=[])
+
+
+def test_parts_above_query_count_are_rejected(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['data_processor.py', 'collect', '--run-id', 'test',
+                                      '--part', '0', '--parts', '5'])
+    with pytest.raises(SystemExit):
+        data_processor.parse_args()
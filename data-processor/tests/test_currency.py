@@ -0,0 +1,113 @@
+import importlib
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import currency
+
+
+@pytest.fixture
+def rates(tmp_path, monkeypatch):
+    """
+    Модуль currency, у которого история курсов и ответ API - временные файлы.
+    """
+    monkeypatch.setenv('CURRENCY_RATES_PATH', str(tmp_path / 'currency_rates.json'))
+    monkeypatch.setenv('CURRENCY_RATES_FIXTURE', str(tmp_path / 'currency_fixture.json'))
+    yield importlib.reload(currency)
+    monkeypatch.undo()
+    importlib.reload(currency)
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+
+
+def vacancies(rows):
+    return pd.DataFrame(rows, columns=['salary_from', 'salary_to', 'salary.currency',
+                                       'published_at'])
+
+
+HISTORY = {'2024-01-01': {'RUB': 100.0, 'EUR': 0.5, 'BYN': 4.0},
+           '2024-01-10': {'RUB': 50.0, 'EUR': 0.8, 'BYN': 2.0}}
+
+
+def test_convert_uses_latest_snapshot_on_or_before_publication_day(rates):
+    df = vacancies([(1000, 2000, 'RUB', '2024-01-05T12:00:00+0300'),
+                    (1000, 2000, 'RUB', '2024-01-10T00:00:00+0000'),
+                    (1000, None, 'RUB', '2024-02-01T00:00:00+0000'),
+                    # Вакансия старше истории курсов - самый ранний снимок
+                    (1000, 2000, 'EUR', '2023-12-01T00:00:00+0000')])
+
+    result = rates.convert_to_usd(df, HISTORY)
+
+    assert result['salary_from'].tolist() == [10, 20, 20, 2000]
+    assert result['salary_to'].tolist()[:2] == [20, 40]
+    assert np.isnan(result['salary_to'][2])
+
+
+def test_convert_maps_legacy_currency_codes(rates):
+    df = vacancies([(1000, 2000, 'RUR', '2024-01-02T00:00:00+0000'),
+                    (400, 800, 'BYR', '2024-01-11T00:00:00+0000'),
+                    (100, 200, 'USD', '2024-01-11T00:00:00+0000')])
+
+    result = rates.convert_to_usd(df, HISTORY)
+
+    assert result['salary_from'].tolist() == [10, 200, 100]
+    assert result['salary_to'].tolist() == [20, 400, 200]
+
+
+def test_convert_unknown_currency_gives_nan(rates):
+    df = vacancies([(1000, 2000, 'XYZ', '2024-01-02T00:00:00+0000'),
+                    (1000, 2000, 'RUB', '2024-01-02T00:00:00+0000')])
+
+    result = rates.convert_to_usd(df, HISTORY)
+
+    assert result.loc[0, ['salary_from', 'salary_to']].isna().all()
+    assert result.loc[1, 'salary_from'] == 10
+
+
+def test_convert_categorical_currency(rates):
+    df = vacancies([(1000, 2000, 'RUR', '2024-01-02T00:00:00+0000'),
+                    (1000, 2000, 'EUR', '2024-01-02T00:00:00+0000')])
+    df['salary.currency'] = df['salary.currency'].astype('category')
+
+    result = rates.convert_to_usd(df, HISTORY)
+
+    assert result['salary_from'].tolist() == [10, 2000]
+
+
+def test_history_is_extended_from_fixture(rates, tmp_path):
+    write_json(rates.CURRENCY_RATES_PATH, HISTORY)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    write_json(rates.CURRENCY_RATES_FIXTURE, {'date': today, 'rates': {'RUB': 90.0}})
+
+    history = rates.get_rates_history()
+
+    assert history[today] == {'RUB': 90.0}
+    assert set(HISTORY) < set(history)
+    with open(rates.CURRENCY_RATES_PATH, encoding='utf-8') as file:
+        assert json.load(file)[today] == {'RUB': 90.0}
+
+
+def test_history_for_today_does_not_call_api(rates):
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    # Ответа API нет: если бы он запрашивался, курсы за сегодня не нашлись бы
+    write_json(rates.CURRENCY_RATES_PATH, {today: {'RUB': 90.0}})
+
+    assert rates.get_rates_history() == {today: {'RUB': 90.0}}
+
+
+def test_api_failure_falls_back_to_stored_snapshot(rates):
+    # Файла с ответом API нет - загрузка курсов завершается ошибкой
+    write_json(rates.CURRENCY_RATES_PATH, HISTORY)
+
+    assert rates.get_rates_history() == HISTORY
+
+
+def test_api_failure_without_snapshot_raises(rates):
+    with pytest.raises(RuntimeError):
+        rates.get_rates_history()
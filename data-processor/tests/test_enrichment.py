@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+import enrichment
+from http_client import TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+class FakeSession:
+    """
+    HTTP-сессия, которая на каждый запрос возвращает один и тот же ответ.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        return self.response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(enrichment.time, 'sleep', lambda seconds: None)
+
+
+def test_fetch_vacancy_invalid_json_is_failure():
+    session = FakeSession(FakeResponse(200, ValueError('Expecting value')))
+
+    row, status = enrichment.fetch_vacancy(session, TokenBucket(0), 'http://hh/vacancies/1',
+                                           max_attempts=3)
+
+    assert row is None
+    assert status['status'] == 'invalid_json'
+    assert status['attempts'] == 3
+    assert status['error']
+    assert session.requests == 3
+
+
+def test_enrich_vacancies_counts_invalid_json_as_failed():
+    session = FakeSession(FakeResponse(200, ValueError('Expecting value')))
+    vacancies = pd.DataFrame({'url': ['http://hh/vacancies/1']})
+
+    features, statuses = enrichment.enrich_vacancies(vacancies, workers=1, rate=0,
+                                                     session=session)
+
+    assert features.iloc[0].isna().all()
+    assert not statuses['status'].isin([200, 'cache']).any()
+
+
+def test_fetch_vacancy_extracts_features():
+    detail = {'key_skills': [{'name': 'SQL'}], 'languages': [], 'schedule': {'id': 'remote'},
+              'description': '<p>...</p>'}
+    session = FakeSession(FakeResponse(200, detail))
+
+    row, status = enrichment.fetch_vacancy(session, TokenBucket(0), 'http://hh/vacancies/1')
+
+    assert row == [[{'name': 'SQL'}], [], {'id': 'remote'}]
+    assert status['status'] == 200
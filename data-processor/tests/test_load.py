@@ -0,0 +1,59 @@
+import os
+
+import mongomock
+import pandas as pd
+import pytest
+
+os.environ.setdefault('ARCHIVE_RESPONSES', 'false')
+
+import data_processor  # noqa: E402
+import db_connection  # noqa: E402
+import vacancy_stats  # noqa: E402
+import watermark  # noqa: E402
+from schema import apply_schema  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    client = mongomock.MongoClient()
+    for module in (db_connection, vacancy_stats, watermark, data_processor):
+        monkeypatch.setattr(module, 'get_mongo_client', lambda: client)
+    return client['vacancydb']
+
+
+def vacancies(rows):
+    df = pd.DataFrame([{'id': vacancy_id, 'published_at': published_at, 'salary_from': 1000,
+                        'salary_to': 2000, 'experience': 'Нет опыта', 'country': 'Россия',
+                        'skills': ['sql'], 'key_skills': ['SQL']}
+                       for vacancy_id, published_at in rows])
+    return apply_schema(df)
+
+
+def country_count(db, day):
+    doc = db[vacancy_stats.STATS_COLLECTION].find_one({'_id': f'{day}:country'})
+    return sum(row['count'] for row in doc['rows']) if doc else 0
+
+
+def test_republished_vacancy_leaves_previous_day_stats(mongo):
+    data_processor.load(vacancies([('1', '2024-01-01T10:00:00+0000'),
+                                   ('2', '2024-01-01T12:00:00+0000')]))
+    assert country_count(mongo, '2024-01-01') == 2
+
+    # hh.ru опубликовал вакансию 1 повторно через несколько дней
+    data_processor.load(vacancies([('1', '2024-01-05T09:00:00+0000')]))
+
+    assert country_count(mongo, '2024-01-01') == 1
+    assert country_count(mongo, '2024-01-05') == 1
+    assert mongo['vacancy'].count_documents({}) == 2
+
+
+def test_load_reports_previous_dates(mongo):
+    records = [{'id': '1', 'published_at': pd.Timestamp('2024-01-03', tz='UTC').to_pydatetime()}]
+    assert db_connection.load_data_to_mongo('vacancydb', 'vacancy', records)[
+        'previous_min_date'] is None
+
+    records[0]['published_at'] = pd.Timestamp('2024-01-07', tz='UTC').to_pydatetime()
+    counts = db_connection.load_data_to_mongo('vacancydb', 'vacancy', records)
+
+    assert pd.Timestamp(counts['previous_min_date']).date().isoformat() == '2024-01-03'
+    assert counts['updated'] == 1
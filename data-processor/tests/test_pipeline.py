@@ -0,0 +1,30 @@
+import os
+import time
+
+from pipeline import remove_stale_runs
+
+
+def make_run(root, run_id, age_days):
+    path = root / 'data_processor' / run_id
+    path.mkdir(parents=True)
+    checkpoint = path / '00_collect.parquet'
+    checkpoint.write_bytes(b'')
+    modified = time.time() - age_days * 24 * 60 * 60
+    os.utime(checkpoint, (modified, modified))
+    os.utime(path, (modified, modified))
+    return path
+
+
+def test_remove_stale_runs_keeps_recent_runs(tmp_path):
+    stale = make_run(tmp_path, '20240101T090000', age_days=10)
+    recent = make_run(tmp_path, '20240110T090000', age_days=1)
+
+    removed = remove_stale_runs(str(tmp_path), 'data_processor', keep_days=7)
+
+    assert removed == ['20240101T090000']
+    assert not stale.exists()
+    assert recent.exists()
+
+
+def test_remove_stale_runs_without_checkpoints(tmp_path):
+    assert remove_stale_runs(str(tmp_path), 'data_processor', keep_days=7) == []
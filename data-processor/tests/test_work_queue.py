@@ -0,0 +1,38 @@
+import threading
+
+from work_queue import run_worker
+
+
+class StoppingQueue:
+    """
+    Очередь, в которой всегда есть пакет; после batches пакетов
+    устанавливается событие остановки (как обработчик SIGTERM).
+    """
+
+    def __init__(self, stop, batches):
+        self.stop = stop
+        self.batches = batches
+        self.processed = 0
+
+    def work_once(self, worker_id, session, threads, archive=None):
+        self.processed += 1
+        if self.processed == self.batches:
+            self.stop.set()
+        return True
+
+
+def test_run_worker_stops_between_batches():
+    stop = threading.Event()
+    queue = StoppingQueue(stop, batches=3)
+
+    run_worker(queue, threads=1, stop=stop)
+
+    assert queue.processed == 3
+
+
+def test_run_worker_exits_when_idle():
+    class EmptyQueue:
+        def work_once(self, *args):
+            return False
+
+    run_worker(EmptyQueue(), threads=1, idle_exit=0.01)
@@ -0,0 +1,273 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import matplotlib.pyplot as plt
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
+from chart_data import skills_table
+from data_vizualization_ru import (draw_mean_salary_common, draw_pie_country,
+                                   draw_salary_experience, bar_top_skills)
+from db_connection import get_mongo_client
+from response_cache import ResponseCache
+from vacancy_queries import (build_match, salary_by_experience, country_counts,
+                             salary_histogram, skill_counts)
+
+API_DB = 'vacancydb'
+API_COLLECTION = 'vacancy'
+# Размер кэша ответов API (количество запросов) и время жизни ответа в секундах
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '256'))
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', '3600'))
+# Как часто (в секундах) проверять, не изменились ли данные в MongoDB
+API_VERSION_CHECK_SECONDS = float(os.getenv('API_VERSION_CHECK_SECONDS', '10'))
+
+# Документ, который data-processor обновляет после каждого изменения вакансий
+METADATA_COLLECTION = 'metadata'
+DATA_VERSION_ID = 'data_version'
+
+api = Blueprint('api', __name__, url_prefix='/api')
+cache = ResponseCache(API_CACHE_SIZE, API_CACHE_TTL)
+
+_version = {'updated_at': None, 'checked_at': None}
+_version_lock = threading.Lock()
+# pyplot хранит состояние глобально, поэтому графики рисуются по одному
+_render_lock = threading.Lock()
+
+
+def data_version():
+    """
+    Функция возвращает время последнего изменения вакансий в MongoDB.
+    Если данные изменились с прошлой проверки, кэш ответов сбрасывается.
+
+    Возвращает:
+    datetime или None: Время изменения в UTC или None, если отметки еще нет.
+    """
+    with _version_lock:
+        now = time.monotonic()
+        checked_at = _version['checked_at']
+        if checked_at is not None and now - checked_at < API_VERSION_CHECK_SECONDS:
+            return _version['updated_at']
+
+        doc = get_mongo_client()[API_DB][METADATA_COLLECTION].find_one({'_id': DATA_VERSION_ID})
+        updated_at = None
+        if doc and doc.get('updated_at'):
+            updated_at = doc['updated_at'].replace(tzinfo=timezone.utc)
+
+        if updated_at != _version['updated_at']:
+            cache.clear()
+            _version['updated_at'] = updated_at
+        _version['checked_at'] = now
+        return updated_at
+
+
+def parse_date(name):
+    """
+    Функция читает дату 'YYYY-MM-DD' из параметра запроса.
+
+    Аргументы:
+    name (str): Имя параметра.
+
+    Возвращает:
+    datetime или None: Начало дня в UTC или None, если параметр не задан.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise BadRequest(f'Параметр {name} должен быть датой в формате YYYY-MM-DD')
+
+
+def request_match():
+    """
+    Функция составляет фильтр вакансий по параметрам запроса:
+    country, city, experience, date_from и date_to (включительно).
+
+    Возвращает:
+    dict: Фильтр для $match.
+    """
+    date_to = parse_date('date_to')
+    return build_match(country=request.args.get('country'),
+                       city=request.args.get('city'),
+                       experience=request.args.get('experience'),
+                       date_from=parse_date('date_from'),
+                       date_to=date_to + timedelta(days=1) if date_to else None)
+
+
+def frame_records(df):
+    """
+    Функция переводит таблицу pandas в список словарей для JSON (NaN -> null).
+    """
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+
+def with_collection(query):
+    """
+    Функция выполняет запрос к коллекции вакансий через общий
+    клиент MongoDB с пулом соединений.
+
+    Аргументы:
+    query (callable): Функция, принимающая коллекцию.
+
+    Возвращает:
+    Результат query.
+    """
+    return query(get_mongo_client()[API_DB][API_COLLECTION])
+
+
+def cached_response(build, mimetype):
+    """
+    Функция возвращает ответ из кэша или строит его заново.
+
+    Ключ кэша - путь и параметры запроса. Ответ содержит ETag (хеш тела)
+    и Last-Modified (время последнего изменения данных), а Cache-Control
+    требует перепроверки, поэтому браузеры и прокси получают 304 вместо
+    повторной загрузки неизменившегося ответа.
+
+    Аргументы:
+    build (callable): Функция, возвращающая тело ответа (bytes).
+    mimetype (str): Тип ответа.
+
+    Возвращает:
+    Response: Ответ Flask.
+    """
+    updated_at = data_version()
+    key = (request.path, tuple(sorted(request.args.items(multi=True))))
+    entry = cache.get(key)
+    if entry is None:
+        body = build()
+        entry = (body, hashlib.sha256(body).hexdigest())
+        cache.set(key, entry)
+
+    body, etag = entry
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    if updated_at is not None:
+        response.last_modified = updated_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def json_response(build):
+    """
+    Функция возвращает кэшируемый ответ JSON (см. cached_response).
+    """
+    return cached_response(lambda: json.dumps(build(), ensure_ascii=False).encode('utf-8'),
+                           'application/json')
+
+
+def top_skills(skills, limit):
+    """
+    Функция оставляет для каждого опыта работы limit самых частых навыков.
+
+    Аргументы:
+    skills (pd.DataFrame): Колонки experience, skill, count.
+    limit (int): Количество навыков.
+
+    Возвращает:
+    dict: Опыт работы -> список {skill, count} по убыванию встречаемости.
+    """
+    skills = skills.sort_values(['experience', 'count', 'skill'], ascending=[True, False, True])
+    return {experience: frame_records(rows.head(limit)[['skill', 'count']])
+            for experience, rows in skills.groupby('experience')}
+
+
+@api.errorhandler(HTTPException)
+def handle_error(error):
+    return jsonify({'error': error.description}), error.code
+
+
+@api.route('/salary')
+def salary():
+    match = request_match()
+    return json_response(lambda: with_collection(lambda collection: {
+        'by_experience': frame_records(salary_by_experience(collection, match=match)),
+        'histogram': frame_records(salary_histogram(collection, match=match)),
+    }))
+
+
+@api.route('/countries')
+def countries():
+    match = request_match()
+    return json_response(lambda: with_collection(lambda collection: frame_records(
+        country_counts(collection, match=match).reset_index())))
+
+
+@api.route('/skills')
+def skills():
+    match = request_match()
+    limit = request.args.get('limit', 30, type=int)
+    return json_response(lambda: with_collection(
+        lambda collection: top_skills(skill_counts(collection, match=match), limit)))
+
+
+def require_rows(data, message='Нет вакансий по заданному фильтру'):
+    """
+    Функция проверяет, что по фильтру нашлись данные для графика:
+    по пустой таблице график не строится.
+
+    Аргументы:
+    data (pd.DataFrame или pd.Series): Данные для графика.
+    message (str): Текст ошибки.
+
+    Возвращает:
+    data без изменений.
+    """
+    if data.empty:
+        raise NotFound(message)
+    return data
+
+
+def chart_figure(name, collection, match):
+    """
+    Функция строит график name по вакансиям, подходящим под фильтр.
+
+    Аргументы:
+    name (str): salary_hist, countries, salary_mean, salary_max или top_skills.
+    collection (Collection): Коллекция вакансий.
+    match (dict): Фильтр вакансий.
+
+    Возвращает:
+    Figure: График.
+    """
+    if name == 'salary_hist':
+        return draw_mean_salary_common(require_rows(salary_histogram(collection, match=match)))
+    if name == 'countries':
+        return draw_pie_country(require_rows(country_counts(collection, match=match)))
+    if name in ('salary_mean', 'salary_max'):
+        salary_all = require_rows(salary_by_experience(collection, match=match))
+        salary_russia = salary_by_experience(collection, match=dict(match, country='Россия'))
+        if name == 'salary_mean':
+            return draw_salary_experience(salary_all, salary_russia, 'mean', 15)
+        return draw_salary_experience(salary_all, salary_russia, 'max', 10)
+    if name == 'top_skills':
+        experience = request.args.get('experience')
+        if not experience:
+            raise BadRequest('Для графика top_skills нужен параметр experience')
+        skills = require_rows(skill_counts(collection, match=match),
+                              f'Нет навыков для опыта {experience}')
+        table = skills_table(skills)
+        if experience.lower() not in table.columns:
+            raise NotFound(f'Нет навыков для опыта {experience}')
+        top = table[experience.lower()].sort_values(ascending=False).head(30)
+        return bar_top_skills(top, experience.lower())
+    raise NotFound(f'Неизвестный график {name}')
+
+
+@api.route('/charts/<name>.png')
+def chart(name):
+    match = request_match()
+
+    def render():
+        with _render_lock:
+            fig = with_collection(lambda collection: chart_figure(name, collection, match))
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png')
+            plt.close(fig)
+        return buffer.getvalue()
+
+    return cached_response(render, 'image/png')
@@ -1,6 +1,10 @@
 from flask import Flask, render_template
+from api import api
 
 app = Flask(__name__)
+# JSON API и графики по запросу: /api/salary, /api/countries, /api/skills,
+# /api/charts/<name>.png с фильтрами country, city, experience, date_from, date_to
+app.register_blueprint(api)
 
 @app.route('/ru')
 def main_ru():
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # Без графического интерфейса, в том числе в процессах пула
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+# Версия оформления графиков: при изменении кода отрисовки ее нужно
+# увеличить, чтобы все графики перерисовались
+CHART_STYLE_VERSION = '1'
+# Имя файла с хешами данных уже нарисованных графиков (в каталоге графиков)
+CHART_HASHES_FILE = '.chart_hashes.json'
+
+
+def data_hash(*inputs):
+    """
+    Считает хеш входных данных графика.
+
+    Таблицы pandas хешируются по значениям, индексу и названиям колонок,
+    остальные значения (например, параметры графика) - по repr.
+
+    Параметры:
+        inputs: таблицы pandas и параметры графика.
+
+    Возвращает:
+        str: шестнадцатеричный хеш SHA-256.
+    """
+    digest = hashlib.sha256(CHART_STYLE_VERSION.encode())
+    for value in inputs:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr(list(names)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def render_chart(path, draw, inputs):
+    """
+    Рисует график и сохраняет его в файл. Выполняется в процессе пула,
+    поэтому принимает только сериализуемые данные и функцию уровня модуля.
+
+    Параметры:
+        path (str): путь к файлу графика.
+        draw (callable): функция, которая по inputs строит и возвращает Figure.
+        inputs (tuple): входные данные и параметры графика.
+
+    Возвращает:
+        float: время отрисовки в секундах.
+    """
+    started = time.perf_counter()
+    fig = draw(*inputs)
+    fig.savefig(path)
+    plt.close(fig)
+    return time.perf_counter() - started
+
+
+class ChartCache:
+    """
+    Кэш нарисованных графиков.
+
+    Для каждого файла графика хранится хеш данных, по которым он нарисован.
+    Если хеш не изменился и файл на месте, график не перерисовывается.
+
+    Атрибуты:
+        hits (int): количество графиков, взятых из кэша.
+        misses (int): количество перерисованных графиков.
+    """
+
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self.hashes_path = os.path.join(save_path, CHART_HASHES_FILE)
+        self.hits = 0
+        self.misses = 0
+        self.hashes = {}
+        if os.path.exists(self.hashes_path):
+            with open(self.hashes_path, encoding='utf-8') as file:
+                self.hashes = json.load(file)
+
+    def is_fresh(self, file_name, digest):
+        """
+        Проверяет, нарисован ли график по тем же данным.
+        """
+        return (self.hashes.get(file_name) == digest
+                and os.path.exists(os.path.join(self.save_path, file_name)))
+
+    def render_all(self, charts, workers=1):
+        """
+        Рисует и сохраняет графики, данные которых изменились.
+
+        Графики не зависят друг от друга, поэтому при workers > 1 они
+        рисуются параллельно в отдельных процессах.
+
+        Параметры:
+            charts (list): кортежи (имя файла в каталоге save_path,
+            функция, которая по входным данным строит и возвращает Figure,
+            кортеж входных данных и параметров графика).
+            workers (int): количество процессов для отрисовки.
+
+        Возвращает:
+            int: количество перерисованных графиков.
+        """
+        stale = []
+        for file_name, draw, inputs in charts:
+            digest = data_hash(*inputs)
+            if self.is_fresh(file_name, digest):
+                self.hits += 1
+                metrics.inc('chart_cache_requests_total', {'result': 'hit'})
+                logging.info(f'{file_name}: данные не изменились, график взят из кэша')
+            else:
+                stale.append((file_name, draw, inputs, digest))
+
+        paths = [os.path.join(self.save_path, file_name) for file_name, _, _, _ in stale]
+        draws = [draw for _, draw, _, _ in stale]
+        inputs = [chart_inputs for _, _, chart_inputs, _ in stale]
+        if workers > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as executor:
+                elapsed = list(executor.map(render_chart, paths, draws, inputs))
+        else:
+            elapsed = list(map(render_chart, paths, draws, inputs))
+
+        for (file_name, _, _, digest), seconds in zip(stale, elapsed):
+            self.misses += 1
+            self.hashes[file_name] = digest
+            metrics.inc('chart_cache_requests_total', {'result': 'miss'})
+            metrics.set('chart_render_seconds', seconds, {'chart': file_name})
+            logging.info(f'{file_name}: нарисован за {seconds:.2f} с')
+        return len(stale)
+
+    def save(self):
+        """
+        Сохраняет хеши нарисованных графиков на диск.
+        """
+        tmp_path = f'{self.hashes_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.hashes, file, indent=2)
+        os.replace(tmp_path, self.hashes_path)
@@ -0,0 +1,272 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from db_connection import get_mongo_client
+from vacancy_queries import salary_by_experience, country_counts, salary_histogram, skill_counts
+
+
+# Коллекция с предрассчитанной статистикой (ее обновляет data-processor)
+STATS_COLLECTION = 'vacancy_stats'
+# Срок хранения вакансий в днях: статистика за более ранние дни не учитывается
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '90'))
+# Поля вакансий, которые нужны для расчета графиков по всей коллекции
+RAW_FIELDS = ['salary_from', 'salary_to', 'experience', 'country', 'skills']
+# Поля, которые хранятся в DataFrame категориями и числами float32
+CATEGORY_FIELDS = ['experience', 'country']
+SALARY_FIELDS = ['salary_from', 'salary_to']
+
+def vacancies_frame(docs, fields):
+    """
+    Функция строит компактный DataFrame из документов вакансий.
+
+    Документы читаются по одному и раскладываются по колонкам, поэтому
+    в памяти не держится одновременно список всех документов и таблица.
+    Опыт работы и страна хранятся категориями, зарплаты - float32
+    (пропуски остаются NaN, что удобно для графиков).
+
+    Аргументы:
+    docs (iterable): Документы вакансий (например, курсор MongoDB).
+    fields (list): Нужные поля вакансий.
+
+    Возвращает:
+    pd.DataFrame: Вакансии с колонками fields.
+    """
+    columns = {field: [] for field in fields}
+    for doc in docs:
+        for field, values in columns.items():
+            values.append(doc.get(field))
+
+    data = {}
+    for field in fields:
+        values = columns.pop(field)
+        if field in CATEGORY_FIELDS:
+            data[field] = pd.Categorical(values)
+        elif field in SALARY_FIELDS:
+            data[field] = pd.to_numeric(pd.Series(values, dtype=object),
+                                        errors='coerce').astype('float32')
+        else:
+            data[field] = pd.Series(values, dtype=object)
+    return pd.DataFrame(data, columns=fields)
+
+def load_vacancies(db_name, collection_name, fields):
+    """
+    Функция загружает вакансии из MongoDB в DataFrame.
+
+    Вложенные поля (например, skills) хранятся в MongoDB массивами,
+    поэтому попадают в DataFrame списками Python без разбора строк.
+
+    Аргументы:
+    db_name (str): Имя базы данных MongoDB.
+    collection_name (str): Имя коллекции MongoDB.
+    fields (list): Нужные поля вакансий.
+
+    Возвращает:
+    pd.DataFrame: Вакансии с колонками fields (см. vacancies_frame).
+    """
+    projection = dict({field: 1 for field in fields}, _id=0)
+    cursor = get_mongo_client()[db_name][collection_name].find({}, projection)
+    return vacancies_frame(cursor, fields)
+
+def load_stats(db_name):
+    """
+    Функция загружает предрассчитанную статистику по вакансиям
+    за срок хранения.
+
+    Аргументы:
+    db_name (str): Имя базы данных MongoDB.
+
+    Возвращает:
+    list: Документы статистики (по одному на день и вид статистики).
+    """
+    first_day = (datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+
+    return list(get_mongo_client()[db_name][STATS_COLLECTION].find({'day': {'$gte': first_day}}))
+
+def salary_from_totals(salary):
+    """
+    Функция считает среднюю и максимальную зарплату по опыту работы
+    из сумм, количеств и максимумов по дням и странам.
+
+    Аргументы:
+    salary (pd.DataFrame): Строки с колонками experience, sum, count, max.
+
+    Возвращает:
+    pd.DataFrame: Колонки experience, mean, max.
+    """
+    grouped = salary.groupby('experience').agg({'sum': 'sum', 'count': 'sum', 'max': 'max'})
+    grouped['mean'] = grouped['sum'] / grouped['count']
+    return grouped[['mean', 'max']].reset_index()
+
+def skills_table(skills):
+    """
+    Функция строит таблицу встречаемости навыков: строки - навыки,
+    колонки - опыт работы (в нижнем регистре).
+
+    Аргументы:
+    skills (pd.DataFrame): Колонки experience, skill, count.
+
+    Возвращает:
+    pd.DataFrame: Таблица встречаемости навыков.
+    """
+    df_skills_grouped = skills.pivot_table(index='skill',
+                                           columns='experience',
+                                           values='count',
+                                           aggfunc='sum',
+                                           fill_value=0).astype('int64')
+    df_skills_grouped.columns = df_skills_grouped.columns.str.lower()
+    return df_skills_grouped
+
+def chart_data_from_stats(docs):
+    """
+    Функция собирает данные для графиков из предрассчитанной статистики.
+
+    Аргументы:
+    docs (list): Документы статистики из коллекции vacancy_stats.
+
+    Возвращает:
+    dict: Данные для графиков (см. chart_data_from_raw).
+    """
+    rows = {'salary_hist': [], 'country': [], 'salary': [], 'skills': []}
+    for doc in docs:
+        if doc['kind'] == 'salary_hist':
+            # Зарплата корзины - ее середина
+            half_width = doc['bucket_width'] / 2
+            rows['salary_hist'].extend({'salary': row['bucket'] + half_width,
+                                        'count': row['count']} for row in doc['rows'])
+        else:
+            rows[doc['kind']].extend(doc['rows'])
+
+    salary_hist = pd.DataFrame(rows['salary_hist'], columns=['salary', 'count'])
+    salary_hist = salary_hist.groupby('salary', as_index=False)['count'].sum()
+
+    country_counts = (pd.DataFrame(rows['country'], columns=['country', 'count'])
+                      .groupby('country')['count'].sum()
+                      .sort_values(ascending=False))
+
+    salary = pd.DataFrame(rows['salary'], columns=['experience', 'country', 'sum', 'count', 'max'])
+
+    skills = pd.DataFrame(rows['skills'], columns=['experience', 'skill', 'count'])
+
+    return {'salary_hist': salary_hist,
+            'country_counts': country_counts,
+            'salary_all': salary_from_totals(salary),
+            'salary_russia': salary_from_totals(salary[salary.country == 'Россия']),
+            'skills': skills_table(skills)}
+
+def count_skills(df):
+    """
+    Функция считает встречаемость навыков по опыту работы.
+
+    Вместо таблицы one-hot (вакансии x все навыки) списки навыков
+    разворачиваются в длинную таблицу пар (опыт, навык), которая сразу
+    группируется. Память растет с общим числом упоминаний навыков,
+    а не с произведением числа вакансий на число разных навыков.
+    Повторы навыка в одной вакансии учитываются, как и раньше.
+
+    Аргументы:
+    df (pd.DataFrame): Колонки experience и skills (списки канонических навыков).
+
+    Возвращает:
+    pd.DataFrame: Колонки experience, skill, count.
+    """
+    exploded = df[['experience', 'skills']].explode('skills').dropna()
+    counts = (exploded.groupby(['experience', 'skills'], observed=True).size()
+              .rename('count')
+              .reset_index()
+              .rename(columns={'skills': 'skill'}))
+    # Опыт работы мог быть категорией; в таблице навыков он нужен строкой
+    counts['experience'] = counts['experience'].astype(object)
+    return counts
+
+def chart_data_from_raw(df):
+    """
+    Функция считает данные для графиков по всем документам коллекции
+    вакансий. Используется, пока статистика еще не рассчитана.
+
+    Аргументы:
+    df (pd.DataFrame): Все вакансии.
+
+    Возвращает:
+    dict: Данные для графиков:
+        - salary_hist: колонки salary и count для гистограммы зарплат;
+        - country_counts: количество вакансий по странам;
+        - salary_all, salary_russia: средняя и максимальная зарплата
+          по опыту работы по всем странам и в России;
+        - skills: встречаемость навыков (строки) по опыту (колонки).
+    """
+    # Добавлена колонка salary - среднее между максимумом и минимумом в зарплдатной вилке
+    df['salary'] = (df.salary_from +df.salary_to)/2
+
+    salary_hist = df.loc[df.salary.notnull(), ['salary']].assign(count=1)
+
+    # observed=True: группы только по встречающимся значениям категорий
+    country_counts = df.groupby('country', observed=True)['country'].count() \
+                       .sort_values(ascending=False)
+    country_counts.index = country_counts.index.astype(object)
+
+    salary_all = df.groupby('experience', observed=True)['salary'].agg(['mean', 'max']) \
+                   .reset_index()
+    salary_russia = df[df.country == 'Россия'] \
+                    .groupby('experience', observed=True)['salary'].agg(['mean', 'max']).reset_index()
+    for salary in (salary_all, salary_russia):
+        salary['experience'] = salary['experience'].astype(object)
+
+    # Удаление строк, где нет значений в 'skills'.
+    # Для дальнейшего анализа они не понадобятся. Навыки уже хранятся
+    # массивами и приведены к каноническому виду при загрузке в MongoDB
+    df = df.dropna(subset=['skills'])
+
+    # Встречаемость навыков по опыту работы
+    df_skills_grouped = skills_table(count_skills(df))
+
+    return {'salary_hist': salary_hist,
+            'country_counts': country_counts,
+            'salary_all': salary_all,
+            'salary_russia': salary_russia,
+            'skills': df_skills_grouped}
+
+def chart_data_from_aggregations(collection):
+    """
+    Функция считает данные для графиков агрегациями на стороне MongoDB:
+    из базы возвращаются только небольшие сгруппированные таблицы.
+
+    Аргументы:
+    collection (Collection): Коллекция вакансий.
+
+    Возвращает:
+    dict: Данные для графиков (см. chart_data_from_raw).
+    """
+    return {'salary_hist': salary_histogram(collection),
+            'country_counts': country_counts(collection),
+            'salary_all': salary_by_experience(collection),
+            'salary_russia': salary_by_experience(collection, match={'country': 'Россия'}),
+            'skills': skills_table(skill_counts(collection))}
+
+def load_chart_data(db_name, collection_name, source):
+    """
+    Функция загружает данные для графиков из выбранного источника.
+
+    Аргументы:
+    db_name (str): Имя базы данных MongoDB.
+    collection_name (str): Имя коллекции вакансий.
+    source (str): 'stats' - предрассчитанная статистика (если ее еще нет,
+    используются агрегации), 'aggregate' - агрегации на стороне MongoDB,
+    'raw' - выгрузка всей коллекции и расчет в pandas.
+
+    Возвращает:
+    dict: Данные для графиков (см. chart_data_from_raw).
+    """
+    if source == 'stats':
+        stats_docs = load_stats(db_name)
+        if stats_docs:
+            return chart_data_from_stats(stats_docs)
+        logging.warning('Статистика по вакансиям не найдена, расчет агрегациями MongoDB')
+        source = 'aggregate'
+
+    if source == 'aggregate':
+        return chart_data_from_aggregations(get_mongo_client()[db_name][collection_name])
+
+    df = load_vacancies(db_name, collection_name, RAW_FIELDS)
+
+    return chart_data_from_raw(df)
@@ -0,0 +1,65 @@
+import atexit
+import os
+import threading
+from pymongo import MongoClient
+
+# Определение переменных окружения для подключения к MongoDB
+MONGO_USER = os.getenv('MONGO_INITDB_ROOT_USERNAME', 'root')
+MONGO_PASSWORD = os.getenv('MONGO_INITDB_ROOT_PASSWORD', 'example')
+MONGO_HOST = os.getenv('MONGO_HOST', 'mongo')
+MONGO_PORT = os.getenv('MONGO_PORT', '27017')
+
+# Параметры пула соединений и таймауты (в миллисекундах)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '20'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '10000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '300000'))
+# Подтверждение записи: число узлов или 'majority'
+MONGO_WRITE_CONCERN = os.getenv('MONGO_WRITE_CONCERN', '1')
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mongo_client():
+    """
+    Возвращает общий для процесса клиент MongoDB.
+
+    Клиент создается при первом вызове и дальше переиспользуется: у него
+    свой пул соединений, поэтому повторные вызовы не открывают новые
+    соединения. Закрывать клиент после запроса не нужно - он закрывается
+    при завершении процесса (или явно через close_mongo_client).
+
+    Returns:
+        MongoClient: Объект клиента MongoDB для взаимодействия с базой данных.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            write_concern = MONGO_WRITE_CONCERN
+            if write_concern.isdigit():
+                write_concern = int(write_concern)
+            _client = MongoClient(f'mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/',
+                                  maxPoolSize=MONGO_MAX_POOL_SIZE,
+                                  minPoolSize=MONGO_MIN_POOL_SIZE,
+                                  serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                  connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                                  socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                                  w=write_concern)
+        return _client
+
+
+def close_mongo_client():
+    """
+    Закрывает общий клиент MongoDB. Следующий вызов get_mongo_client
+    создаст новый клиент.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_mongo_client)
@@ -0,0 +1,135 @@
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Каталог для файлов метрик в текстовом формате Prometheus
+# (для textfile collector node_exporter). Пустое значение - не сохранять
+METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', 'data/metrics')
+
+# Префикс имен метрик (тот же, что у метрик data-processor)
+METRIC_PREFIX = 'vacancy_'
+
+METRIC_HELP = {
+    'stage_duration_seconds': ('gauge', 'Длительность стадии'),
+    'chart_render_seconds': ('gauge', 'Длительность отрисовки графика'),
+    'chart_cache_requests_total': ('counter', 'Графики, взятые из кэша (hit) и перерисованные (miss)'),
+    'peak_rss_bytes': ('gauge', 'Пиковый объем резидентной памяти процесса'),
+    'run_duration_seconds': ('gauge', 'Длительность запуска'),
+    'run_success': ('gauge', '1, если запуск завершился успешно'),
+    'run_finished_timestamp_seconds': ('gauge', 'Время завершения запуска'),
+}
+
+
+def format_labels(labels):
+    """
+    Форматирует метки метрики в текстовом формате Prometheus.
+
+    Параметры:
+        labels (tuple): пары (имя, значение).
+
+    Возвращает:
+        str: метки в фигурных скобках или пустая строка.
+    """
+    if not labels:
+        return ''
+    escaped = [(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+               for name, value in labels]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metrics:
+    """
+    Метрики построения графиков: счетчики и значения с метками.
+
+    Метрики копятся в памяти процесса, а в конце запуска записываются
+    методом export в файл для textfile collector. Полный набор метрик
+    (HTTP, MongoDB, сводки запусков) есть только у data-processor.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1):
+        """
+        Увеличивает счетчик.
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        """
+        Устанавливает значение метрики.
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Замеряет длительность блока кода как стадии.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.set('stage_duration_seconds', time.monotonic() - started, {'stage': stage})
+
+    def render(self, job):
+        """
+        Возвращает метрики в текстовом формате Prometheus. Ко всем метрикам
+        добавляется метка pipeline с именем запуска.
+        """
+        job_label = (('pipeline', job),)
+        series = {}
+        with self._lock:
+            for (name, labels), value in list(self._counters.items()) + list(self._gauges.items()):
+                series.setdefault(name, []).append(
+                    f'{METRIC_PREFIX}{name}{format_labels(job_label + labels)} {value}')
+
+        text = []
+        for name in sorted(series):
+            metric_type, help_text = METRIC_HELP.get(name, ('gauge', name))
+            text.append(f'# HELP {METRIC_PREFIX}{name} {help_text}')
+            text.append(f'# TYPE {METRIC_PREFIX}{name} {metric_type}')
+            text.extend(series[name])
+        return '\n'.join(text) + '\n'
+
+    def export(self, job, status='success'):
+        """
+        Записывает метрики запуска в <METRICS_TEXTFILE_DIR>/<job>.prom.
+        Ошибки записи только записываются в лог.
+
+        Параметры:
+            job (str): имя запуска.
+            status (str): итог запуска: 'success' или 'failed'.
+        """
+        finished_at = time.time()
+        # В Linux ru_maxrss - в килобайтах
+        self.set('peak_rss_bytes', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+        self.set('run_duration_seconds', round(finished_at - self.started_at, 3))
+        self.set('run_success', int(status == 'success'))
+        self.set('run_finished_timestamp_seconds', round(finished_at, 3))
+        if not METRICS_TEXTFILE_DIR:
+            return
+
+        try:
+            os.makedirs(METRICS_TEXTFILE_DIR, exist_ok=True)
+            path = os.path.join(METRICS_TEXTFILE_DIR, f'{job}.prom')
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(self.render(job))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f'Не удалось сохранить метрики в файл: {e}')
+
+
+# Метрики текущего процесса
+metrics = Metrics()
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Кэш ответов API в памяти процесса: не больше maxsize записей (LRU),
+    каждая живет не дольше ttl секунд.
+
+    Атрибуты:
+        hits (int): количество ответов, найденных в кэше.
+        misses (int): количество ответов, которых в кэше не оказалось.
+    """
+
+    def __init__(self, maxsize=256, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Возвращает сохраненное значение или None, если его нет или оно устарело.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                self._items.pop(key, None)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """
+        Сохраняет значение, вытесняя давно не использованные записи.
+        """
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Удаляет все записи.
+        """
+        with self._lock:
+            self._items.clear()
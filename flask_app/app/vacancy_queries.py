@@ -0,0 +1,159 @@
+import pandas as pd
+
+
+# Условие "зарплатная вилка известна": обе границы - числа, и не NaN
+SALARY_KNOWN = {
+    'salary_from': {'$type': 'number', '$nin': [float('nan')]},
+    'salary_to': {'$type': 'number', '$nin': [float('nan')]},
+}
+
+# Зарплата вакансии - среднее между границами зарплатной вилки
+SALARY_EXPR = {'$divide': [{'$add': ['$salary_from', '$salary_to']}, 2]}
+
+
+def build_match(country=None, city=None, experience=None, date_from=None, date_to=None):
+    """
+    Функция составляет фильтр вакансий для агрегаций.
+
+    Аргументы:
+    country (str): Страна.
+    city (str): Город.
+    experience (str): Требуемый опыт (например, 'Нет опыта').
+    date_from (datetime): Начало периода публикации (включительно).
+    date_to (datetime): Конец периода публикации (не включительно).
+
+    Возвращает:
+    dict: Фильтр для $match. Незаданные условия не добавляются.
+    """
+    match = {}
+    for field, value in [('country', country), ('city', city), ('experience', experience)]:
+        if value:
+            match[field] = value
+    published_at = {}
+    if date_from:
+        published_at['$gte'] = date_from
+    if date_to:
+        published_at['$lt'] = date_to
+    if published_at:
+        match['published_at'] = published_at
+    return match
+
+
+def salary_by_experience(collection, match=None):
+    """
+    Функция считает среднюю и максимальную зарплату по опыту работы
+    на стороне MongoDB.
+
+    Аргументы:
+    collection (Collection): Коллекция вакансий.
+    match (dict): Дополнительный фильтр вакансий (например, по стране).
+
+    Возвращает:
+    pd.DataFrame: Колонки experience, mean, max.
+    """
+    pipeline = [
+        {'$match': dict(SALARY_KNOWN, **(match or {}))},
+        {'$project': {'experience': 1, 'salary': SALARY_EXPR}},
+        {'$group': {'_id': '$experience',
+                    'mean': {'$avg': '$salary'},
+                    'max': {'$max': '$salary'}}},
+    ]
+    rows = list(collection.aggregate(pipeline))
+    return pd.DataFrame([{'experience': row['_id'], 'mean': row['mean'], 'max': row['max']}
+                         for row in rows],
+                        columns=['experience', 'mean', 'max'])
+
+
+def country_counts(collection, match=None):
+    """
+    Функция считает количество вакансий по странам на стороне MongoDB.
+
+    Аргументы:
+    collection (Collection): Коллекция вакансий.
+    match (dict): Дополнительный фильтр вакансий.
+
+    Возвращает:
+    pd.Series: Количество вакансий по странам, по убыванию.
+    """
+    pipeline = [
+        {'$match': dict({'country': {'$type': 'string'}}, **(match or {}))},
+        {'$group': {'_id': '$country', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+    ]
+    rows = list(collection.aggregate(pipeline))
+    return pd.Series([row['count'] for row in rows],
+                     index=pd.Index([row['_id'] for row in rows], name='country'),
+                     name='count',
+                     dtype='int64')
+
+
+def salary_histogram(collection, bins=40, match=None):
+    """
+    Функция считает гистограмму зарплат на стороне MongoDB.
+
+    Сначала находятся минимальная и максимальная зарплата, затем вакансии
+    раскладываются по bins корзинам одинаковой ширины ($bucket), как
+    это делает sns.histplot. Из базы возвращается только bins строк.
+
+    Аргументы:
+    collection (Collection): Коллекция вакансий.
+    bins (int): Количество корзин.
+    match (dict): Дополнительный фильтр вакансий.
+
+    Возвращает:
+    pd.DataFrame: Колонки salary (середина корзины) и count.
+    """
+    base = [
+        {'$match': dict(SALARY_KNOWN, **(match or {}))},
+        {'$project': {'salary': SALARY_EXPR}},
+    ]
+    bounds = list(collection.aggregate(base + [
+        {'$group': {'_id': None, 'min': {'$min': '$salary'}, 'max': {'$max': '$salary'}}}
+    ]))
+    if not bounds:
+        return pd.DataFrame(columns=['salary', 'count'])
+
+    low, high = bounds[0]['min'], bounds[0]['max']
+    width = (high - low) / bins or 1
+    # Верхняя граница $bucket не включается, поэтому последняя
+    # корзина расширяется, чтобы в нее попала максимальная зарплата
+    boundaries = [low + width * i for i in range(bins)]
+    boundaries.append(max(high, boundaries[-1]) + width)
+
+    rows = list(collection.aggregate(base + [
+        {'$bucket': {'groupBy': '$salary',
+                     'boundaries': boundaries,
+                     'output': {'count': {'$sum': 1}}}}
+    ]))
+    return pd.DataFrame([{'salary': row['_id'] + width / 2, 'count': row['count']}
+                         for row in rows],
+                        columns=['salary', 'count'])
+
+
+def skill_counts(collection, match=None):
+    """
+    Функция считает встречаемость канонических навыков (поле skills)
+    по опыту работы на стороне MongoDB.
+
+    Из базы возвращается по одной строке на пару (опыт, навык).
+
+    Аргументы:
+    collection (Collection): Коллекция вакансий.
+    match (dict): Дополнительный фильтр вакансий.
+
+    Возвращает:
+    pd.DataFrame: Колонки experience, skill, count.
+    """
+    pipeline = [
+        {'$match': dict({'skills': {'$type': 'array'}}, **(match or {}))},
+        {'$project': {'experience': 1, 'skills': 1}},
+        {'$unwind': '$skills'},
+        {'$group': {'_id': {'experience': '$experience', 'skill': '$skills'},
+                    'count': {'$sum': 1}}},
+    ]
+    rows = list(collection.aggregate(pipeline, allowDiskUse=True))
+    return pd.DataFrame([{'experience': row['_id'].get('experience'),
+                          'skill': row['_id'].get('skill'),
+                          'count': row['count']}
+                         for row in rows],
+                        columns=['experience', 'skill', 'count'])
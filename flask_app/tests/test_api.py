@@ -0,0 +1,58 @@
+import pytest
+from flask import Flask
+
+import api
+
+
+class EmptyCollection:
+    """
+    Коллекция MongoDB, в которой нет ни одного документа.
+    """
+
+    def aggregate(self, pipeline, **kwargs):
+        return iter([])
+
+    def find_one(self, *args, **kwargs):
+        return None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, 'get_mongo_client', lambda: {
+        api.API_DB: {api.API_COLLECTION: EmptyCollection(),
+                     api.METADATA_COLLECTION: EmptyCollection()}})
+    api.cache.clear()
+    app = Flask(__name__)
+    app.register_blueprint(api.api)
+    return app.test_client()
+
+
+EMPTY_FILTER = {'country': 'Антарктида', 'experience': 'Нет опыта'}
+
+
+@pytest.mark.parametrize('name', ['salary_hist', 'countries', 'salary_mean', 'salary_max',
+                                  'top_skills'])
+def test_chart_for_empty_filter_is_not_found(client, name):
+    response = client.get(f'/api/charts/{name}.png', query_string=EMPTY_FILTER)
+
+    assert response.status_code == 404
+    assert response.is_json
+    assert response.get_json()['error']
+
+
+def test_top_skills_chart_requires_experience(client):
+    response = client.get('/api/charts/top_skills.png', query_string={'country': 'Антарктида'})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/api/salary', {'by_experience': [], 'histogram': []}),
+    ('/api/countries', []),
+    ('/api/skills', {}),
+])
+def test_json_for_empty_filter_is_empty(client, path, expected):
+    response = client.get(path, query_string=EMPTY_FILTER)
+
+    assert response.status_code == 200
+    assert response.get_json() == expected
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from chart_data import count_skills, skills_table
+
+
+def legacy_skills_table(df):
+    """
+    Прежний подсчет навыков: таблица one-hot по всем навыкам, сумма по опыту работы.
+    """
+    skills_encoded = pd.get_dummies(df['skills'].apply(pd.Series).stack()).groupby(level=0).sum()
+    df_skills = pd.concat([df[['experience']], skills_encoded], axis=1)
+    df_skills_grouped = df_skills.groupby('experience').sum().astype('int64').transpose()
+    df_skills_grouped.columns = df_skills_grouped.columns.str.lower()
+    return df_skills_grouped
+
+
+VACANCIES = [
+    ('Нет опыта', ['python', 'sql']),
+    ('Нет опыта', ['sql']),
+    ('От 1 года до 3 лет', ['python', 'spark', 'airflow']),
+    ('От 1 года до 3 лет', ['sql', 'python']),
+    ('От 3 до 6 лет', ['spark', 'kafka', 'sql']),
+    ('Более 6 лет', ['kafka']),
+]
+
+
+def skills_frame(rows):
+    return pd.DataFrame(rows, columns=['experience', 'skills'])
+
+
+@pytest.mark.parametrize('rows', [
+    VACANCIES,
+    # Вакансия без навыков
+    VACANCIES + [('От 3 до 6 лет', [])],
+    # Навык повторяется в одной вакансии
+    VACANCIES + [('Более 6 лет', ['sql', 'sql', 'python'])],
+], ids=['basic', 'empty_skills', 'repeated_skill'])
+def test_count_skills_matches_legacy_table(rows):
+    df = skills_frame(rows)
+
+    expected = legacy_skills_table(df)
+    result = skills_table(count_skills(df))
+
+    pd.testing.assert_frame_equal(result, expected, check_names=False)
+
+
+def test_count_skills_counts_repeated_skill_twice():
+    df = skills_frame([('Более 6 лет', ['sql', 'sql'])])
+
+    counts = count_skills(df)
+
+    assert counts.to_dict('records') == [{'experience': 'Более 6 лет', 'skill': 'sql',
+                                          'count': 2}]
+
+
+def test_count_skills_categorical_experience():
+    df = skills_frame(VACANCIES)
+    expected = skills_table(count_skills(df))
+    df['experience'] = df['experience'].astype('category')
+
+    result = skills_table(count_skills(df))
+
+    pd.testing.assert_frame_equal(result, expected)